@@ -1,5 +1,4 @@
 import streamlit as st
-import pandas as pd
 import plotly.express as px
 
 # --- CONFIGURAÇÃO DA PÁGINA (Deve ser a primeira linha) ---
@@ -12,7 +11,13 @@ st.set_page_config(
 
 # --- IMPORTS DA NOVA ARQUITETURA ---
 try:
-    from src.database.manager import load_data
+    from src.database.manager import (
+        load_data,
+        load_summary,
+        list_clients,
+        list_years,
+    )
+    from src.database.schema import PERIOD_COL, period_label, slice_periods
     from src.components.taxometer import render_taxometer
     from src.components.financial_flow import render_financial_flow
     from src.components.public_lighting import render_public_lighting
@@ -25,31 +30,15 @@ except ImportError as e:
     st.stop()
 
 
-# --- FUNÇÕES AUXILIARES ---
-def get_month_year_filter(df):
-    """Extrai lista de Anos e Meses disponíveis para o filtro."""
-    if df.empty or "Referência" not in df.columns:
-        return []
-
-    # Assume formato "MES/ANO" (ex: JAN/2025)
-    # Extrai o ANO para filtro macro
-    anos = sorted(
-        list(
-            set([x.split("/")[-1] for x in df["Referência"].unique() if "/" in str(x)])
-        )
-    )
-    return anos
-
-
 def main():
     st.title("⚡ Dashboard de Gestão Energética")
     st.markdown("---")
 
-    # 1. Carregamento de Dados (Via Manager)
-    df_faturas, df_medicao = load_data()
+    # 1. Descobre Clientes e Anos pelas partições do banco (sem ler os dados)
+    clientes_unicos = list_clients()
 
     # Validação Inicial
-    if df_faturas.empty:
+    if not clientes_unicos and not list_years():
         st.warning("📭 Nenhum dado encontrado.")
         st.info(
             "👈 Use o menu lateral para acessar **'Importar Fatura'** e carregar seu primeiro PDF."
@@ -63,28 +52,15 @@ def main():
     # 2. Sidebar de Filtros
     st.sidebar.header("🔍 Filtros Globais")
 
-    # Filtro de Cliente (Se houver coluna e dados)
-    if "Nº do Cliente" in df_faturas.columns:
-        # Pega clientes únicos ignorando nulos
-        clientes_unicos = sorted(
-            [c for c in df_faturas["Nº do Cliente"].unique() if pd.notnull(c)]
+    # Filtro de Cliente (Só mostra o filtro se houver clientes identificados)
+    cliente_selecionado = None
+    if len(clientes_unicos) > 0:
+        cliente_selecionado = st.sidebar.selectbox(
+            "👤 Cliente / Instalação", clientes_unicos
         )
 
-        # Só mostra o filtro se houver clientes identificados
-        if len(clientes_unicos) > 0:
-            cliente_selecionado = st.sidebar.selectbox(
-                "👤 Cliente / Instalação", clientes_unicos
-            )
-
-            # Filtra os DataFrames Globais
-            df_faturas = df_faturas[df_faturas["Nº do Cliente"] == cliente_selecionado]
-            if not df_medicao.empty and "Nº do Cliente" in df_medicao.columns:
-                df_medicao = df_medicao[
-                    df_medicao["Nº do Cliente"] == cliente_selecionado
-                ]
-
     # Filtro de Ano
-    anos_disponiveis = get_month_year_filter(df_faturas)
+    anos_disponiveis = list_years(cliente_selecionado)
     if anos_disponiveis:
         ano_selecionado = st.sidebar.selectbox(
             "📅 Selecione o Ano", anos_disponiveis, index=len(anos_disponiveis) - 1
@@ -92,46 +68,43 @@ def main():
     else:
         ano_selecionado = None
 
-    # Aplica Filtros
-    if ano_selecionado:
-        # Filtra onde a string de Referência contém o Ano (ex: "2025")
-        mask_ano_fat = (
-            df_faturas["Referência"].astype(str).str.contains(ano_selecionado, na=False)
-        )
-        df_fat_view = df_faturas[mask_ano_fat].copy()
-
-        if not df_medicao.empty and "Referência" in df_medicao.columns:
-            mask_ano_med = (
-                df_medicao["Referência"]
-                .astype(str)
-                .str.contains(ano_selecionado, na=False)
-            )
-            df_med_view = df_medicao[mask_ano_med].copy()
-        else:
-            df_med_view = pd.DataFrame()
-    else:
-        df_fat_view = df_faturas.copy()
-        df_med_view = df_medicao.copy()
-
-    # Filtro Mês (Opcional - Multiselect)
-    meses_disponiveis = df_fat_view["Referência"].unique()
-    meses_selecionados = st.sidebar.multiselect(
-        "📆 Filtrar Meses (Opcional)", meses_disponiveis
+    # 3. Carregamento de Dados (Via Manager): só a partição Cliente/Ano escolhida
+    df_fat_view, df_med_view = load_data(
+        client=cliente_selecionado,
+        years=[ano_selecionado] if ano_selecionado else None,
     )
 
-    if meses_selecionados:
-        df_fat_view = df_fat_view[df_fat_view["Referência"].isin(meses_selecionados)]
+    if df_fat_view.empty:
+        st.warning("📭 Nenhuma fatura encontrada para o filtro selecionado.")
+        return
+
+    # Filtro de Meses: intervalo sobre a chave de Período (AAAAMM).
+    # As linhas já vêm ordenadas por Período, então o recorte é uma busca binária.
+    periodos = sorted(df_fat_view[PERIOD_COL].dropna().unique().tolist())
+    intervalo = None
+    if len(periodos) > 1:
+        inicio, fim = st.sidebar.select_slider(
+            "📆 Intervalo de Meses",
+            options=periodos,
+            value=(periodos[0], periodos[-1]),
+            format_func=period_label,
+        )
+        intervalo = (inicio, fim)
+        df_fat_view = slice_periods(df_fat_view, inicio, fim)
         if not df_med_view.empty:
-            df_med_view = df_med_view[
-                df_med_view["Referência"].isin(meses_selecionados)
-            ]
+            df_med_view = slice_periods(df_med_view, inicio, fim)
 
-    # KPI Global do Período Filtrado
-    total_periodo = df_fat_view["Valor (R$)"].sum()
+    # KPI Global do Período Filtrado (do resumo mensal agregado no banco)
+    df_resumo = load_summary(
+        client=cliente_selecionado,
+        years=[ano_selecionado] if ano_selecionado else None,
+        periods=intervalo,
+    )
+    total_periodo = df_resumo["Valor (R$)"].sum()
     st.sidebar.markdown("---")
     st.sidebar.metric("💰 Total no Período", f"R$ {total_periodo:,.2f}")
 
-    # 3. Renderização das Abas (Componentes)
+    # 4. Renderização das Abas (Componentes)
     tab1, tab2, tab3, tab4 = st.tabs(
         [
             "💰 Taxômetro (Impostos)",
@@ -149,11 +122,12 @@ def main():
         render_financial_flow(df_fat_view)
 
     with tab3:
-        render_consumption_dashboard(df_med_view, df_fat_view)
+        render_consumption_dashboard(df_med_view, df_fat_view, df_resumo)
 
     with tab4:
-        # Passa ambas as tabelas para cruzar dados financeiros com medição (kWh)
-        render_public_lighting(df_fat_view, df_med_view)
+        # Passa ambas as tabelas para cruzar dados financeiros com medição (kWh);
+        # os totais mensais vêm do resumo
+        render_public_lighting(df_fat_view, df_med_view, df_resumo)
 
 
 if __name__ == "__main__":
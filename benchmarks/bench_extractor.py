@@ -0,0 +1,34 @@
+"""
+Micro-benchmark do parser de texto de layout (parte Python pura da extração).
+
+Uso:
+    python benchmarks/bench_extractor.py [repetições]
+"""
+
+import os
+import sys
+import timeit
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from src.services.extractor import parse_layout_text
+
+FIXTURE = os.path.join(
+    os.path.dirname(os.path.dirname(os.path.abspath(__file__))),
+    "tests",
+    "fixtures",
+    "layout_sample.txt",
+)
+
+
+def main():
+    number = int(sys.argv[1]) if len(sys.argv) > 1 else 5000
+    with open(FIXTURE, encoding="utf-8") as fh:
+        text = fh.read()
+
+    elapsed = timeit.timeit(lambda: parse_layout_text(text), number=number)
+    print(f"parse_layout_text: {elapsed / number * 1e6:.1f} µs/fatura ({number} rep.)")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,54 @@
+"""
+Micro-benchmark da conversão de números da fatura: o caminho antigo do
+build_dataframes (normalize_negative_value elemento a elemento + to_numeric)
+contra o conversor vetorizado (src/utils/numbers.py).
+
+Uso:
+    python benchmarks/bench_numbers.py [linhas] [repetições]
+"""
+
+import os
+import sys
+import timeit
+
+import numpy as np
+import pandas as pd
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from src.services.extractor import normalize_negative_value
+from src.utils.numbers import parse_br_numbers
+
+# Tokens como saem do parser e das medições, incluindo vazios e inválidos
+SAMPLE = ["8.80", "-0.59", "23,01", "19,52-", "1.234,56", "467", "", "0.01543210", "x"]
+# Valor correto de cada token (vazios e inválidos viram 0)
+EXPECTED = [8.8, -0.59, 23.01, -19.52, 1234.56, 467.0, 0.0, 0.0154321, 0.0]
+
+
+def apply_path(series):
+    text = series.astype(str).apply(normalize_negative_value).str.strip()
+    return pd.to_numeric(text, errors="coerce").fillna(0).to_numpy()
+
+
+def vectorized_path(series):
+    return parse_br_numbers(series, default=0.0)
+
+
+def main():
+    rows = int(sys.argv[1]) if len(sys.argv) > 1 else 100_000
+    number = int(sys.argv[2]) if len(sys.argv) > 2 else 20
+    series = pd.Series(np.resize(np.array(SAMPLE, dtype=object), rows))
+
+    for name, func in (("apply", apply_path), ("vetorizado", vectorized_path)):
+        elapsed = timeit.timeit(lambda func=func: func(series), number=number)
+        print(f"{name:>10}: {elapsed / number * 1e3:.2f} ms/coluna ({rows} linhas)")
+
+    # Os dois caminhos contra os valores esperados, token a token
+    expected = np.resize(np.array(EXPECTED), rows)
+    for name, func in (("apply", apply_path), ("vetorizado", vectorized_path)):
+        wrong = sorted(set(series[~np.isclose(func(series), expected)]))
+        print(f"{name:>10}: valores corretos: {not wrong}", *wrong[:5])
+
+
+if __name__ == "__main__":
+    main()
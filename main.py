@@ -1,3 +1,4 @@
+import argparse
 import os
 import glob
 import pandas as pd
@@ -5,9 +6,19 @@ from tqdm import tqdm  # Barra de progresso (opcional, se não tiver, remova)
 
 # --- IMPORTS DA NOVA ARQUITETURA ---
 try:
-    from src.services.unlocker import unlock_pdf_file, check_is_encrypted
-    from src.services.extractor import extract_data_from_pdf
-    from src.database.manager import save_data
+    from src.services.ingest import (
+        reparse_archive,
+        STATUS_OK,
+        STATUS_LOCKED,
+        STATUS_EMPTY,
+        STATUS_INVALID,
+        STATUS_TOO_LARGE,
+    )
+    from src.services.extractor import EXTRACTOR_VERSION
+    from src.services.pipeline import READ_WORKERS, STORE_WORKERS, process_all
+    from src.database import ingest_catalog
+    from src.database.ingest_catalog import STATUS_ERROR
+    from src.database.manager import BatchWriter, compact
 except ImportError as e:
     print(f"❌ Erro de Importação: {e}")
     print("Certifique-se de estar rodando na raiz do projeto.")
@@ -16,89 +27,285 @@ except ImportError as e:
 # --- CONFIGURAÇÃO ---
 INPUT_FOLDER = "data/raw"
 EXTENSIONS = ["*.pdf", "*.PDF"]
+# Faturas acumuladas por gravação no banco (uma escrita por tabela a cada lote)
+COMMIT_EVERY = 500
+# Recicla cada worker após N arquivos (limita o crescimento de memória do pdfplumber)
+MAX_TASKS_PER_CHILD = 50
 
 
-def batch_process():
+def _commit_batch(batch, pendentes):
+    """Grava o lote acumulado. Retorna (sucessos, falhas) e esvazia `pendentes`."""
+    total = len(pendentes)
+    if not total:
+        return 0, 0
+
+    saved = batch.commit()
+    if not saved:
+        for filename in pendentes:
+            print(f"❌ ERRO DB: Falha ao salvar {filename}.")
+    pendentes.clear()
+    return (total, 0) if saved else (0, total)
+
+
+def _registra(path, assinatura, status, digest=None, erro=None):
+    """Registra no catálogo um arquivo que não foi gravado no banco."""
+    ingest_catalog.record([(path, assinatura, status, digest, erro)], EXTRACTOR_VERSION)
+
+
+def batch_process(
+    workers=1,
+    max_tasks_per_child=MAX_TASKS_PER_CHILD,
+    full=False,
+    read_workers=READ_WORKERS,
+    store_workers=STORE_WORKERS,
+):
     """
-    Processa todos os PDFs na pasta data/raw que ainda não foram importados.
-    Útil para carga inicial ou reprocessamento em massa.
+    Processa os PDFs da pasta data/raw que ainda não foram importados.
+
+    O catálogo de ingestão (src/database/ingest_catalog.py) guarda o que
+    cada execução fez: arquivos sem alteração desde um processamento bem
+    sucedido são pulados sem serem abertos, e os que falharam são refeitos.
+    Com `full=True`, todos os arquivos são reprocessados (carga inicial ou
+    reprocessamento em massa).
+
+    Os arquivos passam pelo pipeline em estágios (src/services/pipeline.py):
+    leitura e desbloqueio em `read_workers` threads, extração em `workers`
+    processos, cache em `store_workers` threads e um único escritor do banco.
     """
     print("🚀 Iniciando Processamento em Lote (CLI)...")
 
-    # 1. Lista Arquivos
+    # 1. Lista Arquivos (ignora cópias desbloqueadas deixadas por versões antigas;
+    # o desbloqueio agora é feito em memória)
     files = []
     for ext in EXTENSIONS:
         files.extend(glob.glob(os.path.join(INPUT_FOLDER, ext)))
+    files = [f for f in files if not os.path.basename(f).startswith("unlocked_")]
 
     if not files:
         print(f"⚠️ Nenhum PDF encontrado em '{INPUT_FOLDER}'.")
         return
 
     print(f"📂 Encontrados {len(files)} arquivos.")
+    if full:
+        pendentes_arquivos = {f: ingest_catalog.file_stat(f) for f in files}
+    else:
+        pendentes_arquivos = ingest_catalog.select_pending(files, EXTRACTOR_VERSION)
+        pulados = len(files) - len(pendentes_arquivos)
+        if pulados:
+            print(f"⏭️ {pulados} arquivo(s) sem alteração desde a última importação.")
+    if not pendentes_arquivos:
+        print("✅ Nada novo para importar.")
+        return
 
-    sucesso = 0
-    erros = 0
+    if workers > 1:
+        print(f"⚙️ Usando {workers} processos de extração em paralelo.")
 
-    # 2. Loop de Processamento
-    # Se tiver tqdm instalado, usa barra de progresso. Se não, usa loop normal.
-    try:
-        iterator = tqdm(files, desc="Processando")
-    except NameError:
-        iterator = files
+    contagem = {"sucesso": 0, "erros": 0, "em_cache": 0}
+    barra = tqdm(total=len(pendentes_arquivos), desc="Processando")
 
-    for pdf_path in iterator:
+    def on_result(pdf_path, result, error):
+        barra.update(1)
         filename = os.path.basename(pdf_path)
+        assinatura = pendentes_arquivos[pdf_path]
 
-        # Ignora arquivos temporários de desbloqueio
-        if filename.startswith("unlocked_"):
-            continue
+        if error is not None:
+            print(f"❌ CRASH: Erro em {filename}: {error}")
+            _registra(pdf_path, assinatura, STATUS_ERROR, erro=str(error))
+            contagem["erros"] += 1
+            return
 
-        try:
-            # A. Desbloqueio (Tenta sem senha primeiro)
-            # Se falhar, não temos input de usuário aqui, então pulamos
-            if check_is_encrypted(pdf_path):
-                # Tenta desbloquear sem senha ou loga erro
-                unlocked_path = unlock_pdf_file(pdf_path)
-                if not unlocked_path:
-                    print(
-                        f"🔒 PULO: {filename} tem senha e não foi possível abrir automaticamente."
-                    )
-                    erros += 1
-                    continue
+        if result["status"] == STATUS_OK:
+            if result["cached"]:
+                contagem["em_cache"] += 1
+            if result["saved"]:
+                contagem["sucesso"] += 1
             else:
-                unlocked_path = pdf_path  # Já está aberto
+                print(f"❌ ERRO DB: Falha ao salvar {filename}.")
+                contagem["erros"] += 1
+            return
 
-            # B. Extração
-            df_fin, df_med = extract_data_from_pdf(unlocked_path)
+        _registra(pdf_path, assinatura, result["status"], result["digest"])
+        contagem["erros"] += 1
 
-            if df_fin.empty:
-                print(f"⚠️ VAZIO: {filename} não retornou dados financeiros.")
-                erros += 1
-                continue
+        # Se tiver senha, não temos input de usuário aqui, então pulamos
+        if result["status"] == STATUS_LOCKED:
+            print(
+                f"🔒 PULO: {filename} tem senha e não foi possível abrir automaticamente."
+            )
+        elif result["status"] == STATUS_EMPTY:
+            print(f"⚠️ VAZIO: {filename} não retornou dados financeiros.")
+        # Recusados pela sondagem, sem abrir o documento
+        elif result["status"] == STATUS_INVALID:
+            print(f"🚫 PULO: {filename} não é um PDF válido.")
+        elif result["status"] == STATUS_TOO_LARGE:
+            tamanho = result["probe"].size / (1024 * 1024)
+            print(f"🚫 PULO: {filename} é grande demais ({tamanho:.1f} MB).")
 
-            # C. Salvamento (Upsert)
-            saved = save_data(df_fin, df_med)
+    def on_commit(items, saved):
+        # O catálogo só registra o sucesso depois da gravação: um lote perdido
+        # numa queda é refeito na próxima execução
+        status, erro = (STATUS_OK, None) if saved else (STATUS_ERROR, "falha ao salvar")
+        rows = [
+            (path, pendentes_arquivos[path], status, result["digest"], erro)
+            for path, result in items
+        ]
+        ingest_catalog.record(rows, EXTRACTOR_VERSION)
 
-            if saved:
-                sucesso += 1
-            else:
-                print(f"❌ ERRO DB: Falha ao salvar {filename}.")
-                erros += 1
+    # 2. Pipeline (tabelas Arrow: o lote é gravado sem passar pelo pandas; grava
+    # a cada COMMIT_EVERY faturas)
+    process_all(
+        list(pendentes_arquivos),
+        read_workers=read_workers,
+        extract_workers=workers,
+        store_workers=store_workers,
+        commit_every=COMMIT_EVERY,
+        max_tasks_per_child=max_tasks_per_child,
+        on_result=on_result,
+        on_commit=on_commit,
+    )
+    barra.close()
+
+    # Incorpora os deltas desta execução aos arquivos base
+    compact()
+
+    print("-" * 30)
+    print(f"🏁 Concluído!")
+    print(f"✅ Sucessos: {contagem['sucesso']}")
+    print(f"❌ Falhas:   {contagem['erros']}")
+    print(f"⚡ Do cache: {contagem['em_cache']}")
+    print("💡 Abra o Dashboard ('streamlit run Home.py') para ver os dados.")
 
-            # Limpeza se foi criado arquivo temporário
-            if unlocked_path != pdf_path and os.path.exists(unlocked_path):
-                os.remove(unlocked_path)
 
-        except Exception as e:
-            print(f"❌ CRASH: Erro em {filename}: {e}")
+def reparse_process():
+    """
+    Reaplica o parser atual sobre o texto de layout já armazenado de todas as
+    faturas, sem reabrir os PDFs. Útil após corrigir uma regex do extrator.
+    """
+    print("🔁 Reprocessando texto armazenado (sem abrir PDFs)...")
+
+    sucesso = 0
+    erros = 0
+    batch = BatchWriter()
+    pendentes = []
+
+    for result in reparse_archive(arrow=True):
+        if result["status"] == STATUS_EMPTY:
+            print(f"⚠️ VAZIO: {result['key']} não retornou dados financeiros.")
             erros += 1
+            continue
+
+        batch.add(result["fin"], result["med"])
+        pendentes.append(result["key"])
+        if len(batch) >= COMMIT_EVERY:
+            ok, falhas = _commit_batch(batch, pendentes)
+            sucesso += ok
+            erros += falhas
+
+    ok, falhas = _commit_batch(batch, pendentes)
+    sucesso += ok
+    erros += falhas
+    compact()
 
     print("-" * 30)
-    print(f"🏁 Concluído!")
+    print("🏁 Concluído!")
     print(f"✅ Sucessos: {sucesso}")
     print(f"❌ Falhas:   {erros}")
-    print("💡 Abra o Dashboard ('streamlit run Home.py') para ver os dados.")
+
+
+def watch_process(inbox=None, workers=1, max_tasks_per_child=MAX_TASKS_PER_CHILD):
+    """
+    Importação contínua: observa a pasta de entrada (ver src/services/watcher.py)
+    e grava cada PDF novo assim que ele termina de ser copiado.
+    """
+    from src.services.watcher import IngestWatcher
+
+    watcher = IngestWatcher(
+        inbox=inbox, workers=workers, max_tasks_per_child=max_tasks_per_child
+    )
+    try:
+        watcher.run()
+    except KeyboardInterrupt:
+        pass
+    # Incorpora os deltas gravados pelo watcher aos arquivos base
+    compact()
+
+
+def parse_args():
+    parser = argparse.ArgumentParser(description="Importação em lote de faturas Enel.")
+    parser.add_argument(
+        "--reparse",
+        action="store_true",
+        help="Reaplica o extrator sobre o texto armazenado, sem abrir os PDFs.",
+    )
+    parser.add_argument(
+        "--compact",
+        action="store_true",
+        help="Só incorpora os deltas pendentes aos arquivos base do banco.",
+    )
+    parser.add_argument(
+        "--watch",
+        action="store_true",
+        help="Fica observando a pasta de entrada e importa cada PDF que chegar.",
+    )
+    parser.add_argument(
+        "--inbox",
+        default=None,
+        metavar="PASTA",
+        help="Pasta observada pelo --watch (padrão: ENEL_INBOX ou data/raw).",
+    )
+    parser.add_argument(
+        "--full",
+        action="store_true",
+        help="Reprocessa todos os PDFs, mesmo os já importados sem alteração.",
+    )
+    parser.add_argument(
+        "--workers",
+        type=int,
+        default=1,
+        metavar="N",
+        help="Número de processos de extração (padrão: 1).",
+    )
+    parser.add_argument(
+        "--read-workers",
+        type=int,
+        default=READ_WORKERS,
+        metavar="N",
+        help=f"Threads de leitura e desbloqueio (padrão: {READ_WORKERS}).",
+    )
+    parser.add_argument(
+        "--store-workers",
+        type=int,
+        default=STORE_WORKERS,
+        metavar="N",
+        help=f"Threads de gravação do cache de extração (padrão: {STORE_WORKERS}).",
+    )
+    parser.add_argument(
+        "--max-tasks-per-child",
+        type=int,
+        default=MAX_TASKS_PER_CHILD,
+        metavar="N",
+        help="Arquivos processados por worker antes de ser reciclado.",
+    )
+    return parser.parse_args()
 
 
 if __name__ == "__main__":
-    batch_process()
+    args = parse_args()
+    if args.compact:
+        compact()
+    elif args.watch:
+        watch_process(
+            inbox=args.inbox,
+            workers=args.workers,
+            max_tasks_per_child=args.max_tasks_per_child,
+        )
+    elif args.reparse:
+        reparse_process()
+    else:
+        batch_process(
+            workers=args.workers,
+            max_tasks_per_child=args.max_tasks_per_child,
+            full=args.full,
+            read_workers=args.read_workers,
+            store_workers=args.store_workers,
+        )
@@ -1,34 +1,159 @@
 import streamlit as st
-import os
 import time
+
 import pandas as pd
-import plotly.express as px
 
 # --- IMPORTS DA NOVA ARQUITETURA ---
 try:
-    from src.services.unlocker import unlock_pdf_file, check_is_encrypted
-    from src.services.extractor import extract_data_from_pdf
-    from src.database.manager import save_data, load_data
+    from src.services.ingest import (
+        STATUS_OK,
+        STATUS_LOCKED,
+        STATUS_EMPTY,
+        STATUS_INVALID,
+        STATUS_TOO_LARGE,
+        MAX_PDF_BYTES,
+    )
+    from src.services.jobs import FINISHED_STATES, JOB_DONE, get_job_service
+    from src.database.manager import BatchWriter, load_summary, clear_data
+    from src.database.schema import period_label, sort_by_period
 except ImportError as e:
     st.error(f"Erro de configuração: {e}")
     st.stop()
 
+# --- CONFIGURAÇÃO ---
+POLL_SECONDS = 1.0  # Intervalo da consulta aos jobs de extração
+
+# Status de cada arquivo na conferência
+STATUS_LABELS = {
+    STATUS_OK: "✅ Pronta",
+    STATUS_LOCKED: "🔒 Senha necessária",
+    STATUS_INVALID: "🚫 Não é um PDF",
+    STATUS_TOO_LARGE: f"🚫 Maior que {MAX_PDF_BYTES // (1024 * 1024)} MB",
+    STATUS_EMPTY: "⚠️ Nenhum dado financeiro",
+}
+STATUS_CRASH = "crash"  # Exceção durante o processamento
+STATUS_PENDING = "pending"  # Job ainda na fila do serviço
+
 st.set_page_config(page_title="Importar Fatura", page_icon="📂", layout="wide")
 
-st.title("📂 Importar Nova Fatura")
-st.markdown("Faça o upload da sua conta de energia (PDF) para alimentar os gráficos.")
+st.title("📂 Importar Faturas")
+st.markdown(
+    "Faça o upload das suas contas de energia (PDF) para alimentar os gráficos. "
+    "Você pode enviar vários meses de uma vez."
+)
 
 # --- ÁREA DE UPLOAD ---
 # Usamos key=st.session_state para poder resetar o uploader depois
 if "uploader_key" not in st.session_state:
     st.session_state["uploader_key"] = 0
 
-if "preview_data" not in st.session_state:
-    st.session_state["preview_data"] = None
+# Prévias por arquivo: {(nome, tamanho): dados da fatura}. Enquanto o job de
+# extração não termina, a prévia guarda só o id do job (sobrevive a reruns)
+if "previews" not in st.session_state:
+    st.session_state["previews"] = {}
+
+# Mensagem exibida após o rerun que limpa o uploader
+if "import_message" in st.session_state:
+    st.success(st.session_state.pop("import_message"))
+
+
+def _file_key(uploaded_file):
+    return uploaded_file.name, uploaded_file.size
+
+
+def _submit(uploaded_file, password):
+    """Envia o arquivo ao serviço de extração (não bloqueia o script)."""
+    job_id = get_job_service().submit(
+        uploaded_file.getvalue(), password=password, name=uploaded_file.name
+    )
+    return {
+        "filename": uploaded_file.name,
+        "status": STATUS_PENDING,
+        "job": job_id,
+        "password": password,
+    }
+
+
+def _from_job(preview, job):
+    """Prévia da fatura a partir de um job terminado."""
+    if job["state"] != JOB_DONE:
+        return {**preview, "status": STATUS_CRASH, "error": job["error"]}
+
+    result = job["result"]
+    preview = {**preview, "status": result["status"], "cached": result["cached"]}
+    if result["status"] == STATUS_OK:
+        df_fin = result["fin"]
+        preview["fin"] = df_fin
+        preview["med"] = result["med"]
+        preview["ref"] = (
+            df_fin["Referência"].iloc[0]
+            if "Referência" in df_fin.columns
+            else "Desconhecido"
+        )
+        preview["total"] = (
+            float(df_fin["Valor (R$)"].sum()) if "Valor (R$)" in df_fin.columns else 0.0
+        )
+    return preview
+
+
+def _poll(previews, files):
+    """
+    Atualiza as prévias com os jobs terminados. Jobs perdidos (expirados ou
+    servidor reiniciado) são reenviados. Retorna quantos ainda estão na fila.
+    """
+    service = get_job_service()
+    pending = 0
+    for key, preview in previews.items():
+        if preview["status"] != STATUS_PENDING:
+            continue
+        job = service.status(preview["job"])
+        if job is None:
+            previews[key] = _submit(files[key], preview["password"])
+            pending += 1
+        elif job["state"] in FINISHED_STATES:
+            previews[key] = _from_job(preview, job)
+        else:
+            pending += 1
+    return pending
+
+
+def _needs_processing(preview, password):
+    # Arquivos bloqueados são refeitos quando o usuário troca a senha
+    return (
+        preview is None
+        or preview["status"] == STATUS_LOCKED
+        and preview["password"] != password
+    )
 
-uploaded_file = st.file_uploader(
-    "Escolha o arquivo PDF (Enel)",
+
+@st.fragment(run_every=POLL_SECONDS)
+def _progress(previews, files):
+    """
+    Acompanha a fila sem segurar o script: só este trecho roda de novo a
+    cada POLL_SECONDS; quando tudo termina, a página inteira é refeita.
+    """
+    pending = _poll(previews, files)
+    if not pending:
+        st.rerun()
+
+    total = len(previews)
+    st.progress(
+        (total - pending) / total,
+        text=f"⏳ Lendo arquivos: {total - pending} de {total} prontos...",
+    )
+    for preview in previews.values():
+        label = STATUS_LABELS.get(preview["status"], "⏳ Na fila")
+        if preview["status"] == STATUS_CRASH:
+            label = "❌ Erro"
+        elif preview.get("cached"):
+            label += " (cache)"
+        st.caption(f"{label}: {preview['filename']}")
+
+
+uploaded_files = st.file_uploader(
+    "Escolha os arquivos PDF (Enel)",
     type=["pdf"],
+    accept_multiple_files=True,
     key=f"uploader_{st.session_state['uploader_key']}",
 )
 
@@ -36,149 +161,135 @@ uploaded_file = st.file_uploader(
 password = st.text_input(
     "Senha do PDF (Opcional)",
     type="password",
-    help="Geralmente os 5 primeiros dígitos do CPF.",
+    help="Geralmente os 5 primeiros dígitos do CPF. Vale para todos os arquivos.",
 )
+senha = password if password else None
 
-if uploaded_file is not None:
+if uploaded_files:
     st.divider()
 
-    # 1. Verifica se o arquivo mudou (limpa preview antigo)
-    if (
-        st.session_state["preview_data"]
-        and st.session_state["preview_data"]["filename"] != uploaded_file.name
-    ):
-        st.session_state["preview_data"] = None
-
-    # 2. Se não tem preview, processa automaticamente
-    if st.session_state["preview_data"] is None:
-        with st.status("Lendo arquivo...", expanded=True) as status:
-            temp_path = None
-            try:
-                # A. Desbloqueio
-                st.write("🔓 Verificando criptografia...")
-                senha_teste = password if password else None
-                temp_path = unlock_pdf_file(uploaded_file, password=senha_teste)
-
-                if not temp_path:
-                    if check_is_encrypted(uploaded_file) and not password:
-                        status.update(label="Erro: Senha Necessária", state="error")
-                        st.error("🔒 Arquivo protegido. Informe a senha acima.")
-                        st.stop()
-                    else:
-                        status.update(label="Erro no Desbloqueio", state="error")
-                        st.error("❌ Falha ao abrir o PDF.")
-                        st.stop()
-
-                # B. Extração
-                st.write("📝 Extraindo dados...")
-                df_fin, df_med = extract_data_from_pdf(temp_path)
-
-                if df_fin.empty:
-                    status.update(label="Erro de Leitura", state="error")
-                    st.error("⚠️ Nenhum dado financeiro encontrado.")
-                    st.stop()
-
-                # C. Sucesso -> Salva no Estado
-                ref = (
-                    df_fin["Referência"].iloc[0]
-                    if "Referência" in df_fin.columns
-                    else "Desconhecido"
-                )
-                st.session_state["preview_data"] = {
-                    "filename": uploaded_file.name,
-                    "fin": df_fin,
-                    "med": df_med,
-                    "ref": ref,
-                }
-                status.update(label="Leitura Concluída!", state="complete")
-                st.rerun()
+    # 1. Esquece prévias de arquivos removidos do uploader
+    previews = st.session_state["previews"]
+    current = {_file_key(f): f for f in uploaded_files}
+    for key in list(previews):
+        if key not in current:
+            del previews[key]
 
-            except Exception as e:
-                status.update(label="Erro Inesperado", state="error")
-                st.error(f"Ocorreu um erro: {e}")
-            finally:
-                if temp_path and os.path.exists(temp_path):
-                    os.remove(temp_path)
+    # 2. Envia ao serviço os arquivos novos (ou bloqueados com nova senha)
+    for key, f in current.items():
+        if _needs_processing(previews.get(key), senha):
+            previews[key] = _submit(f, senha)
 
-    # 3. Se TEM preview, mostra tabela e confirmação
+    # Enquanto houver jobs na fila, só o progresso é exibido
+    if _poll(previews, current):
+        _progress(previews, current)
     else:
-        data = st.session_state["preview_data"]
-        st.info(f"✅ Fatura identificada: **{data['ref']}**")
+        # 3. Conferência: todas as prévias de uma vez, na ordem do upload
+        ordered = [previews[key] for key in current if key in previews]
+        ready = [p for p in ordered if p["status"] == STATUS_OK]
+        rejected = [p for p in ordered if p["status"] != STATUS_OK]
 
         st.markdown("### 📝 Conferência dos Dados")
-        st.dataframe(data["fin"], width="stretch", hide_index=True)
+        st.dataframe(
+            pd.DataFrame(
+                {
+                    "Arquivo": [p["filename"] for p in ordered],
+                    "Referência": [p.get("ref", "-") for p in ordered],
+                    "Status": [
+                        STATUS_LABELS.get(p["status"], f"❌ {p.get('error')}")
+                        for p in ordered
+                    ],
+                    "Valor (R$)": [p.get("total") for p in ordered],
+                }
+            ),
+            column_config={
+                "Valor (R$)": st.column_config.NumberColumn(
+                    "Valor Total", format="R$ %.2f"
+                )
+            },
+            width="stretch",
+            hide_index=True,
+        )
+
+        if any(p["status"] == STATUS_LOCKED for p in rejected) and not password:
+            st.error("🔒 Há arquivos protegidos. Informe a senha acima.")
+
+        # Meses repetidos no lote: vale o último arquivo (como no BatchWriter)
+        refs = [p["ref"] for p in ready]
+        repeated = sorted({r for r in refs if refs.count(r) > 1})
+        if repeated:
+            st.warning(
+                f"Referências repetidas no envio: {', '.join(map(str, repeated))}."
+            )
+
+        for p in ready:
+            with st.expander(f"📄 {p['ref']} · {p['filename']}"):
+                st.dataframe(p["fin"], width="stretch", hide_index=True)
 
         c_save, c_cancel = st.columns([1, 1])
 
         with c_save:
-            if st.button("💾 Confirmar e Salvar", type="primary", width="stretch"):
-                if save_data(data["fin"], data["med"]):
-                    st.success(f"Fatura **{data['ref']}** salva com sucesso!")
+            if st.button(
+                f"💾 Confirmar e Salvar ({len(ready)})",
+                type="primary",
+                width="stretch",
+                disabled=not ready,
+            ):
+                # Uma única gravação para o envio inteiro
+                batch = BatchWriter()
+                for p in ready:
+                    batch.add(p["fin"], p["med"])
+                if batch.commit():
+                    st.session_state["import_message"] = (
+                        f"{len(ready)} fatura(s) salva(s) com sucesso!"
+                    )
 
                     # Reset total para próxima importação
-                    st.session_state["preview_data"] = None
+                    st.session_state["previews"] = {}
                     st.session_state["uploader_key"] += 1
-                    time.sleep(2)
                     st.rerun()
                 else:
                     st.error("Erro ao escrever no banco de dados.")
 
         with c_cancel:
             if st.button("❌ Cancelar", width="stretch"):
-                st.session_state["preview_data"] = None
+                st.session_state["previews"] = {}
                 st.session_state["uploader_key"] += 1
                 st.rerun()
 
 # --- DICA DE RODAPÉ ---
 else:
-    st.info(
-        "💡 Dica: Você pode importar várias faturas uma por uma para construir seu histórico."
-    )
+    st.session_state["previews"] = {}
+    st.info("💡 Dica: Selecione vários PDFs de uma vez para importar todo o histórico.")
 
 # --- HISTÓRICO DE IMPORTAÇÕES (Movido de Monitor de Logs) ---
 st.divider()
 st.subheader("📊 Histórico de Importações")
 
-# 1. Carrega Dados Reais do Banco
-df_faturas, df_medicao = load_data()
+# 1. Resumo mensal já agregado pelo banco (uma linha por fatura)
+df_resumo_mes = load_summary()
 
-if not df_faturas.empty:
+if not df_resumo_mes.empty:
     # 2. Resumo Geral
-    total_faturas = df_faturas["Referência"].nunique()
-    ultimo_mes = df_faturas["Referência"].iloc[-1] if not df_faturas.empty else "-"
-    total_gasto = df_faturas["Valor (R$)"].sum()
+    total_faturas = len(df_resumo_mes)
+    ultimo_mes = period_label(df_resumo_mes["Período"].max())
+    total_gasto = df_resumo_mes["Valor (R$)"].sum()
 
     k1, k2, k3 = st.columns(3)
     k1.metric("Faturas no Sistema", total_faturas)
     k2.metric("Última Referência", ultimo_mes)
     k3.metric("Total Acumulado (R$)", f"R$ {total_gasto:,.2f}")
 
-    # 3. Tabela de Detalhes
+    # 3. Tabela de Detalhes (ordem cronológica pela chave de Período AAAAMM)
     st.markdown("### 📋 Faturas Cadastradas")
-    df_resumo_mes = (
-        df_faturas.groupby("Referência")
-        .agg({"Valor (R$)": "sum", "Itens de Fatura": "count"})
-        .reset_index()
-    )
-    df_resumo_mes.rename(columns={"Itens de Fatura": "Qtd. Itens"}, inplace=True)
-
-    if not df_medicao.empty and "P.Horário/Segmento" in df_medicao.columns:
-        mask_inj = (
-            df_medicao["P.Horário/Segmento"]
-            .astype(str)
-            .str.contains("INJ", case=False, na=False)
-        )
-        df_med_agg = (
-            df_medicao[~mask_inj]
-            .groupby("Referência")["Consumo kWh"]
-            .sum()
-            .reset_index()
-        )
-        df_resumo_mes = pd.merge(df_resumo_mes, df_med_agg, on="Referência", how="left")
+    df_resumo_mes = sort_by_period(df_resumo_mes)[
+        ["Referência", "Nº do Cliente", "Valor (R$)", "Consumo kWh", "Qtd. Itens"]
+    ]
 
     st.dataframe(
         df_resumo_mes,
         column_config={
+            "Nº do Cliente": st.column_config.NumberColumn("Cliente", format="%d"),
             "Valor (R$)": st.column_config.NumberColumn(
                 "Valor Total", format="R$ %.2f"
             ),
@@ -192,10 +303,7 @@ if not df_faturas.empty:
     with st.expander("🗑️ Zona de Perigo"):
         st.warning("Isso apagará todo o histórico de faturas.")
         if st.button("Limpar Banco de Dados Completo"):
-            if os.path.exists("data/database/faturas.parquet"):
-                os.remove("data/database/faturas.parquet")
-            if os.path.exists("data/database/medicao.parquet"):
-                os.remove("data/database/medicao.parquet")
+            clear_data()
             st.success("Banco de dados limpo com sucesso!")
             time.sleep(1)
             st.rerun()
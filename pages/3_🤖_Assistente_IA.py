@@ -6,7 +6,7 @@ import traceback
 import re
 import time
 from datetime import datetime
-from src.database.manager import load_data
+from src.database.manager import load_data, load_summary
 
 # Importa os wrappers e factory
 from src.services.llm_client import (
@@ -36,8 +36,18 @@ if not backends_available:
     )
     st.stop()
 
-# 1. Carregar Dados
-df_faturas, df_medicao = load_data()
+# 1. Carregar Dados (só as colunas que vão para o contexto da IA)
+# Selecionamos colunas chave para otimizar o contexto da IA
+cols_relevantes = [
+    "Referência",
+    "Período",
+    "Itens de Fatura",
+    "Valor (R$)",
+    "Quant.",
+    "Unid.",
+    "Nº do Cliente",
+]
+df_faturas, _ = load_data(columns=cols_relevantes)
 
 if df_faturas.empty:
     st.warning("⚠️ Nenhum dado de fatura encontrado. Importe arquivos primeiro.")
@@ -49,15 +59,6 @@ if df_faturas.empty:
 # de modelos dinamicamente.
 
 # 3. Preparação do DataFrame
-# Selecionamos colunas chave para otimizar o contexto da IA
-cols_relevantes = [
-    "Referência",
-    "Itens de Fatura",
-    "Valor (R$)",
-    "Quant.",
-    "Unid.",
-    "Nº do Cliente",
-]
 df_ia = df_faturas[[c for c in cols_relevantes if c in df_faturas.columns]].copy()
 
 
@@ -79,13 +80,21 @@ def classificar_item_ia(nome):
 df_ia["Categoria"] = df_ia["Itens de Fatura"].apply(classificar_item_ia)
 
 
-# 2. Extração de Ano (Para facilitar filtros de tempo)
-def extrair_ano(ref):
-    parts = str(ref).split("/")
-    return parts[-1].strip() if len(parts) > 1 else str(ref)
+# 2. Ano (Para facilitar filtros de tempo), direto da chave de Período AAAAMM
+df_ia["Ano"] = df_ia["Período"] // 100
 
-
-df_ia["Ano"] = df_ia["Referência"].apply(extrair_ano)
+# 3. Totais da fatura do mês, do resumo mensal já agregado no banco
+# (a IA não precisa somar os itens para responder "quanto foi a conta")
+df_totais = load_summary()[
+    ["Nº do Cliente", "Período", "Valor (R$)", "Consumo kWh", "Injetado kWh"]
+].rename(
+    columns={
+        "Valor (R$)": "Total da Fatura (R$)",
+        "Consumo kWh": "Consumo do Mês (kWh)",
+        "Injetado kWh": "Injetado no Mês (kWh)",
+    }
+)
+df_ia = df_ia.merge(df_totais, on=["Nº do Cliente", "Período"], how="left")
 
 # 4. Configuração do Backend de Análise e LLM
 
@@ -326,7 +335,8 @@ with st.expander("🔧 Debug: listagem de modelos (mostrar/ocultar)"):
 
 # Dicionário de metadados para ajudar a IA a entender o contexto das colunas
 field_descriptions = {
-    "Referência": "Mês e ano de referência da fatura (ex: JAN/2024). Use para filtrar datas.",
+    "Referência": "Mês e ano de referência da fatura no formato MM/AAAA (ex: 01/2024).",
+    "Período": "Chave numérica AAAAMM da referência (ex: 202401). Use para filtrar e ordenar datas.",
     "Itens de Fatura": "Descrição detalhada do item cobrado (ex: Consumo Energia, Contrib Ilum Publica).",
     "Valor (R$)": "Valor monetário do item. Valores negativos indicam descontos, devoluções ou injeção de energia solar.",
     "Quant.": "Quantidade consumida ou medida (geralmente em kWh).",
@@ -334,6 +344,9 @@ field_descriptions = {
     "Nº do Cliente": "Identificador único da instalação/cliente.",
     "Categoria": "Categoria agrupada do item (Iluminação Pública, Impostos, Energia, Bandeiras, etc).",
     "Ano": "Ano da fatura extraído da referência (ex: 2024, 2025).",
+    "Total da Fatura (R$)": "Valor total da fatura do mês (repetido em cada item). Não some entre itens.",
+    "Consumo do Mês (kWh)": "Energia consumida da rede no mês, sem a injetada (repetido em cada item).",
+    "Injetado no Mês (kWh)": "Energia solar injetada na rede no mês (repetido em cada item).",
 }
 
 # Instancia o agente (PandasAI ou LangChain) via factory
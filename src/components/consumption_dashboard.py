@@ -2,11 +2,22 @@ import streamlit as st
 import pandas as pd
 import plotly.express as px
 
+from src.database.schema import (
+    PERIOD_COL,
+    period_label,
+    slice_periods,
+    sort_by_period,
+)
+from src.database.summary import INJECTED_PATTERN, by_month, summarize_months
+from src.utils.numbers import parse_br_numbers
 
-def render_consumption_dashboard(df_medicao, df_faturas):
+
+def render_consumption_dashboard(df_medicao, df_faturas, df_resumo=None):
     """
     Renderiza o dashboard de consumo de energia (kWh).
     Cruza dados de medição com dados financeiros para insights de eficiência.
+    Os totais mensais vêm do resumo materializado (manager.load_summary);
+    sem ele, são calculados a partir dos itens.
     """
     st.subheader("🔌 Balanço Energético (Consumo vs. Geração)")
 
@@ -14,69 +25,40 @@ def render_consumption_dashboard(df_medicao, df_faturas):
         st.warning("Sem dados de medição disponíveis para análise.")
         return
 
-    # --- 1. PREPARAÇÃO E LIMPEZA DOS DADOS ---
-    df_med = df_medicao.copy()
+    # --- 1. PREPARAÇÃO DOS DADOS ---
+    if df_resumo is None:
+        df_resumo = summarize_months(df_faturas, df_medicao)
 
-    # Garante que Consumo é numérico (trata strings como "1.234,00")
-    if df_med["Consumo kWh"].dtype == object:
-        df_med["Consumo kWh"] = pd.to_numeric(
-            df_med["Consumo kWh"]
-            .astype(str)
-            .str.replace(".", "")
-            .str.replace(",", "."),
-            errors="coerce",
-        ).fillna(0)
+    # Consumo (sem a injetada), Injeção e Valor da conta por mês
+    df_merged = by_month(df_resumo, ["Consumo kWh", "Injetado kWh", "Valor (R$)"])
 
-    # Garante que N° Dias é numérico para cálculo de média diária
-    if "N° Dias" in df_med.columns:
-        df_med["N° Dias"] = pd.to_numeric(df_med["N° Dias"], errors="coerce").fillna(30)
-
-    # --- SEPARAÇÃO: CONSUMO vs INJEÇÃO ---
-    df_cons = df_med.copy()
-    df_inj = pd.DataFrame()
+    # Só os meses com medição (o resumo também traz meses só com itens)
+    df_med = df_medicao.copy()
+    meses_medidos = df_med["Referência"].astype(str).unique()
+    df_merged = df_merged[
+        df_merged["Referência"].astype(str).isin(meses_medidos)
+    ].copy()
 
-    if "P.Horário/Segmento" in df_med.columns:
-        # Identifica linhas de Geração Solar (Injetada)
+    # N° Dias: o maior registrado no mês, fora as linhas de Geração Solar
+    if "N° Dias" in df_med.columns:
+        df_med["N° Dias"] = parse_br_numbers(df_med["N° Dias"], default=30)
         mask_inj = (
             df_med["P.Horário/Segmento"]
             .astype(str)
-            .str.contains("INJ|Gera|Injetada", case=False, na=False)
+            .str.contains(INJECTED_PATTERN, case=False, na=False)
+            if "P.Horário/Segmento" in df_med.columns
+            else pd.Series(False, index=df_med.index)
         )
-        df_inj = df_med[mask_inj].copy()
-        df_cons = df_med[~mask_inj].copy()
-
-    # 1. Agrupa Consumo
-    df_view_cons = (
-        df_cons.groupby("Referência")
-        .agg(
-            {
-                "Consumo kWh": "sum",
-                "N° Dias": "max",  # Pega o maior número de dias registrado no mês
-            }
+        dias = df_med[~mask_inj].groupby("Referência", observed=True)["N° Dias"].max()
+        dias.index = dias.index.astype(str)
+        df_merged["N° Dias"] = (
+            df_merged["Referência"].astype(str).map(dias).fillna(0).to_numpy()
         )
-        .reset_index()
-    )
-
-    # 2. Agrupa Injeção (se houver)
-    if not df_inj.empty:
-        df_view_inj = df_inj.groupby("Referência")["Consumo kWh"].sum().reset_index()
-        df_view_inj.rename(columns={"Consumo kWh": "Injetado kWh"}, inplace=True)
     else:
-        df_view_inj = pd.DataFrame(columns=["Referência", "Injetado kWh"])
-
-    # 3. Merge (Consumo + Injeção)
-    df_merged = pd.merge(
-        df_view_cons, df_view_inj, on="Referência", how="outer"
-    ).fillna(0)
+        df_merged["N° Dias"] = 0
 
-    # Ordenação Cronológica
-    try:
-        df_merged["Data_Ordenacao"] = pd.to_datetime(
-            df_merged["Referência"], format="%b/%Y", errors="coerce"
-        )
-        df_merged = df_merged.sort_values("Data_Ordenacao")
-    except:
-        pass
+    # Ordenação Cronológica (pela chave de Período AAAAMM)
+    df_merged = sort_by_period(df_merged)
 
     # Cálculos Derivados
     df_merged["Média Diária (kWh)"] = df_merged["Consumo kWh"] / df_merged["N° Dias"]
@@ -85,9 +67,6 @@ def render_consumption_dashboard(df_medicao, df_faturas):
     # --- 2. CÁLCULO DE EFICIÊNCIA (R$/kWh) ---
     # Cruzamos com o financeiro para saber quanto custou cada kWh naquele mês
     if not df_faturas.empty:
-        df_fin_agg = df_faturas.groupby("Referência")["Valor (R$)"].sum().reset_index()
-        df_merged = pd.merge(df_merged, df_fin_agg, on="Referência", how="left")
-
         # Cálculo do Custo Efetivo (Conta Total / Total kWh)
         # Evita divisão por zero
         df_merged["Custo Médio (R$/kWh)"] = df_merged.apply(
@@ -98,7 +77,9 @@ def render_consumption_dashboard(df_medicao, df_faturas):
         # --- MELHORIA: TARIFA CHEIA PARA SOLAR ---
         if "Preço unit (R$) com tributos" in df_faturas.columns:
             df_tarifa = (
-                df_faturas.groupby("Referência")["Preço unit (R$) com tributos"]
+                df_faturas.groupby("Referência", observed=True)[
+                    "Preço unit (R$) com tributos"
+                ]
                 .max()
                 .reset_index()
             )
@@ -241,20 +222,16 @@ def render_consumption_dashboard(df_medicao, df_faturas):
 
     # B. Comparativo Sazonal (Ano x Ano)
     with c_sazonal:
-        if not df_merged.empty and "Data_Ordenacao" in df_merged.columns:
+        if not df_merged.empty and PERIOD_COL in df_merged.columns:
             last_row = df_merged.iloc[-1]
             try:
-                data_atual = last_row["Data_Ordenacao"]
-                if pd.notnull(data_atual):
-                    # Busca mesmo mês no ano anterior
-                    target_year = data_atual.year - 1
-                    target_month = data_atual.month
-
-                    # Filtra no DataFrame
-                    match = df_merged[
-                        (df_merged["Data_Ordenacao"].dt.year == target_year)
-                        & (df_merged["Data_Ordenacao"].dt.month == target_month)
-                    ]
+                periodo_atual = last_row[PERIOD_COL]
+                if pd.notnull(periodo_atual):
+                    # Busca mesmo mês no ano anterior (AAAAMM - 100)
+                    periodo_alvo = int(periodo_atual) - 100
+
+                    # Recorte por intervalo na tabela ordenada
+                    match = slice_periods(df_merged, periodo_alvo, periodo_alvo)
 
                     if not match.empty:
                         ant_row = match.iloc[0]
@@ -275,7 +252,7 @@ def render_consumption_dashboard(df_medicao, df_faturas):
                         )
                     else:
                         st.info(
-                            f"📅 **Sazonalidade:** Sem dados de {target_month}/{target_year} para comparação anual."
+                            f"📅 **Sazonalidade:** Sem dados de {period_label(periodo_alvo)} para comparação anual."
                         )
             except Exception:
                 st.write("---")
@@ -2,6 +2,8 @@ import streamlit as st
 import pandas as pd
 import plotly.express as px
 
+from src.database.schema import sort_by_period
+
 
 def render_financial_flow(df_fin_view):
     """
@@ -22,7 +24,11 @@ def render_financial_flow(df_fin_view):
     if "PIS/COFINS" in df_fin_view.columns:
         agg_dict["PIS/COFINS"] = "sum"
 
-    df_fat = df_fin_view.groupby("Itens de Fatura").agg(agg_dict).reset_index()
+    df_fat = (
+        df_fin_view.groupby("Itens de Fatura", observed=True)
+        .agg(agg_dict)
+        .reset_index()
+    )
 
     # 2. Define Tipo (Despesa vs Economia) e Cores
     # Valores positivos são Cobranças (Despesa) -> Vermelho
@@ -154,16 +160,14 @@ def render_financial_flow(df_fin_view):
     st.markdown("### 📈 Evolução do Valor da Conta")
 
     # Agrupa por mês para a linha principal
-    df_evolucao = df_fin_view.groupby("Referência")["Valor (R$)"].sum().reset_index()
+    df_evolucao = (
+        df_fin_view.groupby("Referência", observed=True)["Valor (R$)"]
+        .sum()
+        .reset_index()
+    )
 
-    # Ordenação Cronológica
-    try:
-        df_evolucao["Data_Ordenacao"] = pd.to_datetime(
-            df_evolucao["Referência"], format="%b/%Y", errors="coerce"
-        )
-        df_evolucao = df_evolucao.sort_values("Data_Ordenacao")
-    except Exception:
-        pass
+    # Ordenação Cronológica (pela chave de Período AAAAMM)
+    df_evolucao = sort_by_period(df_evolucao)
 
     if not df_evolucao.empty:
         # Identifica meses com Bandeira Vermelha nos itens originais
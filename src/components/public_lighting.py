@@ -2,6 +2,9 @@ import streamlit as st
 import pandas as pd
 import plotly.express as px
 
+from src.database.schema import MONEY_SCALE, sort_by_period, to_cents
+from src.database.summary import by_month, summarize_months
+
 # --- IMPORTAÇÃO DE REGRAS (Com Fallback) ---
 try:
     from src.config.tax_rules import (
@@ -24,7 +27,7 @@ except ImportError:
     CURRENT_BASE_RATE = 111.05
 
 
-def render_public_lighting(df_fin_view, df_med_view):
+def render_public_lighting(df_fin_view, df_med_view, df_resumo=None):
     st.subheader("🔦 Auditoria Avançada de Iluminação Pública")
 
     # 1. Cabeçalho Legal
@@ -66,24 +69,18 @@ def render_public_lighting(df_fin_view, df_med_view):
         st.info("Sem dados financeiros para analisar.")
         return
 
-    # Filtra CIP
-    mask_ilum = (
-        df_fin_view["Itens de Fatura"]
-        .astype(str)
-        .str.contains("ILUM|CIP|PUB", case=False, na=False)
-    )
-    if not mask_ilum.any():
+    # CIP paga e Consumo (sem a energia injetada) por mês, do resumo mensal
+    if df_resumo is None:
+        df_resumo = summarize_months(df_fin_view, df_med_view)
+    df_mensal = by_month(df_resumo, ["CIP (R$)", "Consumo kWh"])
+
+    df_cip = df_mensal[df_mensal["CIP (R$)"] != 0]
+    if df_cip.empty:
         st.warning(
             "⚠️ Não foram encontradas cobranças de Iluminação Pública (CIP) nas faturas filtradas."
         )
         return
 
-    # Prepara Dados Financeiros
-    df_cip = (
-        df_fin_view[mask_ilum].groupby("Referência")["Valor (R$)"].sum().reset_index()
-    )
-    df_cip.rename(columns={"Valor (R$)": "R$ Pago"}, inplace=True)
-
     # Prepara Dados de Consumo (Resiliência)
     if df_med_view.empty or "Consumo kWh" not in df_med_view.columns:
         st.error(
@@ -91,24 +88,14 @@ def render_public_lighting(df_fin_view, df_med_view):
         )
         return
 
-    # Filtra Injetada se houver (para não somar geração solar como consumo)
-    if "P.Horário/Segmento" in df_med_view.columns:
-        mask_inj = (
-            df_med_view["P.Horário/Segmento"]
-            .astype(str)
-            .str.contains("INJ|Gera|Injetada", case=False, na=False)
-        )
-        df_cons = (
-            df_med_view[~mask_inj]
-            .groupby("Referência")["Consumo kWh"]
-            .sum()
-            .reset_index()
+    # Cruzamento só com os meses medidos, em ordem cronológica pela chave de
+    # Período (AAAAMM): gráficos e tabelas abaixo herdam essa ordem
+    meses_medidos = df_med_view["Referência"].astype(str).unique()
+    df_audit = sort_by_period(
+        df_cip[df_cip["Referência"].astype(str).isin(meses_medidos)].rename(
+            columns={"CIP (R$)": "R$ Pago"}
         )
-    else:
-        df_cons = df_med_view.groupby("Referência")["Consumo kWh"].sum().reset_index()
-
-    # Merge (Cruzamento)
-    df_audit = pd.merge(df_cip, df_cons, on="Referência", how="inner")
+    )
 
     if df_audit.empty:
         st.warning(
@@ -132,9 +119,11 @@ def render_public_lighting(df_fin_view, df_med_view):
         axis=1,
     )
 
-    df_audit["Desvio"] = df_audit["R$ Pago"] - df_audit["R$ Lei"]
-    df_audit["Veredito"] = df_audit["Desvio"].apply(
-        lambda x: "🔴 Acima" if x > 0.10 else ("🟢 Abaixo" if x < -0.10 else "✅ OK")
+    # Desvio em centavos: a tolerância de R$ 0,10 é comparada sem erro de float
+    desvio = to_cents(df_audit["R$ Pago"]) - to_cents(df_audit["R$ Lei"])
+    df_audit["Desvio"] = desvio / MONEY_SCALE
+    df_audit["Veredito"] = pd.Series(desvio, index=df_audit.index).apply(
+        lambda x: "🔴 Acima" if x > 10 else ("🟢 Abaixo" if x < -10 else "✅ OK")
     )
 
     # Diferença de Alíquota para análise
@@ -234,15 +223,6 @@ def render_public_lighting(df_fin_view, df_med_view):
             value_name="Alíquota (%)",
         )
 
-        # Ordenação Cronológica
-        try:
-            df_melted_aliq["Data_Ordenacao"] = pd.to_datetime(
-                df_melted_aliq["Referência"], format="%b/%Y", errors="coerce"
-            )
-            df_melted_aliq = df_melted_aliq.sort_values("Data_Ordenacao")
-        except Exception:
-            pass
-
         fig_aliq = px.line(
             df_melted_aliq,
             x="Referência",
@@ -270,15 +250,6 @@ def render_public_lighting(df_fin_view, df_med_view):
             out_df["Real"] = out_df["Alíquota paga"].map("{:.2f}%".format)
             out_df["Diff"] = out_df["Diff Alíquota"].map("{:+.2f}%".format)
 
-            # Ordenação
-            try:
-                out_df["_dt"] = pd.to_datetime(
-                    out_df["Referência"], format="%b/%Y", errors="coerce"
-                )
-                out_df = out_df.sort_values("_dt")
-            except:
-                pass
-
             st.dataframe(
                 out_df[["Referência", "Consumo", "Lei", "Real", "Diff"]],
                 width="stretch",
@@ -0,0 +1,467 @@
+"""
+Backend DuckDB do banco de faturas (alternativa ao dataset Parquet).
+
+Selecionado com a variável de ambiente ENEL_DB_BACKEND=duckdb; o padrão
+continua sendo o Parquet particionado de manager.py. As funções públicas do
+manager (init_db, save_data, load_data, list_clients, list_years,
+load_summary, clear_data) delegam para cá e cuidam de travas e cache.
+
+Tabelas em um único arquivo (data/database/enel.duckdb):
+- faturas: chave primária (Cliente, Referência, Itens de Fatura, _ocorrencia);
+- medicao: chave primária (Cliente, Referência, P.Horário/Segmento, _ocorrencia);
+- resumo_mensal: chave primária (Cliente, Referência), recalculada a cada
+  upsert só para as faturas do lote (ver summary.py).
+As tabelas de itens têm índices por Cliente e por Período. A `_ocorrencia`
+numera itens repetidos na mesma fatura (ex.: duas linhas de bandeira com o
+mesmo nome) e `_linha` guarda a ordem original dos itens.
+
+Colunas de chave primária não aceitam nulo: cliente desconhecido é gravado
+como 0 e volta como nulo na leitura. Valores em R$ são DECIMAL(18,2) e as
+tarifas DECIMAL(18,8): inteiros escalados no DuckDB, com somas exatas, como
+os centavos do backend Parquet (schema.SCALED_COLUMNS).
+
+O banco começa vazio ao trocar de backend; `python main.py --reparse`
+o repovoa a partir do texto de layout armazenado.
+"""
+
+try:
+    import duckdb
+except ImportError:  # Dependência opcional: só exigida com ENEL_DB_BACKEND=duckdb
+    duckdb = None
+
+# Erros do backend tratados como falha de gravação (sem o pacote: ImportError)
+ERRORS = (ImportError,) if duckdb is None else (ImportError, duckdb.Error)
+
+import pyarrow as pa
+
+from src.database.schema import (
+    CLIENT_COL,
+    PERIOD_COL,
+    REFERENCE_COL,
+    apply_schema,
+    table_to_frame,
+    to_storage,
+)
+from src.database.summary import (
+    INJECTED_PATTERN,
+    PUBLIC_LIGHTING_PATTERN,
+    SUMMARY_COLUMNS,
+)
+
+FATURAS = "faturas"
+MEDICAO = "medicao"
+OCCURRENCE_COL = "_ocorrencia"
+LINE_COL = "_linha"
+UNKNOWN_CLIENT = 0
+
+# Coluna de item de cada tabela (parte da chave primária)
+ITEM_COLUMNS = {FATURAS: "Itens de Fatura", MEDICAO: "P.Horário/Segmento"}
+
+_KEY_TYPES = [
+    (CLIENT_COL, "BIGINT"),
+    (REFERENCE_COL, "VARCHAR"),
+    (PERIOD_COL, "INTEGER"),
+]
+_HIDDEN_TYPES = [(OCCURRENCE_COL, "INTEGER"), (LINE_COL, "INTEGER")]
+MONEY_TYPE = "DECIMAL(18,2)"
+TARIFF_TYPE = "DECIMAL(18,8)"
+TABLE_COLUMNS = {
+    FATURAS: _KEY_TYPES
+    + [
+        ("Itens de Fatura", "VARCHAR"),
+        ("Unid.", "VARCHAR"),
+        ("Quant.", "DOUBLE"),
+        ("Preço unit (R$) com tributos", TARIFF_TYPE),
+        ("Valor (R$)", MONEY_TYPE),
+        ("PIS/COFINS", MONEY_TYPE),
+        ("Base Calc ICMS (R$)", MONEY_TYPE),
+        ("Alíquota ICMS", "DOUBLE"),
+        ("ICMS", MONEY_TYPE),
+        ("Tarifa unit (R$)", TARIFF_TYPE),
+    ]
+    + _HIDDEN_TYPES,
+    MEDICAO: _KEY_TYPES
+    + [
+        ("N° Medidor", "VARCHAR"),
+        ("P.Horário/Segmento", "VARCHAR"),
+        ("Data Leitura (Anterior)", "TIMESTAMP"),
+        ("Leitura (Anterior)", "DOUBLE"),
+        ("Data Leitura (Atual)", "TIMESTAMP"),
+        ("Leitura (Atual)", "DOUBLE"),
+        ("Fator Multiplicador", "DOUBLE"),
+        ("Consumo kWh", "DOUBLE"),
+        ("N° Dias", "DOUBLE"),
+    ]
+    + _HIDDEN_TYPES,
+}
+
+
+# Resumo mensal materializado: uma linha por fatura, atualizado em upsert()
+SUMMARY_TABLE = "resumo_mensal"
+SUMMARY_TYPES = _KEY_TYPES + [
+    ("Valor (R$)", MONEY_TYPE),
+    ("Consumo kWh", "DOUBLE"),
+    ("Injetado kWh", "DOUBLE"),
+    ("CIP (R$)", MONEY_TYPE),
+    ("ICMS", MONEY_TYPE),
+    ("PIS/COFINS", MONEY_TYPE),
+    ("Qtd. Itens", "BIGINT"),
+]
+
+
+# Tipos Arrow dos dados registrados para o INSERT (o DuckDB arredonda os
+# valores em reais para os decimais das colunas ao gravar)
+_ARROW_TYPES = {
+    "BIGINT": pa.int64(),
+    "INTEGER": pa.int32(),
+    "VARCHAR": pa.string(),
+    "DOUBLE": pa.float64(),
+    MONEY_TYPE: pa.float64(),
+    TARIFF_TYPE: pa.float64(),
+    "TIMESTAMP": pa.timestamp("us"),
+}
+
+
+def _q(name):
+    """Identificador entre aspas (as colunas têm espaços, acentos e parênteses)."""
+    return '"' + name.replace('"', '""') + '"'
+
+
+def _primary_key(table):
+    return [CLIENT_COL, REFERENCE_COL, ITEM_COLUMNS[table], OCCURRENCE_COL]
+
+
+def connect(path, read_only=False):
+    """Abre o arquivo do banco. Feche a conexão ao terminar (uso curto, sob a trava)."""
+    if duckdb is None:
+        raise ImportError(
+            "ENEL_DB_BACKEND=duckdb requer o pacote 'duckdb' (pip install duckdb)."
+        )
+    return duckdb.connect(path, read_only=read_only)
+
+
+def init_db(path):
+    """Cria as tabelas e os índices que faltarem."""
+    con = connect(path)
+    try:
+        con.execute("BEGIN TRANSACTION")
+        _migrate_money_columns(con)
+        for table in TABLE_COLUMNS:
+            con.execute(_create_table(table))
+            con.execute(
+                f"CREATE INDEX IF NOT EXISTS idx_{table}_cliente "
+                f"ON {table} ({_q(CLIENT_COL)})"
+            )
+            con.execute(
+                f"CREATE INDEX IF NOT EXISTS idx_{table}_periodo "
+                f"ON {table} ({_q(PERIOD_COL)})"
+            )
+
+        definition = ", ".join(f"{_q(name)} {kind}" for name, kind in SUMMARY_TYPES)
+        con.execute(
+            f"CREATE TABLE IF NOT EXISTS {SUMMARY_TABLE} ({definition}, "
+            f"PRIMARY KEY ({_q(CLIENT_COL)}, {_q(REFERENCE_COL)}))"
+        )
+        # Banco criado antes do resumo existir: preenche a partir dos itens
+        (missing,) = con.execute(
+            f"SELECT NOT EXISTS (FROM {SUMMARY_TABLE}) "
+            f"AND (EXISTS (FROM {FATURAS}) OR EXISTS (FROM {MEDICAO}))"
+        ).fetchone()
+        if missing:
+            con.execute(f"INSERT INTO {SUMMARY_TABLE} BY NAME {_summary_select()}")
+        con.execute("COMMIT")
+    finally:
+        con.close()
+
+
+def _create_table(table, name=None):
+    definition = ", ".join(f"{_q(c)} {kind}" for c, kind in TABLE_COLUMNS[table])
+    pk = ", ".join(_q(c) for c in _primary_key(table))
+    return (
+        f"CREATE TABLE IF NOT EXISTS {name or table} ({definition}, PRIMARY KEY ({pk}))"
+    )
+
+
+def _migrate_money_columns(con):
+    """
+    Bancos criados com R$ em DOUBLE: recria as tabelas com os decimais (o
+    DuckDB não altera o tipo de colunas de tabelas com índice). O resumo é
+    descartado e preenchido de novo a partir dos itens em init_db.
+    """
+    (legacy,) = con.execute(
+        "SELECT count(*) FROM information_schema.columns "
+        "WHERE table_name = ? AND column_name = 'Valor (R$)' AND data_type = 'DOUBLE'",
+        [FATURAS],
+    ).fetchone()
+    if not legacy:
+        return
+
+    for table in TABLE_COLUMNS:
+        con.execute(_create_table(table, name=f"{table}_novo"))
+        con.execute(f"INSERT INTO {table}_novo BY NAME SELECT * FROM {table}")
+        con.execute(f"DROP TABLE {table}")
+        con.execute(f"ALTER TABLE {table}_novo RENAME TO {table}")
+    con.execute(f"DROP TABLE IF EXISTS {SUMMARY_TABLE}")
+
+
+def _to_arrow(df, table):
+    """DataFrame do extrator nas colunas da tabela, com as chaves preenchidas."""
+    names = [c for c, _ in TABLE_COLUMNS[table]]
+    item_col = ITEM_COLUMNS[table]
+    # Colunas ausentes entram vazias e ganham o tipo do esquema
+    df = to_storage(apply_schema(df.reindex(columns=names)))[names]
+
+    df[CLIENT_COL] = df[CLIENT_COL].fillna(UNKNOWN_CLIENT).astype("int64")
+    for col in (REFERENCE_COL, item_col):
+        df[col] = df[col].fillna("").astype(str)
+
+    df[LINE_COL] = df.groupby([CLIENT_COL, REFERENCE_COL]).cumcount()
+    df[OCCURRENCE_COL] = df.groupby([CLIENT_COL, REFERENCE_COL, item_col]).cumcount()
+
+    schema = pa.schema(
+        [(name, _ARROW_TYPES[kind]) for name, kind in TABLE_COLUMNS[table]]
+    )
+    return pa.Table.from_pandas(df, schema=schema, preserve_index=False)
+
+
+def upsert(path, df_financeiro, df_medicao):
+    """
+    Grava as faturas do lote numa única transação. Cada fatura (Cliente +
+    Referência) substitui a anterior: linhas com a mesma chave primária são
+    atualizadas (INSERT OR REPLACE) e itens que sumiram da nova versão são
+    apagados. O resumo mensal dessas faturas é recalculado na mesma transação.
+    """
+    touched = []
+    con = connect(path)
+    try:
+        con.execute("BEGIN TRANSACTION")
+        for table, df in ((FATURAS, df_financeiro), (MEDICAO, df_medicao)):
+            if df.empty:
+                continue
+            rows = _to_arrow(df, table)
+            touched.append(rows.select([CLIENT_COL, REFERENCE_COL]))
+            con.register("novo", rows)
+
+            pk = _primary_key(table)
+            invoice = " AND ".join(f"t.{_q(c)} = n.{_q(c)}" for c in pk[:2])
+            same_row = " AND ".join(f"n.{_q(c)} = t.{_q(c)}" for c in pk)
+            con.execute(
+                f"DELETE FROM {table} t "
+                f"WHERE EXISTS (SELECT 1 FROM novo n WHERE {invoice}) "
+                f"AND NOT EXISTS (SELECT 1 FROM novo n WHERE {same_row})"
+            )
+            con.execute(f"INSERT OR REPLACE INTO {table} BY NAME SELECT * FROM novo")
+            con.unregister("novo")
+
+        if touched:
+            con.register("tocadas", pa.concat_tables(touched))
+            _refresh_summary(con, "tocadas")
+            con.unregister("tocadas")
+        con.execute("COMMIT")
+    except Exception:
+        con.execute("ROLLBACK")
+        raise
+    finally:
+        con.close()
+
+
+def _fetch_arrow(con, sql, params):
+    """Resultado da consulta como tabela Arrow (nome do método mudou no duckdb 1.4)."""
+    result = con.execute(sql, params)
+    if hasattr(result, "to_arrow_table"):
+        return result.to_arrow_table()
+    return result.fetch_arrow_table()
+
+
+def _where(client=None, years=None, references=None, periods=None):
+    """Cláusula WHERE e parâmetros equivalentes a manager._build_filter."""
+    conditions, params = [], []
+    if client is not None:
+        conditions.append(f"{_q(CLIENT_COL)} = ?")
+        params.append(int(client))
+    if years is not None:
+        years = [int(y) for y in years]
+        conditions.append(
+            f"{_q(PERIOD_COL)} // 100 IN ({', '.join('?' * len(years))})"
+            if years
+            else "FALSE"
+        )
+        params.extend(years)
+    if references is not None:
+        references = [str(r) for r in references]
+        conditions.append(
+            f"{_q(REFERENCE_COL)} IN ({', '.join('?' * len(references))})"
+            if references
+            else "FALSE"
+        )
+        params.extend(references)
+    if periods is not None:
+        start, end = periods
+        if start is not None:
+            conditions.append(f"{_q(PERIOD_COL)} >= ?")
+            params.append(int(start))
+        if end is not None:
+            conditions.append(f"{_q(PERIOD_COL)} <= ?")
+            params.append(int(end))
+
+    if not conditions:
+        return "", params
+    return "WHERE " + " AND ".join(conditions), params
+
+
+def _select_list(table, columns):
+    """Colunas lidas: as pedidas que existem na tabela, com o cliente nulo de volta."""
+    names = [c for c, _ in TABLE_COLUMNS[table] if c not in (OCCURRENCE_COL, LINE_COL)]
+    if columns is None:
+        # Mesma ordem do backend Parquet: cliente por último
+        names = [c for c in names if c != CLIENT_COL] + [CLIENT_COL]
+    else:
+        names = [c for c in columns if c in names]
+
+    select = []
+    for name in names:
+        if name == CLIENT_COL:
+            select.append(
+                f"NULLIF({_q(CLIENT_COL)}, {UNKNOWN_CLIENT}) AS {_q(CLIENT_COL)}"
+            )
+        else:
+            select.append(_q(name))
+    return ", ".join(select) or "NULL AS _vazio"
+
+
+def load(path, columns=None, client=None, years=None, references=None, periods=None):
+    """Lê as duas tabelas com os filtros empurrados para o SQL, ordenadas por (Cliente, Período)."""
+    where, params = _where(client, years, references, periods)
+    order = (
+        f"ORDER BY {_q(CLIENT_COL)} = {UNKNOWN_CLIENT}, {_q(CLIENT_COL)}, "
+        f"{_q(PERIOD_COL)} NULLS LAST, {_q(REFERENCE_COL)}, {_q(LINE_COL)}"
+    )
+
+    frames = []
+    con = connect(path, read_only=True)
+    try:
+        for table in (FATURAS, MEDICAO):
+            sql = f"SELECT {_select_list(table, columns)} FROM {table} {where} {order}"
+            df = table_to_frame(_fetch_arrow(con, sql, params))
+            if "_vazio" in df.columns:
+                df = df.drop(columns="_vazio")
+            if columns is not None:
+                df = df.reindex(columns=columns)
+            frames.append(df.reset_index(drop=True))
+    finally:
+        con.close()
+    return frames[0], frames[1]
+
+
+def list_clients(path):
+    con = connect(path, read_only=True)
+    try:
+        rows = con.execute(
+            f"SELECT DISTINCT {_q(CLIENT_COL)} FROM {FATURAS} "
+            f"WHERE {_q(CLIENT_COL)} <> {UNKNOWN_CLIENT} ORDER BY 1"
+        ).fetchall()
+    finally:
+        con.close()
+    return [row[0] for row in rows]
+
+
+def list_years(path, client=None):
+    where, params = _where(client=client)
+    where = f"{where} AND" if where else "WHERE"
+    con = connect(path, read_only=True)
+    try:
+        rows = con.execute(
+            f"SELECT DISTINCT {_q(PERIOD_COL)} // 100 FROM {FATURAS} "
+            f"{where} {_q(PERIOD_COL)} IS NOT NULL ORDER BY 1",
+            params,
+        ).fetchall()
+    finally:
+        con.close()
+    return [int(row[0]) for row in rows]
+
+
+def _summary_select(where=""):
+    """
+    SELECT do resumo mensal (summary.SUMMARY_COLUMNS) sobre as tabelas de
+    itens; `where` restringe as linhas lidas (ex.: só as faturas tocadas).
+    """
+    keys = f"{_q(CLIENT_COL)}, {_q(REFERENCE_COL)}"
+    return f"""
+        WITH fin AS (
+            SELECT {keys}, ANY_VALUE({_q(PERIOD_COL)}) AS {_q(PERIOD_COL)},
+                   SUM("Valor (R$)") AS "Valor (R$)",
+                   SUM(CASE WHEN regexp_matches("Itens de Fatura",
+                                                '{PUBLIC_LIGHTING_PATTERN}', 'i')
+                            THEN "Valor (R$)" ELSE 0 END) AS "CIP (R$)",
+                   SUM("ICMS") AS "ICMS",
+                   SUM("PIS/COFINS") AS "PIS/COFINS",
+                   COUNT(*) AS "Qtd. Itens"
+            FROM {FATURAS} t {where}
+            GROUP BY {keys}
+        ),
+        med AS (
+            SELECT {keys}, ANY_VALUE({_q(PERIOD_COL)}) AS {_q(PERIOD_COL)},
+                   SUM(CASE WHEN regexp_matches("P.Horário/Segmento",
+                                                '{INJECTED_PATTERN}', 'i')
+                            THEN 0 ELSE "Consumo kWh" END) AS "Consumo kWh",
+                   SUM(CASE WHEN regexp_matches("P.Horário/Segmento",
+                                                '{INJECTED_PATTERN}', 'i')
+                            THEN "Consumo kWh" ELSE 0 END) AS "Injetado kWh"
+            FROM {MEDICAO} t {where}
+            GROUP BY {keys}
+        )
+        SELECT {keys},
+               COALESCE(fin.{_q(PERIOD_COL)}, med.{_q(PERIOD_COL)}) AS {_q(PERIOD_COL)},
+               COALESCE(fin."Valor (R$)", 0) AS "Valor (R$)",
+               COALESCE(med."Consumo kWh", 0) AS "Consumo kWh",
+               COALESCE(med."Injetado kWh", 0) AS "Injetado kWh",
+               COALESCE(fin."CIP (R$)", 0) AS "CIP (R$)",
+               COALESCE(fin."ICMS", 0) AS "ICMS",
+               COALESCE(fin."PIS/COFINS", 0) AS "PIS/COFINS",
+               COALESCE(fin."Qtd. Itens", 0) AS "Qtd. Itens"
+        FROM fin FULL OUTER JOIN med USING ({keys})
+    """
+
+
+def _refresh_summary(con, touched):
+    """
+    Recalcula no resumo só as faturas (Cliente + Referência) do lote.
+    `touched` é uma tabela registrada na conexão com essas duas colunas.
+    """
+    match = " AND ".join(f"k.{_q(c)} = t.{_q(c)}" for c in (CLIENT_COL, REFERENCE_COL))
+    only_touched = f"WHERE EXISTS (SELECT 1 FROM {touched} k WHERE {match})"
+    con.execute(f"DELETE FROM {SUMMARY_TABLE} t {only_touched}")
+    con.execute(f"INSERT INTO {SUMMARY_TABLE} BY NAME {_summary_select(only_touched)}")
+
+
+def monthly_summary(path, client=None, years=None, periods=None):
+    """
+    Lê o resumo mensal materializado (uma linha por fatura), com os filtros
+    de load(); não toca nas tabelas de itens.
+    """
+    where, params = _where(client=client, years=years, periods=periods)
+    columns = ", ".join(
+        f"NULLIF({_q(c)}, {UNKNOWN_CLIENT}) AS {_q(c)}" if c == CLIENT_COL else _q(c)
+        for c in SUMMARY_COLUMNS
+    )
+    sql = (
+        f"SELECT {columns} FROM {SUMMARY_TABLE} {where} "
+        f"ORDER BY {_q(CLIENT_COL)} = {UNKNOWN_CLIENT}, {_q(CLIENT_COL)}, "
+        f"{_q(PERIOD_COL)} NULLS LAST"
+    )
+    con = connect(path, read_only=True)
+    try:
+        table = _fetch_arrow(con, sql, params)
+    finally:
+        con.close()
+    return table_to_frame(table)[SUMMARY_COLUMNS]
+
+
+def clear(path):
+    """Apaga todas as linhas, mantendo tabelas e índices."""
+    con = connect(path)
+    try:
+        for table in (*TABLE_COLUMNS, SUMMARY_TABLE):
+            con.execute(f"DELETE FROM {table}")
+    finally:
+        con.close()
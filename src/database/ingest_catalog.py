@@ -0,0 +1,125 @@
+"""
+Catálogo de ingestão: o que o processamento em lote já fez com cada PDF.
+
+Uma tabela SQLite com, por caminho de arquivo: tamanho, mtime, hash do
+conteúdo, versão do extrator, status do processamento e erro. O main.py
+consulta o catálogo antes de abrir qualquer arquivo e só processa:
+- arquivos novos, ou com tamanho/mtime diferentes do registrado;
+- arquivos processados por outra versão do extrator;
+- arquivos cujo último processamento terminou em erro (RETRY_STATUSES).
+
+Sucessos só são registrados depois que o lote foi gravado no banco: se a
+execução cair no meio, os arquivos do lote não gravado ficam fora do
+catálogo (ou com o registro anterior) e são refeitos na próxima execução.
+O catálogo mora junto do banco e é apagado com ele (clear_data).
+"""
+
+import os
+import sqlite3
+import time
+
+# --- CONFIGURAÇÃO ---
+CATALOG_FILE = "data/database/_ingest.sqlite"
+
+STATUS_ERROR = "error"  # Exceção na extração ou falha ao gravar no banco
+# Status refeitos em toda execução; os demais (sucesso, sem senha, vazio,
+# inválido...) só quando o arquivo ou o extrator mudam
+RETRY_STATUSES = (STATUS_ERROR,)
+
+_SCHEMA = """
+CREATE TABLE IF NOT EXISTS arquivos (
+    caminho TEXT PRIMARY KEY,
+    tamanho INTEGER NOT NULL,
+    mtime_ns INTEGER NOT NULL,
+    hash TEXT,
+    versao_extrator TEXT NOT NULL,
+    status TEXT NOT NULL,
+    erro TEXT,
+    atualizado_em TEXT NOT NULL
+)
+"""
+
+
+def _connect():
+    os.makedirs(os.path.dirname(CATALOG_FILE) or ".", exist_ok=True)
+    con = sqlite3.connect(CATALOG_FILE, timeout=30)
+    # WAL: cada registro é durável sem reescrever o arquivo inteiro
+    con.execute("PRAGMA journal_mode=WAL")
+    con.execute(_SCHEMA)
+    return con
+
+
+def _key(path):
+    return os.path.abspath(path)
+
+
+def file_stat(path):
+    """(tamanho, mtime em ns) do arquivo: a assinatura usada para detectar mudanças."""
+    stat = os.stat(path)
+    return stat.st_size, stat.st_mtime_ns
+
+
+def select_pending(paths, version):
+    """
+    Filtra `paths` pelos arquivos que precisam ser processados com o extrator
+    `version`. Retorna um dict {caminho: (tamanho, mtime_ns)}, na ordem de
+    entrada; a assinatura deve ser repassada a `record`.
+    """
+    if not os.path.exists(CATALOG_FILE):
+        return {path: file_stat(path) for path in paths}
+
+    con = _connect()
+    try:
+        known = {
+            row[0]: row[1:]
+            for row in con.execute(
+                "SELECT caminho, tamanho, mtime_ns, versao_extrator, status "
+                "FROM arquivos"
+            )
+        }
+    finally:
+        con.close()
+
+    pending = {}
+    for path in paths:
+        stat = file_stat(path)
+        entry = known.get(_key(path))
+        if (
+            entry is None
+            or entry[:2] != stat
+            or entry[2] != str(version)
+            or entry[3] in RETRY_STATUSES
+        ):
+            pending[path] = stat
+    return pending
+
+
+def record(rows, version):
+    """
+    Registra o resultado de arquivos processados, numa única transação.
+    `rows`: iterável de (caminho, (tamanho, mtime_ns), status, hash, erro).
+    """
+    now = time.strftime("%Y-%m-%dT%H:%M:%S")
+    values = [
+        (_key(path), size, mtime_ns, digest, str(version), status, error, now)
+        for path, (size, mtime_ns), status, digest, error in rows
+    ]
+    if not values:
+        return
+
+    con = _connect()
+    try:
+        with con:
+            con.executemany(
+                "INSERT OR REPLACE INTO arquivos VALUES (?, ?, ?, ?, ?, ?, ?, ?)",
+                values,
+            )
+    finally:
+        con.close()
+
+
+def clear():
+    """Apaga o catálogo (o próximo lote reprocessa todos os arquivos)."""
+    for suffix in ("", "-wal", "-shm"):
+        if os.path.exists(CATALOG_FILE + suffix):
+            os.remove(CATALOG_FILE + suffix)
@@ -0,0 +1,88 @@
+"""
+Trava de arquivo entre processos para o banco Parquet.
+
+Escritores (save_data, main.py, migrações) pegam a trava exclusiva durante
+todo o ciclo ler-modificar-gravar; leitores pegam a trava compartilhada,
+então nunca enxergam um lote aplicado pela metade. A trava é reentrante na
+mesma thread: um commit pode chamar init_db() sem se bloquear.
+
+POSIX usa fcntl.flock; no Windows, msvcrt.locking (sem modo compartilhado,
+então leitores também ficam exclusivos).
+"""
+
+import os
+import threading
+import time
+from contextlib import contextmanager
+
+try:
+    import fcntl
+except ImportError:  # Windows
+    fcntl = None
+    import msvcrt
+
+LOCK_TIMEOUT = 120  # Segundos esperando a trava antes de desistir
+_POLL_INTERVAL = 0.05
+
+_held = threading.local()  # caminho -> (modo, profundidade) desta thread
+
+
+def _try_lock(fh, shared):
+    try:
+        if fcntl is not None:
+            mode = fcntl.LOCK_SH if shared else fcntl.LOCK_EX
+            fcntl.flock(fh.fileno(), mode | fcntl.LOCK_NB)
+        else:
+            fh.seek(0)
+            msvcrt.locking(fh.fileno(), msvcrt.LK_NBLCK, 1)
+        return True
+    except OSError:
+        return False
+
+
+def _unlock(fh):
+    if fcntl is not None:
+        fcntl.flock(fh.fileno(), fcntl.LOCK_UN)
+    else:
+        fh.seek(0)
+        msvcrt.locking(fh.fileno(), msvcrt.LK_UNLCK, 1)
+
+
+@contextmanager
+def file_lock(path, shared=False, timeout=None):
+    """
+    Segura a trava de `path` (criado se não existir) enquanto o bloco roda.
+    Levanta TimeoutError se não conseguir em `timeout` segundos.
+    """
+    held = getattr(_held, "locks", None)
+    if held is None:
+        held = _held.locks = {}
+
+    key = os.path.abspath(path)
+    if key in held:
+        mode, depth = held[key]
+        if mode == "shared" and not shared:
+            raise RuntimeError("Trava compartilhada não pode virar exclusiva.")
+        held[key] = (mode, depth + 1)
+        try:
+            yield
+        finally:
+            held[key] = (mode, depth)
+        return
+
+    timeout = LOCK_TIMEOUT if timeout is None else timeout
+    os.makedirs(os.path.dirname(key), exist_ok=True)
+    # O arquivo fecha (liberando o descritor) mesmo se a trava falhar ou expirar
+    with open(key, "a+") as fh:
+        deadline = time.monotonic() + timeout
+        while not _try_lock(fh, shared):
+            if time.monotonic() >= deadline:
+                raise TimeoutError(f"Banco ocupado: trava {path} não liberada.")
+            time.sleep(_POLL_INTERVAL)
+
+        held[key] = ("shared" if shared else "exclusive", 1)
+        try:
+            yield
+        finally:
+            del held[key]
+            _unlock(fh)
@@ -1,114 +1,1274 @@
-import pandas as pd
 import os
+import shutil
+import threading
+import time
+from collections import OrderedDict
+from urllib.parse import quote, unquote
+
+import pandas as pd
+import pyarrow as pa
+import pyarrow.compute as pc
+import pyarrow.dataset as ds
+import pyarrow.parquet as pq
 import streamlit as st
+from pyarrow import feather
+
+from src.database import duckdb_backend, ingest_catalog
+from src.database.locking import file_lock
+from src.database.schema import (
+    PERIOD_COL,
+    SCHEMA_VERSION,
+    apply_schema,
+    table_to_frame,
+    to_table,
+)
+from src.database.summary import (
+    FATURAS_SOURCE,
+    MEDICAO_SOURCE,
+    SUMMARY_COLUMNS,
+    empty_summary,
+    filter_summary,
+    summarize_months,
+    update_summary,
+)
 
 # --- CONFIGURAÇÃO DE CAMINHOS (Clean Architecture) ---
 DB_FOLDER = "data/database"
+# Datasets particionados no estilo hive: <tabela>/Nº do Cliente=<id>/ano=<aaaa>/
+DIR_FATURAS = os.path.join(DB_FOLDER, "faturas")
+DIR_MEDICAO = os.path.join(DB_FOLDER, "medicao")
+# Arquivos únicos do formato antigo (migrados automaticamente por init_db)
 FILE_FATURAS = os.path.join(DB_FOLDER, "faturas.parquet")
 FILE_MEDICAO = os.path.join(DB_FOLDER, "medicao.parquet")
 
+CLIENT_COL = "Nº do Cliente"
+YEAR_COL = "ano"
+PARTITIONING = ds.partitioning(
+    pa.schema([(CLIENT_COL, pa.int64()), (YEAR_COL, pa.int32())]), flavor="hive"
+)
+PART_FILE = "part-0.parquet"
+# Log de deltas: <tabela>/_deltas/<seq>.parquet (ignorado pelo dataset por causa do "_")
+DELTA_DIR = "_deltas"
+SEQ_COL = "_seq"
+TOMBSTONE_COL = "_tombstone"
+DELTA_KEYS = [CLIENT_COL, "Referência"]
+COMPACT_AFTER = 32  # Deltas por tabela que disparam a compactação em segundo plano
+# Marcador de versão: tocado a cada escrita, inclusive de outros processos (main.py)
+VERSION_FILE = os.path.join(DB_FOLDER, "_version")
+# Versão do esquema tipado (schema.py) em que os arquivos foram gravados
+SCHEMA_FILE = os.path.join(DB_FOLDER, "_schema")
+# Trava entre processos: exclusiva para escritas, compartilhada para leituras
+LOCK_FILE = os.path.join(DB_FOLDER, "_lock")
+# Resumo mensal materializado (summary.py), atualizado a cada commit
+SUMMARY_FILE = os.path.join(DB_FOLDER, "resumo_mensal.parquet")
+# Snapshot de leitura em Arrow IPC (ver "SNAPSHOT DE LEITURA")
+SNAPSHOT_DIR = os.path.join(DB_FOLDER, "_snapshot")
+_NULL_PARTITION = "__HIVE_DEFAULT_PARTITION__"
+
+# Backend de armazenamento: "parquet" (padrão, acima) ou "duckdb" (duckdb_backend.py)
+DB_BACKEND = os.getenv("ENEL_DB_BACKEND", "parquet").strip().lower()
+DUCKDB_FILE = os.path.join(DB_FOLDER, "enel.duckdb")
+_duckdb_ready = set()  # Arquivos DuckDB já inicializados por este processo
+
+
+# --- CACHE DE LEITURA (compartilhado por todas as sessões do processo) ---
+LOAD_CACHE_SIZE = 32  # Combinações de filtros mantidas em memória
+
+_cache_lock = threading.Lock()
+_load_cache = OrderedDict()  # chave dos argumentos -> (token, resultado)
+_data_version = 0  # Incrementado a cada escrita feita por este processo
+
+
+def _bump_version():
+    """Invalida o cache deste processo e, via mtime do marcador, dos demais."""
+    global _data_version
+    with _cache_lock:
+        _data_version += 1
+        _load_cache.clear()
+    # Grava e renomeia: o inode muda a cada escrita, mesmo que duas caiam no
+    # mesmo tick do relógio de mtime
+    _write_text_atomic(VERSION_FILE, str(time.time_ns()))
+
+
+def _version_token():
+    """Versão atual dos dados: contador local + mtime/inode do marcador em disco."""
+    try:
+        stat = os.stat(VERSION_FILE)
+        return _data_version, stat.st_mtime_ns, stat.st_ino
+    except FileNotFoundError:
+        return _data_version, 0, 0
+
+
+def _cached(key, loader):
+    """
+    Devolve o resultado de `loader()` guardado para `key` enquanto a versão
+    dos dados não mudar. Sem TTL: só uma escrita invalida a entrada.
+    """
+    token = _version_token()
+    with _cache_lock:
+        hit = _load_cache.get(key)
+        if hit is not None and hit[0] == token:
+            _load_cache.move_to_end(key)
+            return hit[1]
+
+    value = loader()
+
+    with _cache_lock:
+        _load_cache[key] = (token, value)
+        _load_cache.move_to_end(key)
+        while len(_load_cache) > LOAD_CACHE_SIZE:
+            _load_cache.popitem(last=False)
+    return value
+
+
+# --- ESCRITA SEGURA ---
+
+# Falhas de gravação esperadas: disco/trava (OSError, inclui TimeoutError) e
+# dados que o pyarrow não converte (ArrowInvalid é também ValueError)
+WRITE_ERRORS = (OSError, ValueError, pa.ArrowException)
+
+
+def _write_lock():
+    """Trava exclusiva do banco (reentrante na mesma thread)."""
+    return file_lock(LOCK_FILE)
+
+
+def _read_lock():
+    """Trava compartilhada: leitores não veem um commit pela metade."""
+    return file_lock(LOCK_FILE, shared=True)
+
+
+def _tmp_path(path):
+    """
+    Arquivo temporário ao lado do destino. Começa com "." para que o
+    pyarrow.dataset o ignore caso um leitor liste a pasta no meio da escrita.
+    """
+    folder, name = os.path.split(path)
+    return os.path.join(folder, f".{name}.{os.getpid()}.{threading.get_ident()}.tmp")
+
+
+def _write_text_atomic(path, text):
+    os.makedirs(os.path.dirname(path), exist_ok=True)
+    tmp_path = _tmp_path(path)
+    with open(tmp_path, "w") as fh:
+        fh.write(text)
+    os.replace(tmp_path, path)
+
+
+def _write_parquet_atomic(data, path):
+    """
+    Grava um DataFrame (ou tabela Arrow) em arquivo temporário e renomeia:
+    o destino nunca fica pela metade.
+    """
+    tmp_path = _tmp_path(path)
+    try:
+        if isinstance(data, pa.Table):
+            pq.write_table(data, tmp_path)
+        else:
+            data.to_parquet(tmp_path, index=False)
+        os.replace(tmp_path, path)
+    finally:
+        if os.path.exists(tmp_path):
+            os.remove(tmp_path)
+
+
+def _use_duckdb():
+    return DB_BACKEND == "duckdb"
+
 
 def init_db():
-    """Garante que a pasta e os arquivos existam."""
-    os.makedirs(DB_FOLDER, exist_ok=True)
+    """Garante que as pastas existam e migra os arquivos do formato antigo."""
+    if _use_duckdb():
+        _init_duckdb()
+        return
+
+    os.makedirs(DIR_FATURAS, exist_ok=True)
+    os.makedirs(DIR_MEDICAO, exist_ok=True)
+
+    needs_migration = (
+        os.path.isfile(FILE_FATURAS)
+        or os.path.isfile(FILE_MEDICAO)
+        or _stored_schema_version() < SCHEMA_VERSION
+    )
+    if needs_migration:
+        # Verificado de novo dentro da trava: outro processo pode ter migrado
+        with _write_lock():
+            _migrate_legacy_file(FILE_FATURAS, DIR_FATURAS)
+            _migrate_legacy_file(FILE_MEDICAO, DIR_MEDICAO)
+            _migrate_schema()
+
+    if not os.path.isfile(SUMMARY_FILE):
+        with _write_lock():
+            if not os.path.isfile(SUMMARY_FILE):
+                _rebuild_summary()
+
+
+def _init_duckdb():
+    """Cria tabelas e índices do DuckDB (uma vez por processo e arquivo)."""
+    if DUCKDB_FILE in _duckdb_ready and os.path.exists(DUCKDB_FILE):
+        return
+    with _write_lock():
+        duckdb_backend.init_db(DUCKDB_FILE)
+    _duckdb_ready.add(DUCKDB_FILE)
+
+
+def _migrate_legacy_file(file_path, table_dir):
+    """
+    Converte um arquivo único (faturas.parquet/medicao.parquet) para o dataset
+    particionado. O original é mantido como <arquivo>.migrated.
+    """
+    if not os.path.isfile(file_path):
+        return
+
+    try:
+        df_old = apply_schema(pd.read_parquet(file_path))
+        if not df_old.empty:
+            if "Referência" not in df_old.columns:
+                print(f"⚠️ {file_path} sem coluna 'Referência': migração ignorada.")
+                return
+            if not _upsert_dataframe(df_old, table_dir, keys=_upsert_keys(df_old)):
+                return
+        os.replace(file_path, file_path + ".migrated")
+        _bump_version()
+        print(f"📦 {file_path} migrado para {table_dir}.")
+    except WRITE_ERRORS as e:
+        print(f"❌ Erro ao migrar {file_path}: {e}")
+
+
+def _stored_schema_version():
+    try:
+        with open(SCHEMA_FILE) as fh:
+            return int(fh.read().strip() or 0)
+    except (FileNotFoundError, ValueError):
+        return 0
+
+
+def _migrate_schema():
+    """
+    Regrava as partições gravadas antes do esquema atual: datas em texto
+    viram datetime64, clientes não numéricos ("Not Found", "Desconhecido")
+    vão para a partição nula (v2) e valores em R$ e tarifas passam a
+    inteiros escalados (v3). Roda uma única vez (marcador SCHEMA_FILE).
+    """
+    if _stored_schema_version() >= SCHEMA_VERSION:
+        return
+
+    # Deltas gravados no esquema antigo entram na base antes da conversão
+    migrated = _compact_locked() > 0
+    for table_dir in (DIR_FATURAS, DIR_MEDICAO):
+        for value in _partition_values(table_dir, CLIENT_COL):
+            client_dir = os.path.join(table_dir, f"{CLIENT_COL}={value}")
+            client = None if value == _NULL_PARTITION else unquote(value)
+            paths = [
+                os.path.join(root, name)
+                for root, _, names in os.walk(client_dir)
+                for name in names
+                if name.endswith(".parquet")
+            ]
+            # Arquivos já convertidos (migração interrompida) voltam a reais
+            frames = [table_to_frame(pq.read_table(path)) for path in paths]
+            frames = [df for df in frames if not df.empty]
+            if not frames:
+                continue
+
+            df_old = pd.concat(frames, ignore_index=True)
+            df_old[CLIENT_COL] = client
+            df_old = apply_schema(df_old)
+            if not _upsert_dataframe(df_old, table_dir, keys=_upsert_keys(df_old)):
+                print(f"❌ Migração de esquema interrompida em {client_dir}.")
+                return
+            # Cliente não numérico: os dados foram para outra pasta
+            if _partition_value(df_old[CLIENT_COL].iloc[0]) != value:
+                shutil.rmtree(client_dir)
+            migrated = True
+
+    _write_text_atomic(SCHEMA_FILE, str(SCHEMA_VERSION))
+    if migrated:
+        # Resumo somado no esquema anterior: o init_db o refaz, já em centavos
+        if os.path.exists(SUMMARY_FILE):
+            os.remove(SUMMARY_FILE)
+        _bump_version()
+        print(f"📦 Banco convertido para o esquema tipado v{SCHEMA_VERSION}.")
+
+
+def clear_data():
+    """Apaga todo o histórico de faturas e medições (e o catálogo de ingestão)."""
+    ingest_catalog.clear()
+    if _use_duckdb():
+        init_db()
+        with _write_lock():
+            duckdb_backend.clear(DUCKDB_FILE)
+            _bump_version()
+        return
 
-    if not os.path.exists(FILE_FATURAS):
-        pd.DataFrame().to_parquet(FILE_FATURAS)
+    with _write_lock():
+        for table_dir in (DIR_FATURAS, DIR_MEDICAO):
+            if os.path.isdir(table_dir):
+                shutil.rmtree(table_dir)
+        if os.path.isdir(SNAPSHOT_DIR):
+            shutil.rmtree(SNAPSHOT_DIR)
+        for file_path in (FILE_FATURAS, FILE_MEDICAO, SUMMARY_FILE):
+            if os.path.exists(file_path):
+                os.remove(file_path)
+        _bump_version()
 
-    if not os.path.exists(FILE_MEDICAO):
-        pd.DataFrame().to_parquet(FILE_MEDICAO)
 
+# --- PARTICIONAMENTO ---
 
-def _upsert_dataframe(df_new, file_path, keys=["Referência"]):
+
+def _with_partition_columns(df):
+    """Adiciona a coluna de ano (derivada do Período) usada na partição."""
+    df = df.copy(deep=False)
+    if CLIENT_COL not in df.columns:
+        df[CLIENT_COL] = pd.array([pd.NA] * len(df), dtype="Int64")
+    df[YEAR_COL] = df[PERIOD_COL] // 100
+    return df
+
+
+def _with_partition_fields(table):
+    """Como _with_partition_columns, direto na tabela Arrow (sem pandas)."""
+    if CLIENT_COL not in table.column_names:
+        table = table.append_column(CLIENT_COL, pa.nulls(len(table), pa.int64()))
+    year = pc.divide(table[PERIOD_COL], pa.scalar(100, pa.int32()))
+    return table.append_column(YEAR_COL, year)
+
+
+def _partition_value(value):
+    if value is None or pd.isna(value):
+        return _NULL_PARTITION
+    return quote(str(value), safe="")
+
+
+def _partition_dir(table_dir, client, year):
+    return os.path.join(
+        table_dir,
+        f"{CLIENT_COL}={_partition_value(client)}",
+        f"{YEAR_COL}={_partition_value(year)}",
+    )
+
+
+def _upsert_dataframe(df_new, table_dir, keys=["Referência"]):
     """
     Insere novos dados, substituindo os antigos se a chave (Referência) coincidir.
     Isso permite reprocessar uma fatura para corrigir dados sem duplicar.
+
+    Só as partições (cliente, ano) tocadas pelos novos dados são reescritas,
+    sob a trava exclusiva do banco (ler-modificar-gravar sem perder updates
+    de outro processo).
     """
     if df_new.empty:
         return False
 
-    if not os.path.exists(file_path):
-        df_new.to_parquet(file_path, index=False)
+    try:
+        df_new = _with_partition_columns(apply_schema(df_new))
+        groups = df_new.groupby([CLIENT_COL, YEAR_COL], dropna=False, sort=False)
+        with _write_lock():
+            for (client, year), df_part in groups:
+                _upsert_partition(df_part, table_dir, client, year, keys)
         return True
 
+    except WRITE_ERRORS as e:
+        print(f"❌ Erro ao salvar parquet: {e}")
+        return False
+
+
+def _upsert_partition(df_part, table_dir, client, year, keys, drop_keys=None):
+    """
+    Reescreve uma única partição com os dados novos no lugar dos antigos.
+    `drop_keys` (padrão: as chaves de `df_part`) são as chaves removidas do
+    arquivo antes de acrescentar `df_part`.
+    """
+    part_dir = _partition_dir(table_dir, client, year)
+    file_path = os.path.join(part_dir, PART_FILE)
+
+    # Cliente e ano ficam no caminho da partição, não dentro do arquivo
+    file_keys = [k for k in keys if k not in (CLIENT_COL, YEAR_COL)]
+    if drop_keys is None:
+        drop_keys = df_part[file_keys]
+    df_part = df_part.drop(columns=[CLIENT_COL, YEAR_COL])
+
+    if os.path.exists(file_path):
+        # 1. Carrega dados existentes da partição
+        df_old = table_to_frame(pq.read_table(file_path))
+
+        # 2. Remove do antigo tudo que coincidir com as novas referências
+        if not df_old.empty and all(k in df_old.columns for k in file_keys):
+            refs_to_update = drop_keys[file_keys].drop_duplicates()
+            df_merged = df_old.merge(
+                refs_to_update, on=file_keys, how="left", indicator=True
+            )
+            df_old = df_old[(df_merged["_merge"] == "left_only").to_numpy()]
+
+        # 3. Concatena (Antigos Mantidos + Novos)
+        if df_part.empty:
+            df_part = df_old
+        elif not df_old.empty:
+            df_part = pd.concat([df_old, df_part], ignore_index=True)
+    elif df_part.empty:
+        return
+
+    # Ordenado por Período: as estatísticas min/max dos row groups
+    # passam a podar leituras filtradas por mês
+    if PERIOD_COL in df_part.columns:
+        df_part = df_part.sort_values(PERIOD_COL, kind="stable")
+
+    os.makedirs(part_dir, exist_ok=True)
+    _write_parquet_atomic(to_table(df_part), file_path)
+
+
+def _open_dataset(table_dir):
+    """
+    Abre o dataset particionado com o esquema unificado de todos os arquivos
+    (partições gravadas em épocas diferentes podem ter colunas diferentes).
+    Retorna None se ainda não houver dados.
+    """
+    if not os.path.isdir(table_dir):
+        return None
+
+    dataset = ds.dataset(table_dir, format="parquet", partitioning=PARTITIONING)
+    fragments = list(dataset.get_fragments())
+    if not fragments:
+        return None
+
+    schema = pa.unify_schemas(
+        [f.physical_schema for f in fragments] + [PARTITIONING.schema],
+        promote_options="permissive",
+    )
+    return ds.dataset(
+        table_dir, format="parquet", partitioning=PARTITIONING, schema=schema
+    )
+
+
+def _read_table(table_dir, filter=None, columns=None):
+    """
+    Lê um dataset para pandas, já nos tipos do esquema (schema.py), com os
+    deltas ainda não compactados aplicados por cima dos arquivos base.
+
+    `filter` (expressão do pyarrow.dataset) sobre CLIENT_COL/YEAR_COL poda
+    partições inteiras sem abrir os arquivos; sobre as demais colunas usa as
+    estatísticas dos row groups. `columns` limita as colunas lidas (as que não
+    existirem na tabela são ignoradas).
+    """
+    dataset = _open_dataset(table_dir)
+    deltas = _open_deltas(table_dir)
+    names = set()
+    for source in (dataset, deltas):
+        if source is not None:
+            names.update(source.schema.names)
+    if not names:
+        return pd.DataFrame()
+
+    read_columns = None
+    if columns is not None:
+        columns = [c for c in columns if c in names]
+        if not columns:
+            return pd.DataFrame()
+        # As chaves são necessárias para aplicar as lápides dos deltas
+        read_columns = list(dict.fromkeys(columns + DELTA_KEYS))
+
+    df = pd.DataFrame()
+    if dataset is not None:
+        base_columns = read_columns
+        if base_columns is not None:
+            base_columns = [c for c in base_columns if c in dataset.schema.names]
+        df = table_to_frame(dataset.to_table(columns=base_columns, filter=filter))
+
+    if deltas is not None:
+        delta_columns = None
+        if read_columns is not None:
+            delta_columns = [c for c in read_columns if c in deltas.schema.names]
+            delta_columns += [SEQ_COL, TOMBSTONE_COL]
+        df_delta = table_to_frame(deltas.to_table(columns=delta_columns, filter=filter))
+        df = _apply_deltas(df, df_delta)
+
+    if columns is not None:
+        # Sem a chave de Período derivada quando ela não foi pedida
+        return df.reindex(columns=columns)
+    # Mesma ordem de colunas com ou sem deltas: o Cliente (partição) no fim
+    df = df.drop(columns=[YEAR_COL], errors="ignore")
+    if CLIENT_COL in df.columns:
+        df = df[[c for c in df.columns if c != CLIENT_COL] + [CLIENT_COL]]
+    return df
+
+
+# --- SNAPSHOT DE LEITURA (Arrow IPC) ---
+#
+# As tabelas atuais (base + deltas, ordenadas como no load_data) também são
+# publicadas em Arrow IPC (Feather v2) sem compressão. O load_data mapeia
+# esses arquivos em memória em vez de ler e decodificar o Parquet e os
+# deltas (a conversão para pandas continua copiando os dados).
+#
+# O snapshot não é montado no commit: montar significa ler o banco inteiro,
+# e o tempo de gravação não pode crescer com o histórico. A primeira leitura
+# depois de uma escrita vai ao Parquet e agenda a montagem numa thread de
+# fundo; as seguintes usam o snapshot. Os arquivos levam no nome a versão
+# dos dados de que saíram, e o marcador ("versão atual\nid dos arquivos") só
+# é gravado se o VERSION_FILE não mudou durante a montagem: qualquer outra
+# escrita invalida o snapshot, e a leitura volta ao Parquet até a próxima.
+SNAPSHOT_ASYNC = True  # False: monta na própria leitura (testes)
+
+
+def _snapshot_path(table_dir, snapshot_id):
+    name = os.path.basename(table_dir)
+    return os.path.join(SNAPSHOT_DIR, f"{name}.{snapshot_id}.arrow")
+
+
+def _snapshot_version_file():
+    return os.path.join(SNAPSHOT_DIR, "_version")
+
+
+def _read_marker(path):
     try:
-        # 1. Carrega dados existentes
-        df_old = pd.read_parquet(file_path)
+        with open(path) as fh:
+            return fh.read()
+    except FileNotFoundError:
+        return None
 
-        # Se o banco estiver vazio, apenas salva o novo
-        if df_old.empty:
-            df_new.to_parquet(file_path, index=False)
-            return True
 
-        # 2. Garante que as colunas chave existem em ambos
-        # (Se for a primeira execução, pode não ter a coluna, então salvamos direto)
-        missing_keys = [k for k in keys if k not in df_old.columns]
-        if missing_keys:
-            # Estrutura incompatível (banco antigo ou vazio), sobrescreve ou append simples
-            df_final = pd.concat([df_old, df_new], ignore_index=True)
-            df_final.to_parquet(file_path, index=False)
+def _snapshot_fresh():
+    """Id dos arquivos do snapshot, se ele corresponde à versão atual dos dados."""
+    stamp = _read_marker(_snapshot_version_file())
+    version = _read_marker(VERSION_FILE)
+    if stamp is None or version is None:
+        return None
+    stamp_version, _, snapshot_id = stamp.partition("\n")
+    return snapshot_id if stamp_version == version and snapshot_id else None
+
+
+def _stamp_snapshot(snapshot_id):
+    _write_text_atomic(
+        _snapshot_version_file(), f"{_read_marker(VERSION_FILE)}\n{snapshot_id}"
+    )
+
+
+def refresh_snapshot():
+    """
+    Monta o snapshot da versão atual, se ainda não existe. Retorna True se,
+    ao final, o snapshot está em dia (False: houve uma escrita no meio).
+    """
+    with _read_lock():
+        version = _read_marker(VERSION_FILE)
+        if version is None or _snapshot_fresh():
             return True
+        tables = {}
+        for table_dir in (DIR_FATURAS, DIR_MEDICAO):
+            df = _sort_by_key(_read_table(table_dir))
+            # Categóricos viram colunas de dicionário: voltam sem recodificar
+            table = pa.Table.from_pandas(df, preserve_index=False)
+            if PERIOD_COL in table.column_names:
+                # Ano da partição, para os mesmos filtros do _build_filter
+                table = _with_partition_fields(table)
+            tables[table_dir] = table
 
-        # 3. Identifica quais referências estamos atualizando
-        # (Ex: Estamos importando JAN/2025 de novo)
-        refs_to_update = df_new[keys].drop_duplicates()
+    # Gravação fora da trava: os commits não esperam pelo snapshot
+    snapshot_id = version.strip()
+    os.makedirs(SNAPSHOT_DIR, exist_ok=True)
+    for table_dir, table in tables.items():
+        path = _snapshot_path(table_dir, snapshot_id)
+        tmp_path = _tmp_path(path)
+        try:
+            feather.write_feather(table, tmp_path, compression="uncompressed")
+            os.replace(tmp_path, path)
+        finally:
+            if os.path.exists(tmp_path):
+                os.remove(tmp_path)
 
-        # 4. Remove do banco antigo tudo que coincidir com as novas referências
-        # Merge com indicator=True ajuda a achar a interseção
-        df_merged = df_old.merge(refs_to_update, on=keys, how="left", indicator=True)
-        df_kept = df_old[
-            df_merged["_merge"] == "left_only"
-        ]  # Mantém só o que NÃO está no novo lote
+    with _read_lock():
+        # Sob a trava compartilhada nenhum commit muda a versão
+        if _read_marker(VERSION_FILE) != version:
+            return False
+        _stamp_snapshot(snapshot_id)
+    _prune_snapshots()
+    return True
 
-        # 5. Concatena (Antigos Mantidos + Novos)
-        df_final = pd.concat([df_kept, df_new], ignore_index=True)
 
-        # 6. Salva
-        df_final.to_parquet(file_path, index=False)
-        return True
+def _prune_snapshots():
+    """Apaga os arquivos de snapshots antigos (com a trava exclusiva: nenhum leitor)."""
+    with _write_lock():
+        if not os.path.isdir(SNAPSHOT_DIR):
+            return  # Banco apagado no meio da montagem
+        current = _snapshot_fresh()
+        for entry in os.scandir(SNAPSHOT_DIR):
+            if entry.name.endswith(".arrow") and (
+                current is None or not entry.name.endswith(f".{current}.arrow")
+            ):
+                try:
+                    os.remove(entry.path)
+                except OSError:
+                    pass  # Ainda mapeado por outro processo: fica para a próxima
+
+
+_snapshot_lock = threading.Lock()
+_snapshot_thread = None
+_snapshot_requested = False
+
+
+def _refresh_snapshot_loop():
+    global _snapshot_thread, _snapshot_requested
+    while True:
+        with _snapshot_lock:
+            if not _snapshot_requested:
+                _snapshot_thread = None
+                return
+            _snapshot_requested = False
+        try:
+            if not refresh_snapshot():
+                with _snapshot_lock:
+                    _snapshot_requested = True  # Versão mudou: tenta de novo
+        except Exception as e:  # noqa: BLE001 - a thread de fundo não pode morrer
+            # Sem marcador válido, os leitores continuam no Parquet
+            print(f"⚠️ Snapshot de leitura não publicado: {e}")
+
+
+def _schedule_snapshot():
+    """Pede a montagem do snapshot (uma thread de fundo por processo)."""
+    global _snapshot_thread, _snapshot_requested
+    if not SNAPSHOT_ASYNC:
+        try:
+            refresh_snapshot()
+        except WRITE_ERRORS as e:
+            print(f"⚠️ Snapshot de leitura não publicado: {e}")
+        return
+    with _snapshot_lock:
+        _snapshot_requested = True
+        if _snapshot_thread is None:
+            _snapshot_thread = threading.Thread(
+                target=_refresh_snapshot_loop, name="snapshot-leitura", daemon=True
+            )
+            _snapshot_thread.start()
+
+
+def _read_snapshot(table_dir, snapshot_id, filter=None, columns=None):
+    """
+    Mesmo resultado de _read_table, lido do snapshot mapeado em memória:
+    sem ler deltas nem descomprimir Parquet. O filtro roda sobre o Arrow;
+    a conversão para DataFrame (table_to_frame) ainda copia as colunas.
+    """
+    table = feather.read_table(_snapshot_path(table_dir, snapshot_id), memory_map=True)
+    names = [c for c in table.column_names if c != YEAR_COL]
+    if columns is not None:
+        columns = [c for c in columns if c in names]
+    else:
+        columns = names
+    if not columns:
+        return pd.DataFrame()
+
+    if filter is not None:
+        table = ds.dataset(table).to_table(columns=columns, filter=filter)
+    else:
+        table = table.select(columns)
+    # Sem a chave de Período derivada quando ela não está no snapshot/pedido
+    return table_to_frame(table).reindex(columns=columns)
+
+
+# --- LOG DE DELTAS ---
+
+
+def _delta_folder(table_dir):
+    return os.path.join(table_dir, DELTA_DIR)
+
+
+def _delta_paths(table_dir):
+    """Arquivos de delta da tabela, em ordem de sequência."""
+    folder = _delta_folder(table_dir)
+    if not os.path.isdir(folder):
+        return []
+    return [
+        os.path.join(folder, name)
+        for name in sorted(os.listdir(folder))
+        if name.endswith(".parquet") and not name.startswith(".")
+    ]
+
+
+def _next_sequence():
+    """Próximo número de sequência (chamar sob a trava exclusiva)."""
+    last = 0
+    for table_dir in (DIR_FATURAS, DIR_MEDICAO):
+        for path in _delta_paths(table_dir):
+            last = max(last, int(os.path.basename(path).split(".")[0]))
+    return last + 1
+
+
+def _with_delta_flags(table, seq, tombstone):
+    rows = len(table)
+    table = table.append_column(SEQ_COL, pa.repeat(pa.scalar(seq, pa.int64()), rows))
+    return table.append_column(TOMBSTONE_COL, pa.repeat(pa.scalar(tombstone), rows))
+
+
+def _append_delta(df_new, table_dir, seq):
+    """
+    Grava um delta imutável: as linhas novas e uma lápide para cada chave
+    (Cliente, Referência) que elas substituem. Não lê nem reescreve nenhum
+    arquivo existente, então o custo independe do tamanho do histórico.
+
+    Aceita um DataFrame ou uma tabela Arrow já no formato de gravação
+    (extractor.build_tables); a tabela é gravada sem passar pelo pandas.
+    Retorna o caminho do delta gravado; erros de gravação sobem para o
+    BatchWriter, que desfaz o lote.
+    """
+    rows = _with_partition_fields(to_table(df_new))
+    tomb_keys = DELTA_KEYS + [PERIOD_COL, YEAR_COL]
+    tombs = rows.select(tomb_keys).group_by(tomb_keys, use_threads=False)
+    tombs = tombs.aggregate([]).select(tomb_keys)
+
+    # As colunas que as lápides não têm viram nulas
+    delta = pa.concat_tables(
+        [
+            _with_delta_flags(rows, seq, False),
+            _with_delta_flags(tombs, seq, True),
+        ],
+        promote_options="default",
+    )
+    folder = _delta_folder(table_dir)
+    os.makedirs(folder, exist_ok=True)
+    path = os.path.join(folder, f"{seq:012d}.parquet")
+    _write_parquet_atomic(delta, path)
+    return path
+
+
+def _open_deltas(table_dir):
+    """Dataset com todos os deltas da tabela (None se não houver)."""
+    paths = _delta_paths(table_dir)
+    if not paths:
+        return None
+    schemas = [pq.read_schema(path) for path in paths]
+    schema = pa.unify_schemas(schemas, promote_options="permissive")
+    return ds.dataset(paths, format="parquet", schema=schema)
+
+
+def _split_deltas(df_delta):
+    """
+    Separa os deltas em (linhas vigentes, lápides vigentes): para cada chave
+    vale o delta mais recente que a menciona.
+    """
+    is_tomb = df_delta[TOMBSTONE_COL].fillna(False).astype(bool).to_numpy()
+    tombs = df_delta[is_tomb]
+    latest = (
+        tombs.groupby(DELTA_KEYS, dropna=False, observed=True)[SEQ_COL]
+        .max()
+        .rename("_vigente")
+        .reset_index()
+    )
+    rows = df_delta[~is_tomb].merge(latest, on=DELTA_KEYS, how="left")
+    rows = rows[(rows[SEQ_COL] >= rows["_vigente"].fillna(-1)).to_numpy()]
+    return rows.drop(columns=["_vigente"]), latest[DELTA_KEYS]
+
+
+def _apply_deltas(df_base, df_delta):
+    """Aplica os deltas sobre a base: lápides removem, linhas vigentes entram."""
+    if df_delta.empty:
+        return df_base
+
+    rows, tombs = _split_deltas(df_delta)
+    rows = rows.drop(columns=[SEQ_COL, TOMBSTONE_COL])
+
+    if not df_base.empty:
+        merged = df_base.merge(tombs, on=DELTA_KEYS, how="left", indicator=True)
+        df_base = df_base[(merged["_merge"] == "left_only").to_numpy()]
+
+    frames = [df for df in (df_base, rows) if not df.empty]
+    if not frames:
+        return df_base
+    return apply_schema(pd.concat(frames, ignore_index=True))
+
+
+def pending_deltas():
+    """Quantidade de arquivos de delta ainda não compactados (maior entre as tabelas)."""
+    return max(len(_delta_paths(t)) for t in (DIR_FATURAS, DIR_MEDICAO))
+
+
+def compact():
+    """
+    Incorpora os deltas aos arquivos base e os remove. Só as partições
+    tocadas pelos deltas são reescritas. Retorna quantos deltas foram
+    compactados. Pode ser interrompida a qualquer momento: reaplicar um
+    delta já incorporado não muda o resultado.
+    """
+    if _use_duckdb():
+        return 0  # Sem log de deltas: o DuckDB grava direto nas tabelas
+
+    with _write_lock():
+        total = _compact_locked()
+    if total:
+        print(f"🗜️ {total} delta(s) compactado(s).")
+    return total
+
+
+def _compact_locked():
+    total = 0
+    # Compactar não muda o conteúdo: um snapshot em dia continua valendo
+    snapshot_id = _snapshot_fresh()
+    for table_dir in (DIR_FATURAS, DIR_MEDICAO):
+        paths = _delta_paths(table_dir)
+        if not paths:
+            continue
+
+        # Um arquivo por vez: cada delta traz os próprios tipos (reais ou centavos)
+        df_delta = apply_schema(
+            pd.concat(
+                [table_to_frame(pq.read_table(p)) for p in paths], ignore_index=True
+            )
+        )
+        df_delta[YEAR_COL] = df_delta[YEAR_COL].astype("Int32")
+        rows, _ = _split_deltas(df_delta)
+        rows = rows.drop(columns=[SEQ_COL, TOMBSTONE_COL])
+        is_tomb = df_delta[TOMBSTONE_COL].fillna(False).astype(bool).to_numpy()
+        tombs = df_delta[is_tomb][DELTA_KEYS + [YEAR_COL]].drop_duplicates()
+
+        rows_by_part = dict(
+            iter(rows.groupby([CLIENT_COL, YEAR_COL], dropna=False, sort=False))
+        )
+        for part, df_tomb in tombs.groupby(
+            [CLIENT_COL, YEAR_COL], dropna=False, sort=False
+        ):
+            df_part = rows_by_part.get(part, rows.iloc[0:0])
+            client, year = part
+            _upsert_partition(
+                df_part, table_dir, client, year, DELTA_KEYS, drop_keys=df_tomb
+            )
+
+        for path in paths:
+            os.remove(path)
+        total += len(paths)
+
+    if total:
+        _bump_version()
+        if snapshot_id:
+            _stamp_snapshot(snapshot_id)
+    return total
+
+
+_compaction_lock = threading.Lock()
+_compaction_thread = None
+
+
+def _schedule_compaction():
+    """Dispara a compactação numa thread de fundo quando há deltas demais."""
+    global _compaction_thread
+    if pending_deltas() < COMPACT_AFTER:
+        return
+    with _compaction_lock:
+        if _compaction_thread is not None and _compaction_thread.is_alive():
+            return
+        _compaction_thread = threading.Thread(
+            target=compact, name="compactacao-deltas", daemon=True
+        )
+        _compaction_thread.start()
+
+
+def _build_filter(client=None, years=None, references=None, periods=None):
+    """Monta a expressão de filtro do pyarrow.dataset (None = sem filtro)."""
+    conditions = []
+    if client is not None:
+        conditions.append(ds.field(CLIENT_COL) == int(client))
+    if years is not None:
+        conditions.append(ds.field(YEAR_COL).isin([int(y) for y in years]))
+    if references is not None:
+        conditions.append(ds.field("Referência").isin([str(r) for r in references]))
+    if periods is not None:
+        start, end = periods
+        if start is not None:
+            # O ano de início também poda as pastas de partição
+            conditions.append(ds.field(YEAR_COL) >= int(start) // 100)
+            conditions.append(ds.field(PERIOD_COL) >= int(start))
+        if end is not None:
+            conditions.append(ds.field(YEAR_COL) <= int(end) // 100)
+            conditions.append(ds.field(PERIOD_COL) <= int(end))
+
+    if not conditions:
+        return None
+    expr = conditions[0]
+    for condition in conditions[1:]:
+        expr = expr & condition
+    return expr
+
+
+def _partition_values(table_dir, key, parent=None):
+    """Lista os valores de uma chave de partição só pelos nomes das pastas."""
+    base = table_dir if parent is None else parent
+    if not os.path.isdir(base):
+        return []
+
+    values = []
+    prefix = f"{key}="
+    for name in os.listdir(base):
+        if name.startswith(prefix) and os.path.isdir(os.path.join(base, name)):
+            values.append(name[len(prefix) :])
+    return values
+
+
+def list_clients():
+    """Clientes com faturas no banco (lido das pastas, sem abrir arquivos)."""
+    return _cached(("clients",), _list_clients)
+
+
+def _list_clients():
+    init_db()
+    if _use_duckdb():
+        with _read_lock():
+            return duckdb_backend.list_clients(DUCKDB_FILE)
+
+    clients = {
+        int(unquote(v))
+        for v in _partition_values(DIR_FATURAS, CLIENT_COL)
+        if v != _NULL_PARTITION
+    }
+    clients.update(c for c, _ in _delta_partitions() if c is not None)
+    return sorted(clients)
+
+
+def list_years(client=None):
+    """Anos com faturas no banco, opcionalmente de um único cliente."""
+    return _cached(("years", client), lambda: _list_years(client))
+
+
+def _list_years(client):
+    init_db()
+    if _use_duckdb():
+        with _read_lock():
+            return duckdb_backend.list_years(DUCKDB_FILE, client)
+
+    if client is None:
+        parents = [
+            os.path.join(DIR_FATURAS, f"{CLIENT_COL}={v}")
+            for v in _partition_values(DIR_FATURAS, CLIENT_COL)
+        ]
+    else:
+        parents = [
+            os.path.join(DIR_FATURAS, f"{CLIENT_COL}={_partition_value(client)}")
+        ]
+
+    years = set()
+    for parent in parents:
+        for v in _partition_values(DIR_FATURAS, YEAR_COL, parent=parent):
+            if v != _NULL_PARTITION:
+                years.add(int(v))
+    years.update(
+        y
+        for c, y in _delta_partitions()
+        if y is not None and (client is None or c == int(client))
+    )
+    return sorted(years)
+
+
+def _delta_partitions():
+    """Pares (cliente, ano) presentes nos deltas de faturas ainda não compactados."""
+    deltas = _open_deltas(DIR_FATURAS)
+    if deltas is None:
+        return set()
+    table = deltas.to_table(columns=[CLIENT_COL, YEAR_COL])
+    return set(zip(table[CLIENT_COL].to_pylist(), table[YEAR_COL].to_pylist()))
+
+
+def _upsert_keys(df):
+    """Chave de substituição: a Referência (e o Cliente, quando existir)."""
+    keys = ["Referência"]
+    if CLIENT_COL in df.columns:
+        keys.append(CLIENT_COL)
+    return keys
 
-    except Exception as e:
-        print(f"❌ Erro ao salvar parquet: {e}")
-        return False
+
+def _invoice_keys(table):
+    """Chave (Cliente|Referência) de cada linha como texto, para deduplicar no Arrow."""
+    reference = pc.cast(table["Referência"], pa.string())
+    if CLIENT_COL in table.column_names:
+        client = pc.cast(table[CLIENT_COL], pa.string())
+    else:
+        client = pa.nulls(len(table), pa.string())
+    return pc.binary_join_element_wise(
+        client, reference, "|", null_handling="replace", null_replacement=""
+    )
 
 
 def save_data(df_financeiro, df_medicao):
     """
     Salva os DataFrames de Financeiro e Medição no banco de dados.
-    Chama o upsert para evitar duplicatas.
+    Chama o upsert para evitar duplicatas. Os dados são convertidos para o
+    esquema tipado (src/database/schema.py) antes da gravação.
     """
-    init_db()
+    batch = BatchWriter()
+    batch.add(df_financeiro, df_medicao)
+    return batch.commit()
+
+
+class BatchWriter:
+    """
+    Acumula os DataFrames de várias faturas e grava tudo de uma vez:
+    um único delta por tabela (ver "LOG DE DELTAS"), em vez de uma escrita
+    a cada fatura.
 
-    success_fin = True
-    success_med = True
+    Uso:
+        with BatchWriter() as batch:
+            for df_fin, df_med in faturas:
+                batch.add(df_fin, df_med)
+        # commit automático ao sair do bloco sem exceção
 
-    # Salva Financeiro (Chave: Referência + Itens de Fatura para garantir unicidade fina)
-    # Mas para substituir o mês inteiro, melhor usar apenas 'Referência' como chave de deleção do antigo
-    keys_fin = ["Referência"]
-    if "Nº do Cliente" in df_financeiro.columns:
-        keys_fin.append("Nº do Cliente")
+    Se a mesma fatura (Referência + Cliente) aparecer mais de uma vez no lote,
+    vale a última adicionada, como aconteceria com chamadas sucessivas a save_data.
+    """
 
-    if not df_financeiro.empty:
-        success_fin = _upsert_dataframe(df_financeiro, FILE_FATURAS, keys=keys_fin)
+    def __init__(self):
+        self._fin = []
+        self._med = []
 
-    # Salva Medição
-    keys_med = ["Referência"]
-    if "Nº do Cliente" in df_medicao.columns:
-        keys_med.append("Nº do Cliente")
+    def __len__(self):
+        return len(self._fin)
 
-    if not df_medicao.empty:
-        success_med = _upsert_dataframe(df_medicao, FILE_MEDICAO, keys=keys_med)
+    def __enter__(self):
+        return self
 
-    return success_fin and success_med
+    def __exit__(self, exc_type, exc, tb):
+        if exc_type is None:
+            self.commit()
+        return False
 
+    def add(self, df_financeiro, df_medicao):
+        """Enfileira uma fatura: DataFrames ou tabelas Arrow (extractor.build_tables)."""
+        self._fin.append(df_financeiro)
+        self._med.append(df_medicao)
 
-def load_data():
-    """Carrega os dados dos arquivos Parquet para memória."""
-    init_db()
+    def commit(self):
+        """
+        Aplica o lote pendente. Retorna True se todas as tabelas foram salvas
+        e False se a gravação falhou (o erro é impresso, não propagado).
+        As duas tabelas são gravadas sob a mesma trava exclusiva: leitores
+        (trava compartilhada) veem o lote inteiro ou nada dele.
+        """
+        if not self._fin:
+            return True
+
+        frames_fin, frames_med = self._fin, self._med
+        self._fin, self._med = [], []
+
+        try:
+            table_fin = self._combine(frames_fin)
+            table_med = self._combine(frames_med)
+            if _use_duckdb():
+                return self._commit_duckdb(
+                    table_to_frame(table_fin), table_to_frame(table_med)
+                )
+
+            init_db()
+            with _write_lock():
+                if not self._publish(table_fin, table_med):
+                    return False
+        except WRITE_ERRORS as e:
+            # Trava ocupada, migração ou disco: falha do lote, não da aplicação
+            print(f"❌ Erro ao salvar parquet: {e}")
+            return False
+
+        _schedule_compaction()
+        return True
+
+    @staticmethod
+    def _publish(table_fin, table_med):
+        """
+        Grava os deltas, o resumo e a nova versão (sob a trava exclusiva).
+        Se alguma etapa falha, apaga os deltas já gravados e não muda a
+        versão: o banco fica como antes do lote.
+        """
+        # Um delta por tabela, com o mesmo número de sequência
+        seq = _next_sequence()
+        written = []
+        try:
+            # Financeiro: lápides por Referência + Cliente (substitui o mês inteiro)
+            for table, table_dir in (
+                (table_fin, DIR_FATURAS),
+                (table_med, DIR_MEDICAO),
+            ):
+                if len(table):
+                    written.append(_append_delta(table, table_dir, seq))
+
+            # Recalcula no resumo só as faturas do lote
+            _update_summary(table_fin, table_med)
+            _bump_version()
+        except WRITE_ERRORS as e:
+            print(f"❌ Erro ao salvar delta: {e}")
+            for path in written:
+                os.remove(path)
+            # O resumo pode já ter o lote: sem o arquivo, o init_db o reconstrói
+            if written and os.path.exists(SUMMARY_FILE):
+                os.remove(SUMMARY_FILE)
+            return False
+        return True
+
+    @staticmethod
+    def _commit_duckdb(df_fin, df_med):
+        """Upsert pela chave primária numa única transação do DuckDB."""
+        try:
+            init_db()
+            with _write_lock():
+                duckdb_backend.upsert(DUCKDB_FILE, df_fin, df_med)
+                _bump_version()
+        except (*duckdb_backend.ERRORS, *WRITE_ERRORS) as e:
+            print(f"❌ Erro ao salvar no DuckDB: {e}")
+            return False
+        return True
+
+    @staticmethod
+    def _combine(frames):
+        """
+        Concatena o lote numa tabela Arrow mantendo só a última versão de
+        cada chave. Tabelas do extrator entram sem cópia; DataFrames são
+        convertidos uma única vez.
+        """
+        tables = [to_table(df) for df in frames if len(df)]
+        if not tables:
+            return pa.table({})
+        if len(tables) == 1:
+            return tables[0]
+
+        # Do fim para o início: descarta linhas de faturas já vistas num item posterior
+        kept = []
+        seen = pa.array([], pa.string())
+        for table in reversed(tables):
+            keys = _invoice_keys(table)
+            if len(seen):
+                table = table.filter(pc.invert(pc.is_in(keys, value_set=seen)))
+            kept.append(table)
+            seen = pa.concat_arrays([seen, pc.unique(keys)])
+        return pa.concat_tables(kept[::-1], promote_options="permissive")
+
+
+def load_data(columns=None, client=None, years=None, references=None, periods=None):
+    """
+    Carrega os dados dos datasets Parquet para memória.
+
+    Os filtros são empurrados para o pyarrow: `client` e `years` podam
+    partições, `references` e `periods` (intervalo fechado (início, fim) de
+    chaves AAAAMM, None = aberto) usam as estatísticas dos row groups e
+    `columns` restringe as colunas lidas (aplicado às duas tabelas). Sem
+    argumentos, carrega todo o histórico. As colunas vêm nos tipos do
+    esquema (src/database/schema.py): textos categóricos, cliente Int64,
+    datas de leitura datetime64 e a chave inteira de Período (AAAAMM).
+
+    As linhas saem ordenadas por (Cliente, Período), de modo que recortes
+    por intervalo (schema.slice_periods) são buscas binárias.
+
+    O resultado fica em um cache do processo, compartilhado entre sessões e
+    páginas do Streamlit, e só é relido após uma escrita (save_data deste ou
+    de outro processo). Os DataFrames devolvidos são cópias rasas: adicionar
+    colunas é seguro, mas não altere valores no lugar.
+    """
+    key = (
+        "load",
+        tuple(columns) if columns is not None else None,
+        client,
+        tuple(years) if years is not None else None,
+        tuple(references) if references is not None else None,
+        tuple(periods) if periods is not None else None,
+    )
     try:
-        df_fat = pd.read_parquet(FILE_FATURAS)
-        df_med = pd.read_parquet(FILE_MEDICAO)
-        return df_fat, df_med
-    except Exception as e:
+        df_fat, df_med = _cached(
+            key, lambda: _load_tables(columns, client, years, references, periods)
+        )
+        return df_fat.copy(deep=False), df_med.copy(deep=False)
+    except Exception as e:  # noqa: BLE001 - a página mostra o erro em vez de quebrar
         st.error(f"Erro ao ler banco de dados: {e}")
         return pd.DataFrame(), pd.DataFrame()
+
+
+def _load_tables(columns, client, years, references, periods):
+    init_db()
+    if _use_duckdb():
+        with _read_lock():
+            return duckdb_backend.load(
+                DUCKDB_FILE, columns, client, years, references, periods
+            )
+
+    filter = _build_filter(
+        client=client, years=years, references=references, periods=periods
+    )
+    with _read_lock():
+        snapshot_id = _snapshot_fresh()
+        if snapshot_id:
+            df_fat = _read_snapshot(DIR_FATURAS, snapshot_id, filter, columns)
+            df_med = _read_snapshot(DIR_MEDICAO, snapshot_id, filter, columns)
+        else:
+            df_fat = _read_table(DIR_FATURAS, filter=filter, columns=columns)
+            df_med = _read_table(DIR_MEDICAO, filter=filter, columns=columns)
+    if not snapshot_id:
+        _schedule_snapshot()  # Fora da trava: a montagem também lê o banco
+    return _sort_by_key(df_fat), _sort_by_key(df_med)
+
+
+def _sort_by_key(df):
+    """Ordena por (Cliente, Período), as colunas presentes dentre as duas."""
+    keys = [c for c in (CLIENT_COL, PERIOD_COL) if c in df.columns]
+    if df.empty or not keys:
+        return df
+    return df.sort_values(keys, kind="stable", na_position="last").reset_index(
+        drop=True
+    )
+
+
+def load_summary(client=None, years=None, periods=None):
+    """
+    Resumo mensal por (Cliente, Referência): total R$, consumo e injeção em
+    kWh, CIP, ICMS, PIS/COFINS e quantidade de itens (ver summary.py).
+    Aceita os mesmos filtros de load_data, mas lê uma tabela materializada
+    (uma linha por fatura) mantida pelo save_data, sem varrer os itens.
+    Fica no mesmo cache de load_data.
+    """
+    key = (
+        "summary",
+        client,
+        tuple(years) if years is not None else None,
+        tuple(periods) if periods is not None else None,
+    )
+    try:
+        df = _cached(key, lambda: _load_summary(client, years, periods))
+        return df.copy(deep=False)
+    except Exception as e:  # noqa: BLE001 - a página mostra o erro em vez de quebrar
+        st.error(f"Erro ao ler banco de dados: {e}")
+        return empty_summary()
+
+
+def _load_summary(client, years, periods):
+    init_db()
+    if _use_duckdb():
+        with _read_lock():
+            return duckdb_backend.monthly_summary(DUCKDB_FILE, client, years, periods)
+
+    with _read_lock():
+        df_sum = _read_summary()
+    return filter_summary(df_sum, client=client, years=years, periods=periods)
+
+
+# --- RESUMO MENSAL (backend Parquet) ---
+
+
+def _read_summary():
+    if not os.path.isfile(SUMMARY_FILE):
+        return empty_summary()
+    return table_to_frame(pq.read_table(SUMMARY_FILE))[SUMMARY_COLUMNS]
+
+
+def _source_frame(table, columns):
+    """Só as colunas que o resumo usa, convertidas para pandas."""
+    return table_to_frame(table.select([c for c in columns if c in table.column_names]))
+
+
+def _update_summary(table_fin, table_med):
+    """Aplica o lote (tabelas Arrow) ao resumo gravado, sob a trava de escrita."""
+    try:
+        df_sum = update_summary(
+            _read_summary(),
+            _source_frame(table_fin, FATURAS_SOURCE),
+            _source_frame(table_med, MEDICAO_SOURCE),
+        )
+        _write_parquet_atomic(to_table(df_sum), SUMMARY_FILE)
+    except Exception as e:  # noqa: BLE001 - qualquer falha só descarta o resumo
+        # Sem o arquivo, o próximo init_db reconstrói o resumo do zero
+        print(f"⚠️ Resumo mensal descartado, será reconstruído: {e}")
+        if os.path.exists(SUMMARY_FILE):
+            os.remove(SUMMARY_FILE)
+
+
+def _rebuild_summary():
+    """Recalcula o resumo a partir de todo o histórico (sob a trava de escrita)."""
+    columns = list(dict.fromkeys(FATURAS_SOURCE + MEDICAO_SOURCE))
+    df_fat = _read_table(DIR_FATURAS, columns=columns)
+    df_med = _read_table(DIR_MEDICAO, columns=columns)
+    df_sum = summarize_months(df_fat, df_med)
+    _write_parquet_atomic(to_table(df_sum), SUMMARY_FILE)
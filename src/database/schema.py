@@ -0,0 +1,284 @@
+"""
+Esquema tipado das tabelas de faturas e medições.
+
+O extrator devolve tudo como texto (object) ou float64. Aqui cada coluna
+conhecida recebe um tipo compacto:
+- textos repetitivos (itens, unidades, referência, segmento) viram categóricos,
+  de modo que agrupamentos rodam sobre códigos inteiros;
+- o Nº do Cliente vira inteiro (Int64; "Not Found"/"Desconhecido" viram nulo);
+- as datas de leitura ("dd/mm/aaaa") viram datetime64;
+- a Referência ("MM/AAAA") ganha uma chave inteira de período (AAAAMM) e a
+  data do primeiro dia do mês, usadas para ordenar e filtrar por intervalo
+  em vez de comparar textos.
+
+Em disco os textos ficam como string simples (o Parquet já os codifica por
+dicionário); na leitura voltam como categóricos sem passar por object.
+
+Valores em R$ são gravados como centavos (int64) e as tarifas unitárias como
+inteiros em escala de 10^-8 (SCALED_COLUMNS). A conversão acontece só na
+borda: to_table grava os inteiros e table_to_frame devolve float64 em reais.
+
+Limite: só as somas feitas sobre os inteiros são exatas, ou seja, o resumo
+mensal (summary.py, load_summary), o by_month do dashboard e o desvio da
+CIP. Os dashboards que somam itens de load_data (taxômetro, fluxo
+financeiro etc.) recebem float64 e acumulam o erro de arredondamento
+habitual, desprezível na escala de centavos de um histórico de faturas.
+"""
+
+import numpy as np
+import pandas as pd
+import pyarrow as pa
+import pyarrow.compute as pc
+
+from src.utils.numbers import parse_br_numbers
+
+# --- COLUNAS ---
+CLIENT_COL = "Nº do Cliente"
+REFERENCE_COL = "Referência"
+PERIOD_COL = "Período"  # Inteiro AAAAMM derivado da Referência
+PERIOD_DATE_COL = "Data Referência"  # Primeiro dia do mês (datetime64)
+
+TEXT_COLUMNS = [
+    REFERENCE_COL,
+    "Itens de Fatura",
+    "Unid.",
+    "N° Medidor",
+    "P.Horário/Segmento",
+]
+DATE_COLUMNS = ["Data Leitura (Anterior)", "Data Leitura (Atual)"]
+FLOAT_COLUMNS = [
+    "Quant.",
+    "Preço unit (R$) com tributos",
+    "Valor (R$)",
+    "PIS/COFINS",
+    "Base Calc ICMS (R$)",
+    "Alíquota ICMS",
+    "ICMS",
+    "Tarifa unit (R$)",
+    "Leitura (Anterior)",
+    "Leitura (Atual)",
+    "Fator Multiplicador",
+    "Consumo kWh",
+    "N° Dias",
+]
+
+DATE_FORMAT = "%d/%m/%Y"
+
+# Colunas gravadas como inteiros escalados: valor em disco = valor * escala
+MONEY_SCALE = 100  # Centavos
+TARIFF_SCALE = 10**8  # Tarifas por kWh têm até 8 casas decimais
+SCALED_COLUMNS = {
+    "Valor (R$)": MONEY_SCALE,
+    "PIS/COFINS": MONEY_SCALE,
+    "Base Calc ICMS (R$)": MONEY_SCALE,
+    "ICMS": MONEY_SCALE,
+    "CIP (R$)": MONEY_SCALE,  # Resumo mensal
+    "Preço unit (R$) com tributos": TARIFF_SCALE,
+    "Tarifa unit (R$)": TARIFF_SCALE,
+}
+
+# Tipos Arrow de cada coluna conhecida, como ficam gravados no Parquet
+ARROW_TYPES = {
+    **dict.fromkeys(TEXT_COLUMNS, pa.string()),
+    **dict.fromkeys(DATE_COLUMNS, pa.timestamp("ns")),
+    **dict.fromkeys(FLOAT_COLUMNS, pa.float64()),
+    **dict.fromkeys(SCALED_COLUMNS, pa.int64()),
+    CLIENT_COL: pa.int64(),
+    PERIOD_COL: pa.int32(),
+    PERIOD_DATE_COL: pa.timestamp("ns"),
+}
+_REFERENCE_RE = r"^\s*(\d{1,2})/(\d{4})\s*$"
+
+# Versão do esquema gravado em disco (ver manager._migrate_schema)
+SCHEMA_VERSION = 3
+
+
+def parse_period(values):
+    """Converte referências "MM/AAAA" na chave inteira AAAAMM (Int32, nulo se inválida)."""
+    parts = pd.Series(values, dtype=object).astype(str).str.extract(_REFERENCE_RE)
+    month = pd.to_numeric(parts[0], errors="coerce")
+    year = pd.to_numeric(parts[1], errors="coerce")
+    period = (year * 100 + month).where(month.between(1, 12))
+    return period.astype("Int32").array
+
+
+def _period_column(reference):
+    """Chave de período para uma coluna de Referência (categórica ou não)."""
+    if isinstance(reference.dtype, pd.CategoricalDtype):
+        # Só as categorias são analisadas; as linhas reaproveitam os códigos
+        by_category = np.asarray(
+            parse_period(reference.cat.categories), dtype="float64"
+        )
+        codes = reference.cat.codes.to_numpy()
+        values = np.where(codes >= 0, by_category[codes], np.nan)
+        return pd.array(values, dtype="Float64").astype("Int32")
+    return parse_period(reference)
+
+
+def period_to_date(periods):
+    """Converte chaves AAAAMM no primeiro dia do mês (datetime64, NaT se nula)."""
+    periods = pd.array(periods, dtype="Int32")
+    months = (periods // 100 - 1970) * 12 + (periods % 100 - 1)
+    values = months.to_numpy(dtype="float64", na_value=np.nan)
+    valid = ~np.isnan(values)
+
+    dates = np.full(len(values), np.datetime64("NaT", "M"))
+    dates[valid] = values[valid].astype("int64")
+    return dates.astype("datetime64[ns]")
+
+
+def period_label(period):
+    """Chave AAAAMM de volta ao formato da fatura ("MM/AAAA")."""
+    if period is None or pd.isna(period):
+        return "-"
+    period = int(period)
+    return f"{period % 100:02d}/{period // 100}"
+
+
+def slice_periods(df, start=None, end=None):
+    """
+    Linhas com Período no intervalo fechado [start, end] (None = sem limite).
+    Com o Período ordenado (como sai de load_data para um único cliente) o
+    recorte é uma busca binária; caso contrário cai numa máscara vetorizada.
+    """
+    if df.empty or (start is None and end is None):
+        return df
+
+    periods = df[PERIOD_COL]
+    if periods.is_monotonic_increasing and not periods.hasnans:
+        values = periods.to_numpy(dtype="int64")
+        lo = 0 if start is None else np.searchsorted(values, start, side="left")
+        hi = len(values) if end is None else np.searchsorted(values, end, side="right")
+        return df.iloc[lo:hi]
+
+    mask = periods.notna()
+    if start is not None:
+        mask &= periods >= start
+    if end is not None:
+        mask &= periods <= end
+    return df[mask.to_numpy(dtype=bool)]
+
+
+def sort_by_period(df):
+    """
+    Ordena cronologicamente uma tabela agregada por mês. O Período é
+    derivado da Referência se não estiver presente, e a Referência volta a
+    texto para que os gráficos sigam a ordem das linhas.
+    """
+    if df.empty or REFERENCE_COL not in df.columns:
+        return df
+
+    df = df.copy(deep=False)
+    if PERIOD_COL not in df.columns:
+        df[PERIOD_COL] = parse_period(df[REFERENCE_COL])
+    df[REFERENCE_COL] = df[REFERENCE_COL].astype(str)
+    return df.sort_values(PERIOD_COL, kind="stable", na_position="last")
+
+
+def apply_schema(df):
+    """
+    Devolve uma cópia rasa de `df` com as colunas conhecidas nos tipos do
+    esquema. Colunas desconhecidas ficam como estão; é idempotente.
+    """
+    if df.empty and len(df.columns) == 0:
+        return df
+
+    df = df.copy(deep=False)
+    for col in TEXT_COLUMNS:
+        if col in df.columns and not isinstance(df[col].dtype, pd.CategoricalDtype):
+            df[col] = df[col].astype("category")
+
+    if CLIENT_COL in df.columns and df[CLIENT_COL].dtype != "Int64":
+        client = df[CLIENT_COL]
+        if client.dtype == object:
+            client = client.astype(str).str.strip()
+        df[CLIENT_COL] = pd.to_numeric(client, errors="coerce").astype("Int64")
+
+    for col in DATE_COLUMNS:
+        if col in df.columns and not pd.api.types.is_datetime64_dtype(df[col]):
+            df[col] = pd.to_datetime(df[col], format=DATE_FORMAT, errors="coerce")
+
+    for col in FLOAT_COLUMNS:
+        if col in df.columns and df[col].dtype != "float64":
+            # Textos no formato da fatura ("1.234,56", "19,52-") também são aceitos
+            df[col] = parse_br_numbers(df[col])
+
+    if REFERENCE_COL in df.columns:
+        df[PERIOD_COL] = _period_column(df[REFERENCE_COL])
+    elif PERIOD_COL in df.columns and df[PERIOD_COL].dtype != "Int32":
+        df[PERIOD_COL] = df[PERIOD_COL].astype("Float64").astype("Int32")
+    if PERIOD_COL in df.columns:
+        df[PERIOD_DATE_COL] = period_to_date(df[PERIOD_COL])
+
+    return df
+
+
+def to_storage(df):
+    """Prepara um DataFrame tipado para o Parquet: categóricos voltam a texto."""
+    df = df.copy(deep=False)
+    for col in df.columns:
+        if isinstance(df[col].dtype, pd.CategoricalDtype):
+            df[col] = df[col].astype(object)
+    return df
+
+
+def to_cents(values, scale=MONEY_SCALE):
+    """Valores em reais (float) como inteiros escalados (int64; nulo vira 0)."""
+    values = np.asarray(values, dtype="float64")
+    return np.rint(np.nan_to_num(values) * scale).astype("int64")
+
+
+def scale_table(table):
+    """Colunas de SCALED_COLUMNS ainda em float viram inteiros escalados (int64)."""
+    for i, field in enumerate(table.schema):
+        scale = SCALED_COLUMNS.get(field.name)
+        if scale is not None and pa.types.is_floating(field.type):
+            # NaN vira nulo: o inteiro não tem NaN, e o nulo volta como NaN
+            values = pc.if_else(pc.is_nan(table[i]), None, table[i])
+            scaled = pc.round(pc.multiply(values, float(scale)))
+            table = table.set_column(i, field.name, pc.cast(scaled, pa.int64()))
+    return table
+
+
+def unscale_table(table):
+    """
+    Inverso de scale_table: inteiros (ou decimais do DuckDB) voltam a float64.
+    Daqui em diante as somas deixam de ser exatas (ver o limite no topo).
+    """
+    for i, field in enumerate(table.schema):
+        scale = SCALED_COLUMNS.get(field.name)
+        if scale is None:
+            continue
+        if pa.types.is_integer(field.type):
+            values = pc.divide(pc.cast(table[i], pa.float64()), float(scale))
+            table = table.set_column(i, field.name, values)
+        elif pa.types.is_decimal(field.type):
+            table = table.set_column(i, field.name, pc.cast(table[i], pa.float64()))
+    return table
+
+
+def to_table(data):
+    """
+    Tabela Arrow no formato de gravação. DataFrames passam por apply_schema e
+    to_storage; tabelas (ex: extractor.build_tables) já chegam tipadas. Em
+    ambos os casos, os valores em R$ e as tarifas viram inteiros escalados.
+    """
+    if not isinstance(data, pa.Table):
+        data = pa.Table.from_pandas(
+            to_storage(apply_schema(data)), preserve_index=False
+        )
+    return scale_table(data)
+
+
+def table_to_frame(table):
+    """
+    Converte uma tabela Arrow lida do banco em DataFrame tipado.
+    Os textos são codificados por dicionário ainda no Arrow, então viram
+    categóricos sem materializar uma coluna de objetos Python; os inteiros
+    escalados voltam a float64 em reais.
+    """
+    table = unscale_table(table)
+    for i, field in enumerate(table.schema):
+        if field.name in TEXT_COLUMNS and pa.types.is_string(field.type):
+            table = table.set_column(i, field.name, pc.dictionary_encode(table[i]))
+    return apply_schema(table.replace_schema_metadata(None).to_pandas())
@@ -0,0 +1,197 @@
+"""
+Resumo mensal por (Cliente, Referência): os agregados que o Home, a página
+de importação e os painéis recalculavam a partir das linhas de itens.
+
+Cada linha do resumo traz, para uma fatura:
+- Valor (R$): soma dos itens (total da conta);
+- Consumo kWh: medição da rede, sem a energia injetada;
+- Injetado kWh: energia injetada (geração solar);
+- CIP (R$): itens de iluminação pública;
+- ICMS e PIS/COFINS: soma das colunas de imposto dos itens;
+- Qtd. Itens: número de itens da fatura.
+
+Os valores em R$ são somados em centavos (int64), então os totais são exatos
+mesmo sobre muitos meses; saem em reais (float64), como as demais colunas.
+
+O backend DuckDB calcula o mesmo resumo em SQL (duckdb_backend.monthly_summary).
+"""
+
+import numpy as np
+import pandas as pd
+
+from src.database.schema import (
+    CLIENT_COL,
+    MONEY_SCALE,
+    PERIOD_COL,
+    REFERENCE_COL,
+    SCALED_COLUMNS,
+    apply_schema,
+    to_cents,
+)
+
+# Classificação de linhas (mesmas regras dos painéis, sem diferenciar maiúsculas)
+INJECTED_PATTERN = "INJ|GERA"  # P.Horário/Segmento de energia injetada
+PUBLIC_LIGHTING_PATTERN = "ILUM|CIP|PUB"  # Itens de Fatura da CIP
+
+SUMMARY_KEYS = [CLIENT_COL, REFERENCE_COL, PERIOD_COL]
+SUMMARY_VALUES = [
+    "Valor (R$)",
+    "Consumo kWh",
+    "Injetado kWh",
+    "CIP (R$)",
+    "ICMS",
+    "PIS/COFINS",
+    "Qtd. Itens",
+]
+SUMMARY_COLUMNS = SUMMARY_KEYS + SUMMARY_VALUES
+# Valores vindos de cada tabela (cada uma substitui a fatura inteira no save_data)
+FATURAS_VALUES = ["Valor (R$)", "CIP (R$)", "ICMS", "PIS/COFINS", "Qtd. Itens"]
+MEDICAO_VALUES = ["Consumo kWh", "Injetado kWh"]
+# Valores em R$: somados em centavos
+MONEY_VALUES = [col for col in SUMMARY_VALUES if col in SCALED_COLUMNS]
+
+# Colunas das tabelas de itens necessárias para montar o resumo
+FATURAS_SOURCE = SUMMARY_KEYS + ["Itens de Fatura", "Valor (R$)", "ICMS", "PIS/COFINS"]
+MEDICAO_SOURCE = SUMMARY_KEYS + ["P.Horário/Segmento", "Consumo kWh"]
+
+
+def _matches(series, pattern):
+    return series.astype(str).str.contains(pattern, case=False, na=False)
+
+
+def _column(df, col):
+    if col in df.columns:
+        return df[col]
+    return pd.Series(0.0, index=df.index)
+
+
+def summarize_months(df_faturas, df_medicao):
+    """Monta o resumo mensal (SUMMARY_COLUMNS) a partir das tabelas de itens."""
+    parts = []
+
+    if not df_faturas.empty:
+        df_fin = apply_schema(df_faturas)
+        valor = to_cents(_column(df_fin, "Valor (R$)"))
+        cip = _matches(df_fin["Itens de Fatura"], PUBLIC_LIGHTING_PATTERN)
+        df_fin = pd.DataFrame(
+            {
+                **{k: df_fin[k] for k in SUMMARY_KEYS if k in df_fin.columns},
+                "Valor (R$)": valor,
+                "CIP (R$)": np.where(cip.to_numpy(), valor, 0),
+                "ICMS": to_cents(_column(df_fin, "ICMS")),
+                "PIS/COFINS": to_cents(_column(df_fin, "PIS/COFINS")),
+                "Qtd. Itens": 1,
+            },
+            index=df_fin.index,
+        )
+        parts.append(df_fin)
+
+    if not df_medicao.empty:
+        df_med = apply_schema(df_medicao)
+        consumo = _column(df_med, "Consumo kWh")
+        injetado = _matches(df_med["P.Horário/Segmento"], INJECTED_PATTERN)
+        df_med = pd.DataFrame(
+            {
+                **{k: df_med[k] for k in SUMMARY_KEYS if k in df_med.columns},
+                "Consumo kWh": consumo.where(~injetado, 0.0),
+                "Injetado kWh": consumo.where(injetado, 0.0),
+            }
+        )
+        parts.append(df_med)
+
+    if not parts:
+        return empty_summary()
+
+    df_all = pd.concat([_to_keys(df) for df in parts], ignore_index=True).reindex(
+        columns=SUMMARY_COLUMNS
+    )
+    # Centavos e contagem como int64: a soma roda sobre inteiros, sem erro acumulado
+    integers = MONEY_VALUES + ["Qtd. Itens"]
+    df_all[integers] = df_all[integers].fillna(0).astype("int64")
+    df_sum = (
+        df_all.groupby(SUMMARY_KEYS, dropna=False, sort=False)[SUMMARY_VALUES]
+        .sum(min_count=0)
+        .reset_index()
+    )
+    df_sum[MONEY_VALUES] = df_sum[MONEY_VALUES] / MONEY_SCALE
+    return _sort_summary(apply_schema(df_sum))[SUMMARY_COLUMNS]
+
+
+def _to_keys(df):
+    """Chaves do resumo como tipos simples, para concatenar e agrupar."""
+    df = df.copy(deep=False)
+    if CLIENT_COL not in df.columns:
+        df[CLIENT_COL] = pd.array([pd.NA] * len(df), dtype="Int64")
+    df[REFERENCE_COL] = df[REFERENCE_COL].astype(object)
+    return df
+
+
+def _sort_summary(df):
+    """Ordena o resumo por (Cliente, Período), como load_data."""
+    return df.sort_values(
+        [CLIENT_COL, PERIOD_COL], kind="stable", na_position="last"
+    ).reset_index(drop=True)
+
+
+def empty_summary():
+    return apply_schema(pd.DataFrame(columns=SUMMARY_COLUMNS))[SUMMARY_COLUMNS]
+
+
+def update_summary(df_sum, df_faturas, df_medicao):
+    """
+    Resumo `df_sum` com as faturas de um lote recalculadas, sem reler o
+    histórico. Como no save_data, cada tabela substitui a fatura inteira: as
+    colunas de faturas de um mês só mudam se o lote trouxer itens dele, e as
+    de medição idem.
+    """
+    parts = []
+    for values, df_new in (
+        (FATURAS_VALUES, summarize_months(df_faturas, pd.DataFrame())),
+        (MEDICAO_VALUES, summarize_months(pd.DataFrame(), df_medicao)),
+    ):
+        df_old = _to_keys(df_sum[SUMMARY_KEYS + values])
+        df_new = _to_keys(df_new[SUMMARY_KEYS + values])
+        if not df_new.empty:
+            touched = df_old.merge(
+                df_new[SUMMARY_KEYS].drop_duplicates(), how="left", indicator=True
+            )["_merge"]
+            df_old = df_old[(touched == "left_only").to_numpy()]
+        frames = [df for df in (df_old, df_new) if not df.empty]
+        parts.append(pd.concat(frames, ignore_index=True) if frames else df_old)
+
+    df_all = parts[0].merge(parts[1], on=SUMMARY_KEYS, how="outer")
+    df_all[SUMMARY_VALUES] = df_all[SUMMARY_VALUES].fillna(0)
+    df_all["Qtd. Itens"] = df_all["Qtd. Itens"].astype("int64")
+    return _sort_summary(apply_schema(df_all))[SUMMARY_COLUMNS]
+
+
+def filter_summary(df_sum, client=None, years=None, periods=None):
+    """Aplica ao resumo os mesmos filtros de load_data (sobre poucas centenas de linhas)."""
+    mask = pd.Series(True, index=df_sum.index)
+    if client is not None:
+        mask &= df_sum[CLIENT_COL] == int(client)
+    if years is not None:
+        mask &= (df_sum[PERIOD_COL] // 100).isin([int(y) for y in years])
+    if periods is not None:
+        start, end = periods
+        if start is not None:
+            mask &= df_sum[PERIOD_COL] >= int(start)
+        if end is not None:
+            mask &= df_sum[PERIOD_COL] <= int(end)
+    return df_sum[mask.fillna(False).to_numpy(dtype=bool)].reset_index(drop=True)
+
+
+def by_month(df_sum, values):
+    """
+    Soma colunas do resumo por mês (Referência + Período), juntando clientes.
+    Valores em R$ são somados em centavos.
+    """
+    money = [col for col in values if col in SCALED_COLUMNS]
+    df_sum = df_sum.assign(**{col: to_cents(df_sum[col]) for col in money})
+    df_month = (
+        df_sum.groupby([REFERENCE_COL, PERIOD_COL], observed=True, dropna=False)[values]
+        .sum()
+        .reset_index()
+    )
+    df_month[money] = df_month[money] / MONEY_SCALE
+    return df_month
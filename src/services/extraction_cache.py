@@ -0,0 +1,127 @@
+"""
+Cache persistente de resultados de extração.
+
+Cada PDF é identificado pelo SHA-256 dos seus bytes somado à versão do extrator.
+Os dois DataFrames resultantes (financeiro e medição) ficam em Parquet (zstd);
+no modo Arrow (extractor.build_tables) as tabelas tipadas ficam numa entrada
+à parte, com o sufixo ".arrow" na chave. O diretório é limitado em tamanho
+com descarte LRU (pelo mtime dos arquivos, que é atualizado a cada acerto).
+"""
+
+import hashlib
+import os
+import threading
+
+import pandas as pd
+import pyarrow as pa
+import pyarrow.parquet as pq
+
+from src.services.extractor import EXTRACTOR_VERSION
+
+# --- CONFIGURAÇÃO ---
+CACHE_FOLDER = "data/cache/extraction"
+MAX_CACHE_BYTES = 256 * 1024 * 1024  # 256 MB
+
+_SUFFIX_FIN = ".fin.parquet"
+_SUFFIX_MED = ".med.parquet"
+_ARROW_TAG = ".arrow"  # Entradas gravadas como tabelas Arrow tipadas
+
+
+def content_hash(data):
+    """SHA-256 (hex) dos bytes do PDF."""
+    return hashlib.sha256(data).hexdigest()
+
+
+def cache_key(digest, version=None):
+    """Chave do cache: hash do conteúdo + versão do extrator."""
+    return f"{digest}-v{version or EXTRACTOR_VERSION}"
+
+
+def _entry_paths(key, arrow=False):
+    base = os.path.join(CACHE_FOLDER, key + (_ARROW_TAG if arrow else ""))
+    return base + _SUFFIX_FIN, base + _SUFFIX_MED
+
+
+def get_cached_extraction(key, arrow=False):
+    """
+    Retorna (df_fin, df_med) se a chave estiver no cache, senão None.
+    Com `arrow=True`, as tabelas Arrow gravadas por essa mesma variante.
+    Um acerto renova o mtime da entrada (política LRU).
+    """
+    path_fin, path_med = _entry_paths(key, arrow)
+    if not (os.path.exists(path_fin) and os.path.exists(path_med)):
+        return None
+
+    read = pq.read_table if arrow else pd.read_parquet
+    try:
+        df_fin = read(path_fin)
+        df_med = read(path_med)
+        os.utime(path_fin)
+        os.utime(path_med)
+        return df_fin, df_med
+    except (OSError, pa.ArrowException) as e:
+        print(f"⚠️ Cache de extração corrompido ({key}): {e}")
+        return None
+
+
+def put_cached_extraction(key, df_fin, df_med):
+    """
+    Grava o resultado da extração no cache e aplica o limite de tamanho.
+    Tabelas Arrow vão para a entrada Arrow da chave, DataFrames para a comum.
+    """
+    os.makedirs(CACHE_FOLDER, exist_ok=True)
+    arrow = isinstance(df_fin, pa.Table)
+
+    try:
+        for df, path in zip((df_fin, df_med), _entry_paths(key, arrow)):
+            # Escreve em arquivo temporário e renomeia: leitores nunca veem meia
+            # entrada. Um temporário por processo e thread (o pipeline grava
+            # em várias threads, e o mesmo PDF pode aparecer duas vezes no lote)
+            tmp_path = f"{path}.{os.getpid()}.{threading.get_ident()}.tmp"
+            try:
+                if arrow:
+                    pq.write_table(df, tmp_path, compression="zstd")
+                else:
+                    df.to_parquet(tmp_path, index=False, compression="zstd")
+                os.replace(tmp_path, path)
+            finally:
+                if os.path.exists(tmp_path):
+                    os.remove(tmp_path)
+    except (OSError, pa.ArrowException) as e:
+        print(f"⚠️ Falha ao gravar cache de extração: {e}")
+        return False
+
+    _evict_if_needed()
+    return True
+
+
+def _evict_if_needed(max_bytes=None):
+    """Remove as entradas menos usadas até o cache caber em `max_bytes`."""
+    max_bytes = MAX_CACHE_BYTES if max_bytes is None else max_bytes
+
+    entries = {}
+    total = 0
+    with os.scandir(CACHE_FOLDER) as it:
+        for item in it:
+            if not item.name.endswith((_SUFFIX_FIN, _SUFFIX_MED)):
+                continue
+            stat = item.stat()
+            # "<chave>[.arrow].fin.parquet": a variante Arrow conta como outra entrada
+            key = item.name.rsplit(".", 2)[0]
+            size, mtime = entries.get(key, (0, 0))
+            entries[key] = (size + stat.st_size, max(mtime, stat.st_mtime))
+            total += stat.st_size
+
+    if total <= max_bytes:
+        return
+
+    # Mais antigos primeiro
+    for key, (size, _) in sorted(entries.items(), key=lambda kv: kv[1][1]):
+        for path in _entry_paths(key):
+            try:
+                os.remove(path)
+            except FileNotFoundError:
+                pass
+        total -= size
+        if total <= max_bytes:
+            break
@@ -1,6 +1,22 @@
 import pdfplumber
 import re
+import numpy as np
 import pandas as pd
+import pyarrow as pa
+import pyarrow.compute as pc
+
+from src.database.schema import (
+    ARROW_TYPES,
+    DATE_COLUMNS,
+    DATE_FORMAT,
+    parse_period,
+    period_to_date,
+)
+from src.utils.numbers import parse_br_numbers
+
+# Versão da lógica de extração. Incrementar sempre que a saída do parser mudar:
+# ela compõe a chave do cache de resultados.
+EXTRACTOR_VERSION = "5"
 
 # --- HELPER FUNCTIONS ---
 
@@ -43,24 +59,107 @@ def normalize_negative_value(value_str):
     return value_str
 
 
+# --- PADRÕES PRÉ-COMPILADOS ---
+# Compilados uma única vez na importação: o parser roda milhares de vezes por lote.
+
+_MONTHS = "JAN|FEV|MAR|ABR|MAI|JUN|JUL|AGO|SET|OUT|NOV|DEZ"
+
+# Remove Histórico apenas se tiver espaço antes (ex: " JAN/24")
+HISTORY_TAIL_RE = re.compile(rf"\s(?:{_MONTHS})[\s\/]*\d{{2,4}}.*$", re.IGNORECASE)
+UNIT_LINE_RE = re.compile(r"^(.*?)\s+(kWh|kW|dias|unid|un)\s+(.*)$", re.IGNORECASE)
+SIMPLE_LINE_RE = re.compile(r"^(.*?)\s+(\d+[.,]\d{2}.*)$")
+VALUES_TAIL_RE = re.compile(
+    r"\s(I\s?CMS|LID|DE|FATURAMENTO|TRIBUTOS|COFINS|PIS).*", re.IGNORECASE
+)
+
+REFERENCE_RE = re.compile(r"(?<!\d/)\b(\d{2}/\d{4})\b")
+CLIENT_CODE_RE = re.compile(r"utilizando\s+o\s+código\s+(\d+)", re.IGNORECASE)
+# Layout visual: código do cliente no fim de uma linha e a referência logo abaixo
+CLIENT_TAIL_RE = re.compile(r"\b(\d{7,12})\s*$")
+REFERENCE_HEAD_RE = re.compile(r"^\s*\d{2}/\d{4}")
+
+# Procura linha com data (dd/mm/aaaa) e números
+MEASURE_RE = re.compile(
+    r"(\S+)\s+(.+?)\s+(\d{2}/\d{2}/\d{4})\s+([\d.]+)\s+(\d{2}/\d{2}/\d{4})\s+([\d.]+)\s+([\d.]+)\s+([\d.]+)\s+(\d+)"
+)
+# Pré-filtro barato: só linhas com duas datas de leitura passam para o MEASURE_RE,
+# que sofre backtracking pesado em linhas longas de cabeçalho
+MEASURE_HINT_RE = re.compile(r"\d{2}/\d{2}/\d{4}\s+[\d.]+\s+\d{2}/\d{2}/\d{4}\s")
+MEASURE_START_RE = re.compile(r"EQUIPAMENTOS DE MEDIÇÃO|DADOS DE MEDIÇÃO")
+MEASURE_END_RE = re.compile(r"MÊS/ANO|HISTÓRICO|NOTIFICAÇÃO")
+
+ITEMS_END_RE = re.compile(r"TOTAL")  # Também cobre "SUBTOTAL"
+LOOSE_NUMBER_RE = re.compile(r"^\d{5,}")  # Números soltos grandes
+HISTORY_DESC_RE = re.compile(rf"^(?:{_MONTHS})[\s\/\-]*\d{{2,4}}$")
+
+IGNORED_TERMS = [
+    "MÊS/ANO",
+    "COMSUMO",
+    "CONSUMO",
+    "TIPOS DE FATURAMENTO",
+    "DIAS",
+    "TRIBUTOS",
+    "ICMS UNIT",
+    "PIS/PASEP",
+    "DADOS DE MEDIÇÃO",
+    "LEITURA",
+    "CONST. MEDIDOR",
+    "GRANDEZAS",
+    "POSTOS TARIFÁRIOS",
+    "ELE-",
+    "HFP",
+    "SALDO",
+    "RESERVADO",
+]
+IGNORED_TERMS_RE = re.compile("|".join(re.escape(term) for term in IGNORED_TERMS))
+
+# Descrições que são apenas cabeçalhos fiscais
+FISCAL_HEADERS = frozenset(["PIS", "COFINS", "ICMS", "I CMS", "TOTAL", "SUBTOTAL"])
+
+VALUE_FIELDS = [
+    "Quant.",
+    "Preço unit (R$) com tributos",
+    "Valor (R$)",
+    "PIS/COFINS",
+    "Base Calc ICMS (R$)",
+    "Alíquota ICMS",
+    "ICMS",
+    "Tarifa unit (R$)",
+]
+SIMPLE_TAX_FIELDS = ["PIS/COFINS", "Base Calc ICMS (R$)", "Alíquota ICMS", "ICMS"]
+
+MEASURE_FIELDS = [
+    "N° Medidor",
+    "P.Horário/Segmento",
+    "Data Leitura (Anterior)",
+    "Leitura (Anterior)",
+    "Data Leitura (Atual)",
+    "Leitura (Atual)",
+    "Fator Multiplicador",
+    "Consumo kWh",
+    "N° Dias",
+]
+MEASURE_NUMBER_FIELDS = [
+    "Leitura (Anterior)",
+    "Leitura (Atual)",
+    "Fator Multiplicador",
+    "Consumo kWh",
+    "N° Dias",
+]
+
+
 def clean_line(line):
     """
     Tenta separar a linha em: Descrição | Unidade | Valores
     """
     # 1. Remove Histórico (Estratégia Conservadora)
-    # Remove apenas se tiver espaço antes (ex: " JAN/24") para não quebrar linhas que começam com texto
-    history_pattern = (
-        r"\s(JAN|FEV|MAR|ABR|MAI|JUN|JUL|AGO|SET|OUT|NOV|DEZ)[\s\/]*\d{2,4}.*$"
-    )
-    cleaned_line = re.sub(history_pattern, "", line, flags=re.IGNORECASE).strip()
+    cleaned_line = HISTORY_TAIL_RE.sub("", line).strip()
 
     if not cleaned_line:
         return None
 
     # 2. Tenta encontrar unidades conhecidas (kWh, dias, etc)
-    unit_match = re.search(
-        r"^(.*?)\s+(kWh|kW|dias|unid|un)\s+(.*)$", cleaned_line, re.IGNORECASE
-    )
+    unit_match = UNIT_LINE_RE.search(cleaned_line)
     if unit_match:
         return {
             "description": unit_match.group(1).strip(),
@@ -70,7 +169,7 @@ def clean_line(line):
         }
 
     # 3. Itens Simples (Descrição + Valor)
-    number_match = re.search(r"^(.*?)\s+(\d+[.,]\d{2}.*)$", cleaned_line)
+    number_match = SIMPLE_LINE_RE.search(cleaned_line)
     if number_match:
         return {
             "description": number_match.group(1).strip(),
@@ -86,114 +185,66 @@ def process_values(values_str, item_type):
     """
     Mapeia a string de números para as colunas corretas.
     """
-    clean_values = re.sub(
-        r"\s(I\s?CMS|LID|DE|FATURAMENTO|TRIBUTOS|COFINS|PIS).*",
-        "",
-        values_str,
-        flags=re.IGNORECASE,
-    ).strip()
+    clean_values = VALUES_TAIL_RE.sub("", values_str).strip()
+
+    # Tokens como impressos ("1.264,27", "19,52-"): a conversão para número
+    # fica com o parse_br_numbers, que entende ponto de milhar e sinal no fim
     tokens = clean_values.split()
 
-    # Normaliza valores negativos (formato "19,52-" -> "-19.52")
-    tokens = [normalize_negative_value(token) for token in tokens]
-
-    columns = {
-        "Quant.": "",
-        "Preço unit (R$) com tributos": "",
-        "Valor (R$)": "",
-        "PIS/COFINS": "",
-        "Base Calc ICMS (R$)": "",
-        "Alíquota ICMS": "",
-        "ICMS": "",
-        "Tarifa unit (R$)": "",
-    }
+    columns = dict.fromkeys(VALUE_FIELDS, "")
 
     if not tokens:
         return columns
 
     if item_type == "standard":
-        fields = [
-            "Quant.",
-            "Preço unit (R$) com tributos",
-            "Valor (R$)",
-            "PIS/COFINS",
-            "Base Calc ICMS (R$)",
-            "Alíquota ICMS",
-            "ICMS",
-            "Tarifa unit (R$)",
-        ]
-
-        # Tenta encaixar os tokens nos campos
-        if len(tokens) >= 8:
-            for i, field in enumerate(fields):
-                columns[field] = tokens[i]
-        elif len(tokens) >= 3:
-            columns["Quant."] = tokens[0]
-            columns["Preço unit (R$) com tributos"] = tokens[1]
-            columns["Valor (R$)"] = tokens[2]
-            # Preenche o restante se houver
-            for i, val in enumerate(tokens[3:]):
-                if i < len(fields[3:]):
-                    columns[fields[3 + i]] = val
+        # Encaixa Quant., Preço e Valor; preenche o restante se houver
+        if len(tokens) >= 3:
+            columns.update(zip(VALUE_FIELDS, tokens))
 
     elif item_type == "simple":
         columns["Valor (R$)"] = tokens[0]
-        fields = ["PIS/COFINS", "Base Calc ICMS (R$)", "Alíquota ICMS", "ICMS"]
-        for i, val in enumerate(tokens[1:]):
-            if i < len(fields):
-                columns[fields[i]] = val
+        columns.update(zip(SIMPLE_TAX_FIELDS, tokens[1:]))
 
     return columns
 
 
-def extract_measurement(full_text):
-    measurement_items = []
-    lines = full_text.split("\n")
-    is_capturing = False
-
-    # Regex ajustado para pegar medição (Consumo)
-    # Procura linha com data (dd/mm/aaaa) e números
-    regex_measure = re.compile(
-        r"(\S+)\s+(.+?)\s+(\d{2}/\d{2}/\d{4})\s+([\d.]+)\s+(\d{2}/\d{2}/\d{4})\s+([\d.]+)\s+([\d.]+)\s+([\d.]+)\s+(\d+)"
-    )
+def _parse_item_line(clean_txt, upper_txt):
+    """Converte uma linha da tabela financeira em item, ou None se for ruído."""
+    # Filtros de ruído
+    if IGNORED_TERMS_RE.search(upper_txt):
+        return None
+    if LOOSE_NUMBER_RE.match(clean_txt):
+        return None
 
-    for line in lines:
-        line_upper = line.upper().strip()
+    info = clean_line(clean_txt)
+    if not info or len(info["description"]) <= 2:
+        return None
 
-        if "EQUIPAMENTOS DE MEDIÇÃO" in line_upper or "DADOS DE MEDIÇÃO" in line_upper:
-            is_capturing = True
-            continue
+    desc_upper = info["description"].upper().strip()
 
-        if is_capturing:
-            if (
-                "MÊS/ANO" in line_upper
-                or "HISTÓRICO" in line_upper
-                or "NOTIFICAÇÃO" in line_upper
-            ):
-                break
-
-            match = regex_measure.search(line)
-            if match:
-                measurement_items.append(
-                    {
-                        "N° Medidor": match.group(1),
-                        "P.Horário/Segmento": match.group(2),
-                        "Data Leitura (Anterior)": match.group(3),
-                        "Leitura (Anterior)": match.group(4),
-                        "Data Leitura (Atual)": match.group(5),
-                        "Leitura (Atual)": match.group(6),
-                        "Fator Multiplicador": match.group(7),
-                        "Consumo kWh": match.group(8),
-                        "N° Dias": match.group(9),
-                    }
-                )
-    return measurement_items
+    # Ignora linhas que sejam apenas cabeçalhos fiscais
+    if desc_upper in FISCAL_HEADERS:
+        return None
 
+    # Ignora linhas que sejam HISTÓRICO (Ex: ABR/24 ou ABR 24)
+    if HISTORY_DESC_RE.match(desc_upper):
+        return None
 
-# --- MAIN EXTRACTION FUNCTION ---
+    return {
+        "Itens de Fatura": info["description"],
+        "Unid.": info["unit"],
+        **process_values(info["values_str"], info["type"]),
+    }
 
 
-def extract_invoice_data(file_path, password=None):
+def parse_layout_text(text):
+    """
+    Lê o texto de layout da fatura em uma única passada.
+
+    Cada linha é convertida para maiúsculas uma só vez e alimenta, ao mesmo
+    tempo, a busca de Referência/Cliente e as máquinas de estado das seções
+    de Medição e de Itens de Fatura.
+    """
     data = {
         "reference": "Not Found",
         "client_id": "Not Found",
@@ -201,124 +252,117 @@ def extract_invoice_data(file_path, password=None):
         "measurement": [],
     }
 
-    IGNORED_TERMS = [
-        "MÊS/ANO",
-        "COMSUMO",
-        "CONSUMO",
-        "TIPOS DE FATURAMENTO",
-        "DIAS",
-        "TRIBUTOS",
-        "ICMS UNIT",
-        "PIS/PASEP",
-        "DADOS DE MEDIÇÃO",
-        "LEITURA",
-        "CONST. MEDIDOR",
-        "GRANDEZAS",
-        "POSTOS TARIFÁRIOS",
-        "ELE-",
-        "HFP",
-        "SALDO",
-        "RESERVADO",
-    ]
+    client_code = None
+    client_visual = None
+    last_line = ""  # Última linha não vazia (para o layout visual do código)
 
-    try:
-        # Verifica se é path string ou objeto de arquivo (Streamlit)
-        if isinstance(file_path, str):
-            pdf_context = pdfplumber.open(file_path, password=password)
-        else:
-            pdf_context = pdfplumber.open(file_path, password=password)
+    # Estados das seções: 0 = aguardando, 1 = capturando, 2 = encerrada
+    measure_state = 0
+    items_state = 0
 
-        with pdf_context as pdf:
-            page = pdf.pages[0]
-            # layout=True é essencial para manter a estrutura visual
-            text = page.extract_text(layout=True)
+    for line in text.split("\n"):
+        clean_txt = line.strip()
+        if not clean_txt:
+            continue
+        upper_txt = clean_txt.upper()
 
-            # 1. Reference (Mês/Ano)
-            ref_match = re.search(r"(?<!\d/)\b(\d{2}/\d{4})\b", text)
+        # 1. Reference (Mês/Ano)
+        if data["reference"] == "Not Found":
+            ref_match = REFERENCE_RE.search(line)
             if ref_match:
                 data["reference"] = ref_match.group(1)
 
-            # 2. Client ID
-            code_match = re.search(
-                r"utilizando\s+o\s+código\s+(\d+)", text, re.IGNORECASE
-            )
+        # 2. Client ID
+        if client_code is None:
+            code_match = CLIENT_CODE_RE.search(line)
             if code_match:
-                data["client_id"] = code_match.group(1)
-            else:
-                visual_match = re.search(r"\b(\d{7,12})\s*\n\s*\d{2}/\d{4}", text)
+                client_code = code_match.group(1)
+            elif client_visual is None and REFERENCE_HEAD_RE.match(line):
+                visual_match = CLIENT_TAIL_RE.search(last_line)
                 if visual_match:
-                    data["client_id"] = visual_match.group(1)
+                    client_visual = visual_match.group(1)
+        last_line = line
+
+        # 3. Measurement Data
+        if measure_state < 2:
+            if MEASURE_START_RE.search(upper_txt):
+                measure_state = 1
+            elif measure_state == 1:
+                if MEASURE_END_RE.search(upper_txt):
+                    measure_state = 2
+                elif MEASURE_HINT_RE.search(line):
+                    match = MEASURE_RE.search(line)
+                    if match:
+                        data["measurement"].append(
+                            dict(zip(MEASURE_FIELDS, match.groups()))
+                        )
+
+        # 4. Financial Items
+        if items_state < 2:
+            # Detecta início da tabela financeira
+            if (
+                "DESCRI" in upper_txt or "ITENS" in upper_txt
+            ) and "FATURA" in upper_txt:
+                items_state = 1
+            elif items_state == 1:
+                # Detecta fim da tabela
+                if ITEMS_END_RE.search(upper_txt):
+                    items_state = 2
+                else:
+                    item = _parse_item_line(clean_txt, upper_txt)
+                    if item:
+                        data["items"].append(item)
 
-            # 3. Measurement Data
-            data["measurement"] = extract_measurement(text)
+    if client_code is None:
+        # O "\s+" da frase também casa com a quebra de linha ("utilizando o\n
+        # código 123"): sem achado linha a linha, busca no texto inteiro
+        code_match = CLIENT_CODE_RE.search(text)
+        if code_match:
+            client_code = code_match.group(1)
 
-            # 4. Financial Items extraction
-            lines = text.split("\n")
-            is_capturing = False
-            temp_items = []
+    if client_code is not None:
+        data["client_id"] = client_code
+    elif client_visual is not None:
+        data["client_id"] = client_visual
 
-            for line in lines:
-                clean_txt = line.strip()
-                upper_txt = clean_txt.upper()
+    return data
 
-                if not clean_txt:
-                    continue
 
-                # Detecta início da tabela financeira
-                if (
-                    "DESCRI" in upper_txt or "ITENS" in upper_txt
-                ) and "FATURA" in upper_txt:
-                    is_capturing = True
-                    continue
+def extract_measurement(full_text):
+    """Retorna apenas as linhas da seção de medição do texto de layout."""
+    return parse_layout_text(full_text)["measurement"]
 
-                # Detecta fim da tabela
-                if is_capturing and ("TOTAL" in upper_txt or "SUBTOTAL" in upper_txt):
-                    is_capturing = False
-                    break
-
-                if is_capturing:
-                    # Filtros de ruído
-                    if any(term in upper_txt for term in IGNORED_TERMS):
-                        continue
-                    if re.match(r"^\d{5,}", clean_txt):
-                        continue  # Números soltos grandes
-
-                    info = clean_line(clean_txt)
-
-                    if info and info["description"] and len(info["description"]) > 2:
-                        desc_upper = info["description"].upper().strip()
-
-                        # --- FILTRO DE LIXO PÓS-EXTRAÇÃO (AQUI É A CORREÇÃO) ---
-                        # Ignora linhas que sejam apenas cabeçalhos fiscais
-                        if desc_upper in [
-                            "PIS",
-                            "COFINS",
-                            "ICMS",
-                            "I CMS",
-                            "TOTAL",
-                            "SUBTOTAL",
-                        ]:
-                            continue
-
-                        # Ignora linhas que sejam HISTÓRICO (Ex: ABR/24 ou ABR 24)
-                        # Isso elimina o erro [ABR24] sem quebrar as outras linhas
-                        if re.match(
-                            r"^(JAN|FEV|MAR|ABR|MAI|JUN|JUL|AGO|SET|OUT|NOV|DEZ)[\s\/\-]*\d{2,4}$",
-                            desc_upper,
-                        ):
-                            continue
-                        # -------------------------------------------------------
-
-                        value_cols = process_values(info["values_str"], info["type"])
-                        item = {
-                            "Itens de Fatura": info["description"],
-                            "Unid.": info["unit"],
-                            **value_cols,
-                        }
-                        temp_items.append(item)
-
-            data["items"] = temp_items
-            return data
+
+# --- MAIN EXTRACTION FUNCTION ---
+
+
+def read_pdf_layout(file_path, password=None, with_words=False):
+    """
+    Abre o PDF e devolve o texto de layout da primeira página.
+
+    Retorna um dict com "text" e, se `with_words=True`, "words" (caixas das
+    palavras no formato [texto, x0, top, x1, bottom]). Em caso de erro, None.
+    """
+    try:
+        # Aceita caminho str ou objeto de arquivo (Streamlit)
+        with pdfplumber.open(file_path, password=password) as pdf:
+            page = pdf.pages[0]
+            # layout=True é essencial para manter a estrutura visual
+            layout = {"text": page.extract_text(layout=True)}
+
+            if with_words:
+                layout["words"] = [
+                    [
+                        w["text"],
+                        round(w["x0"], 2),
+                        round(w["top"], 2),
+                        round(w["x1"], 2),
+                        round(w["bottom"], 2),
+                    ]
+                    for w in page.extract_words()
+                ]
+
+        return layout
 
     except Exception as e:
         # Se for erro de senha, avisa diferente
@@ -329,6 +373,13 @@ def extract_invoice_data(file_path, password=None):
         return None
 
 
+def extract_invoice_data(file_path, password=None):
+    layout = read_pdf_layout(file_path, password)
+    if layout is None:
+        return None
+    return parse_layout_text(layout["text"])
+
+
 # --- FUNÇÃO DE INTERFACE (Compatível com a Nova Arquitetura) ---
 
 
@@ -342,7 +393,29 @@ def extract_data_from_pdf(file_path, password=None):
     """
     # 1. Extrai dados brutos usando a função original
     raw_data = extract_invoice_data(file_path, password)
+    return build_dataframes(raw_data)
+
 
+def _parse_numeric_columns(df, columns, default=np.nan):
+    """
+    Converte as colunas numéricas presentes em `df` para float, no lugar.
+    Todas passam por uma única chamada do conversor vetorizado: numa fatura
+    de poucas linhas, o custo fixo por chamada domina o da conversão.
+    """
+    columns = [col for col in columns if col in df.columns]
+    if not columns:
+        return
+    tokens = df[columns].to_numpy(dtype=object).ravel(order="F")
+    parsed = parse_br_numbers(tokens, default).reshape(len(columns), len(df))
+    for col, values in zip(columns, parsed):
+        df[col] = values
+
+
+def build_dataframes(raw_data):
+    """
+    Converte o dict bruto de `parse_layout_text` nos DataFrames
+    financeiro e de medição (etapa comum à extração e ao reparse).
+    """
     if not raw_data:
         return pd.DataFrame(), pd.DataFrame()
 
@@ -369,14 +442,8 @@ def extract_data_from_pdf(file_path, password=None):
             "Tarifa unit (R$)",
         ]
 
-        for col in numeric_cols:
-            if col in df_fin.columns:
-                # Normaliza valores negativos e converte para string
-                df_fin[col] = (
-                    df_fin[col].astype(str).apply(normalize_negative_value).str.strip()
-                )
-                # Converte para float, ignorando valores vazios ou inválidos
-                df_fin[col] = pd.to_numeric(df_fin[col], errors="coerce").fillna(0)
+        # Vazios ou inválidos viram 0
+        _parse_numeric_columns(df_fin, numeric_cols, default=0.0)
     else:
         df_fin = pd.DataFrame()
 
@@ -397,15 +464,85 @@ def extract_data_from_pdf(file_path, password=None):
             "N° Dias",
         ]
 
-        for col in numeric_cols_med:
-            if col in df_med.columns:
-                # Normaliza valores negativos e converte para string
-                df_med[col] = (
-                    df_med[col].astype(str).apply(normalize_negative_value).str.strip()
-                )
-                # Converte para float, ignorando valores vazios ou inválidos
-                df_med[col] = pd.to_numeric(df_med[col], errors="coerce")
+        # Vazios ou inválidos viram NaN
+        _parse_numeric_columns(df_med, numeric_cols_med)
     else:
         df_med = pd.DataFrame()
 
     return df_fin, df_med
+
+
+# --- SAÍDA EM ARROW ---
+
+
+def _parse_client(client_id):
+    """Nº do Cliente como inteiro ("Not Found"/"Desconhecido" viram nulo)."""
+    try:
+        return int(str(client_id).strip())
+    except ValueError:
+        return None
+
+
+def _build_table(rows, number_fields, default, header):
+    """Uma tabela tipada com as colunas das linhas e o cabeçalho da fatura."""
+    # Todos os campos numéricos numa única chamada do conversor
+    numbers = [field for field in rows[0] if field in number_fields]
+    parsed = {}
+    if numbers:
+        tokens = [row.get(field) for field in numbers for row in rows]
+        values = parse_br_numbers(tokens, default).reshape(len(numbers), len(rows))
+        parsed = dict(zip(numbers, values))
+
+    columns = {}
+    for field in rows[0]:
+        if field in parsed:
+            # NaN vira nulo, como na conversão do DataFrame para Arrow
+            columns[field] = pa.array(parsed[field], pa.float64(), from_pandas=True)
+            continue
+
+        values = pa.array([row.get(field) for row in rows], pa.string())
+        if field in DATE_COLUMNS:
+            columns[field] = pc.strptime(
+                values, format=DATE_FORMAT, unit="ns", error_is_null=True
+            )
+        else:
+            columns[field] = values.cast(ARROW_TYPES.get(field, pa.string()))
+
+    for field, value in header.items():
+        columns[field] = pa.repeat(pa.scalar(value, ARROW_TYPES[field]), len(rows))
+    return pa.table(columns)
+
+
+def build_tables(raw_data):
+    """
+    Mesmo resultado de `build_dataframes` (já no esquema tipado), mas como
+    tabelas Arrow montadas direto dos tokens: sem DataFrame intermediário
+    nem colunas de objetos. É o formato que o BatchWriter grava sem
+    conversão, usado na ingestão em lote.
+    """
+    if not raw_data:
+        return pa.table({}), pa.table({})
+
+    reference = raw_data.get("reference", "Not Found")
+    period = parse_period([reference])[0]
+    period = None if pd.isna(period) else int(period)
+    header = {
+        "Referência": reference,
+        "Nº do Cliente": _parse_client(raw_data.get("client_id", "Desconhecido")),
+        "Período": period,
+        "Data Referência": period_to_date([period])[0] if period else None,
+    }
+
+    # Como em build_dataframes: valores financeiros vazios viram 0, medições ficam nulas
+    items = raw_data.get("items", [])
+    table_fin = (
+        _build_table(items, VALUE_FIELDS, 0.0, header) if items else pa.table({})
+    )
+
+    measurements = raw_data.get("measurement", [])
+    table_med = (
+        _build_table(measurements, MEASURE_NUMBER_FIELDS, np.nan, header)
+        if measurements
+        else pa.table({})
+    )
+    return table_fin, table_med
@@ -0,0 +1,214 @@
+"""
+Ingestão de um único PDF: sondagem → hash do conteúdo → cache → desbloqueio
+→ extração.
+
+Usado tanto pelo processamento em lote (main.py) quanto pela página de
+importação, para que os dois caminhos compartilhem o mesmo cache. Também
+oferece o reparse do arquivo histórico a partir do texto de layout armazenado.
+"""
+
+import io
+
+import pandas as pd
+import pyarrow as pa
+
+from src.services.extraction_cache import (
+    cache_key,
+    content_hash,
+    get_cached_extraction,
+    put_cached_extraction,
+)
+from src.services.extractor import (
+    build_dataframes,
+    build_tables,
+    parse_layout_text,
+    read_pdf_layout,
+)
+from src.services.layout_store import get_layout, iter_layouts, put_layout
+from src.services.pdf_probe import probe_pdf
+from src.services.unlocker import unlock_pdf
+
+# --- STATUS DO PROCESSAMENTO ---
+STATUS_OK = "ok"
+STATUS_LOCKED = "locked"  # Tem senha e não foi possível abrir
+STATUS_EMPTY = "empty"  # Abriu, mas não retornou dados financeiros
+STATUS_INVALID = "invalid"  # Não é um PDF (sem cabeçalho %PDF)
+STATUS_TOO_LARGE = "too_large"  # Maior que MAX_PDF_BYTES
+
+# Faturas têm poucas centenas de KB: arquivos muito maiores nem são abertos
+MAX_PDF_BYTES = 20 * 1024 * 1024  # 20 MB
+
+
+def read_pdf_bytes(source):
+    """Lê os bytes de um caminho, bytes ou objeto de arquivo (Streamlit)."""
+    if isinstance(source, (bytes, bytearray)):
+        return bytes(source)
+    if isinstance(source, str):
+        with open(source, "rb") as fh:
+            return fh.read()
+    if hasattr(source, "getvalue"):
+        return source.getvalue()
+
+    source.seek(0)
+    data = source.read()
+    source.seek(0)
+    return data
+
+
+def _new_result(digest, arrow=False, probe=None):
+    empty = pa.table({}) if arrow else pd.DataFrame()
+    return {
+        "fin": empty,
+        "med": empty,
+        "status": STATUS_OK,
+        "cached": False,
+        "key": cache_key(digest) if digest else None,
+        "digest": digest,
+        "probe": probe,
+    }
+
+
+def _build(raw_data, arrow):
+    return build_tables(raw_data) if arrow else build_dataframes(raw_data)
+
+
+def process_pdf(
+    source, password=None, use_cache=True, arrow=False, max_bytes=MAX_PDF_BYTES
+):
+    """
+    Extrai os DataFrames de um PDF, reaproveitando o cache quando possível.
+
+    Retorna um dict com:
+        fin, med: DataFrames financeiro e de medição (com `arrow=True`,
+            tabelas Arrow já tipadas, que o BatchWriter grava sem conversão)
+        status: STATUS_OK, STATUS_LOCKED, STATUS_EMPTY, STATUS_INVALID ou
+            STATUS_TOO_LARGE
+        cached: True se o resultado veio do cache (pdfplumber não foi usado)
+        key: chave do conteúdo no cache (None se o arquivo foi recusado)
+        digest: SHA-256 do conteúdo (None se o arquivo foi recusado)
+        probe: PdfProbe da sondagem (cabeçalho, /Encrypt, páginas, tamanho)
+
+    A sondagem roda antes de ler o arquivo inteiro (caminhos são mapeados em
+    memória): arquivos que não são PDF ou maiores que `max_bytes` são
+    recusados sem hash nem pdfplumber.
+
+    Se só o texto de layout estiver armazenado (ex: após mudar a versão do
+    extrator), o PDF não é reaberto: apenas o parser roda de novo.
+
+    As três etapas (prepare_pdf, extract_job, complete_pdf) também podem
+    rodar separadas, como no pipeline em estágios (src/services/pipeline.py).
+    """
+    result, job = prepare_pdf(source, password, use_cache, arrow, max_bytes)
+    if job is None:
+        return result
+    return complete_pdf(result, extract_job(job, arrow), use_cache)
+
+
+def prepare_pdf(
+    source, password=None, use_cache=True, arrow=False, max_bytes=MAX_PDF_BYTES
+):
+    """
+    Etapa de leitura (E/S): sondagem, hash, cache e desbloqueio.
+
+    Retorna (result, job). Com `job=None`, o resultado já está pronto
+    (recusado, sem senha ou vindo do cache). Senão, `job` é o trabalho de
+    extração para `extract_job`: {"pdf": bytes desbloqueados} (com a
+    senha, se a sondagem não viu o /Encrypt) ou {"layout": texto de layout
+    já armazenado}.
+    """
+    probe = probe_pdf(source, max_bytes=max_bytes)
+    if not probe.is_pdf or (max_bytes is not None and probe.size > max_bytes):
+        result = _new_result(None, arrow, probe)
+        result["status"] = STATUS_INVALID if not probe.is_pdf else STATUS_TOO_LARGE
+        return result, None
+
+    data = read_pdf_bytes(source)
+
+    digest = content_hash(data)
+    result = _new_result(digest, arrow, probe)
+
+    if use_cache:
+        cached = get_cached_extraction(result["key"], arrow=arrow)
+        if cached is not None:
+            result["fin"], result["med"] = cached
+            result["cached"] = True
+            return result, None
+
+        layout = get_layout(digest)
+        if layout is not None:
+            return result, {"layout": layout}
+
+    # Desbloqueio em memória (só quando a sondagem achou o /Encrypt); os
+    # bytes já lidos são reaproveitados, sem arquivo temporário nem releitura
+    if probe.encrypted:
+        unlocked = unlock_pdf(io.BytesIO(data), password=password)
+        if unlocked is None:
+            result["status"] = STATUS_LOCKED
+            return result, None
+        return result, {"pdf": unlocked.getvalue()}
+
+    # A sondagem é heurística: a senha segue junto caso o PDF esteja cifrado
+    return result, {"pdf": data, "password": password}
+
+
+def extract_job(job, arrow=False):
+    """
+    Etapa de extração (CPU): pdfplumber e parser, sem efeitos em disco (pode
+    rodar em outro processo). Retorna (layout, tabelas): `layout` é o texto
+    lido do PDF, a guardar para reparses (None se veio armazenado), e
+    `tabelas` é (fin, med), ou o status da falha (STATUS_EMPTY se o PDF não
+    pôde ser lido, STATUS_LOCKED se a senha não o abriu).
+    """
+    if "layout" in job:
+        return None, _build(parse_layout_text(job["layout"]["text"]), arrow)
+
+    layout = read_pdf_layout(io.BytesIO(job["pdf"]), with_words=True)
+    if layout is None and "password" in job:
+        # Cifrado sem que a sondagem visse o /Encrypt: desbloqueia e tenta de novo
+        unlocked = unlock_pdf(io.BytesIO(job["pdf"]), password=job["password"])
+        if unlocked is None:
+            return None, STATUS_LOCKED
+        layout = read_pdf_layout(unlocked, with_words=True)
+    if layout is None:
+        return None, STATUS_EMPTY
+    return layout, _build(parse_layout_text(layout["text"]), arrow)
+
+
+def complete_pdf(result, extracted, use_cache=True):
+    """Etapa de armazenamento (E/S): guarda o layout e alimenta o cache."""
+    layout, tables = extracted
+    if isinstance(tables, str):
+        result["status"] = tables
+        return result
+
+    # O texto de layout fica guardado para reparses futuros
+    if layout is not None:
+        put_layout(result["digest"], layout)
+    return _finish(result, *tables, use_cache)
+
+
+def _finish(result, df_fin, df_med, use_cache):
+    """Preenche o resultado e alimenta o cache de extração."""
+    if len(df_fin) == 0:
+        result["status"] = STATUS_EMPTY
+        return result
+
+    if use_cache:
+        put_cached_extraction(result["key"], df_fin, df_med)
+
+    result["fin"], result["med"] = df_fin, df_med
+    return result
+
+
+def reparse_archive(arrow=False):
+    """
+    Reexecuta o parser sobre todo o texto de layout armazenado.
+
+    Não abre nenhum PDF: é o caminho para propagar uma correção de regex por
+    anos de faturas. Gera um resultado (mesmo formato de `process_pdf`) por
+    layout armazenado e atualiza o cache de extração com a versão atual.
+    """
+    for digest, layout in iter_layouts():
+        result = _new_result(digest, arrow)
+        df_fin, df_med = _build(parse_layout_text(layout["text"]), arrow)
+        yield _finish(result, df_fin, df_med, use_cache=True)
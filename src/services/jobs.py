@@ -0,0 +1,256 @@
+"""
+Serviço de extração em segundo plano, compartilhado pelo processo inteiro.
+
+A página de importação não extrai nada na thread do script: ela envia o
+arquivo (`submit`), guarda o id do job no st.session_state e consulta o
+andamento (`status`) nas próximas execuções. Como o serviço mora no módulo,
+e não na sessão, um rerun não reinicia o trabalho e todos os usuários
+dividem o mesmo pool:
+- leitura/cache/desbloqueio (ingest.prepare_pdf) em threads;
+- pdfplumber e parser (ingest.extract_job) em um ProcessPoolExecutor, fora
+  do GIL do servidor: um PDF grande não congela a interface dos outros;
+- gravação do layout/cache (ingest.complete_pdf) de volta nas threads.
+
+As etapas se encadeiam por callbacks: nenhuma thread fica parada esperando
+a extração, e todos os processos do pool podem trabalhar ao mesmo tempo.
+
+Se um worker morre (falta de memória, PDF que derruba o pdfplumber), o
+ProcessPoolExecutor fica quebrado: o serviço o recria e reenvia os jobs
+que estavam nele (até EXTRACT_RETRIES vezes cada).
+
+Envios do mesmo conteúdo com a mesma senha (dois usuários, ou o mesmo
+arquivo reenviado) compartilham um único job. Jobs terminados ficam
+disponíveis por JOB_TTL segundos e depois são descartados (a cada chamada
+de submit, status ou stats).
+"""
+
+import hashlib
+import multiprocessing
+import os
+import threading
+import time
+import uuid
+from concurrent.futures import ProcessPoolExecutor, ThreadPoolExecutor
+from concurrent.futures.process import BrokenProcessPool
+
+from src.services.ingest import complete_pdf, extract_job, prepare_pdf
+
+# --- CONFIGURAÇÃO ---
+READ_WORKERS = 4  # Threads de leitura/gravação (não esperam pela extração)
+EXTRACT_WORKERS = max(1, (os.cpu_count() or 2) - 1)  # Processos do pdfplumber
+MAX_TASKS_PER_CHILD = 50  # Recicla cada worker (memória do pdfplumber)
+JOB_TTL = 3600.0  # Segundos que um job terminado continua consultável
+EXTRACT_RETRIES = 1  # Novas tentativas de um job cujo worker morreu
+
+JOB_QUEUED = "queued"
+JOB_RUNNING = "running"
+JOB_DONE = "done"
+JOB_FAILED = "failed"
+FINISHED_STATES = (JOB_DONE, JOB_FAILED)
+
+
+class _Job:
+    """Estado de um job (alterado só sob a trava do serviço)."""
+
+    __slots__ = ("error", "finished", "id", "key", "name", "result", "state")
+
+    def __init__(self, job_id, key, name):
+        self.id = job_id
+        self.key = key
+        self.name = name
+        self.state = JOB_QUEUED
+        self.result = None
+        self.error = None
+        self.finished = None
+
+    def snapshot(self):
+        return {
+            "id": self.id,
+            "name": self.name,
+            "state": self.state,
+            "result": self.result,
+            "error": self.error,
+        }
+
+
+class JobService:
+    """
+    Fila de extração com pool compartilhado.
+
+    Uso:
+        service = get_job_service()
+        job_id = service.submit(conteudo, password=None, name="fatura.pdf")
+        job = service.status(job_id)  # {"state": ..., "result": ..., ...}
+
+    `result` é o dict de ingest.process_pdf (DataFrames, não Arrow). Com
+    `extract_workers <= 0` a extração roda na própria thread do job, sem
+    processos filhos.
+    """
+
+    def __init__(
+        self,
+        read_workers=READ_WORKERS,
+        extract_workers=EXTRACT_WORKERS,
+        max_tasks_per_child=MAX_TASKS_PER_CHILD,
+        ttl=JOB_TTL,
+    ):
+        self.ttl = ttl
+        self._lock = threading.Lock()
+        self._jobs = {}  # {id: _Job}
+        self._by_key = {}  # {conteúdo + senha: id}, para juntar envios iguais
+        self._read_pool = ThreadPoolExecutor(
+            max_workers=read_workers, thread_name_prefix="extracao"
+        )
+        self._extract_workers = extract_workers
+        self._max_tasks_per_child = max_tasks_per_child
+        self._closed = False
+        self._extract_pool = self._new_extract_pool() if extract_workers > 0 else None
+
+    def submit(self, content, password=None, name=None):
+        """
+        Enfileira a extração de `content` (bytes do PDF) e retorna o id do job.
+        Se o mesmo conteúdo com a mesma senha já está na fila (ou terminou
+        sem erro), devolve o id existente.
+        """
+        content = bytes(content)
+        key = hashlib.sha256(content + b"\0" + (password or "").encode()).hexdigest()
+        with self._lock:
+            self._expire()
+            job_id = self._by_key.get(key)
+            if job_id is not None and self._jobs[job_id].state != JOB_FAILED:
+                return job_id
+            job = _Job(uuid.uuid4().hex, key, name)
+            self._jobs[job.id] = job
+            self._by_key[key] = job.id
+        self._read_pool.submit(self._run, job, content, password)
+        return job.id
+
+    def status(self, job_id):
+        """Cópia do estado do job, ou None se o id não existe (ou expirou)."""
+        with self._lock:
+            self._expire()
+            job = self._jobs.get(job_id)
+            return job.snapshot() if job is not None else None
+
+    def stats(self):
+        """Quantidade de jobs por estado."""
+        with self._lock:
+            self._expire()
+            counts = dict.fromkeys((JOB_QUEUED, JOB_RUNNING, *FINISHED_STATES), 0)
+            for job in self._jobs.values():
+                counts[job.state] += 1
+        return counts
+
+    def shutdown(self, wait=True):
+        with self._lock:
+            self._closed = True  # Um pool quebrado daqui em diante não é recriado
+            extract_pool = self._extract_pool
+        # Extração primeiro: os callbacks dela ainda enviam a gravação às threads
+        if extract_pool is not None:
+            extract_pool.shutdown(wait=wait)
+        self._read_pool.shutdown(wait=wait)
+
+    def _new_extract_pool(self):
+        # spawn: o servidor do Streamlit já tem threads (fork pode travar)
+        return ProcessPoolExecutor(
+            max_workers=self._extract_workers,
+            mp_context=multiprocessing.get_context("spawn"),
+            max_tasks_per_child=self._max_tasks_per_child,
+        )
+
+    def _replace_extract_pool(self, broken):
+        """Troca o pool quebrado por um novo (uma vez, mesmo com vários avisos)."""
+        with self._lock:
+            if self._extract_pool is broken and not self._closed:
+                self._extract_pool = self._new_extract_pool()
+                print("⚠️ Worker de extração encerrado: pool recriado.")
+            # O pool quebrado já encerrou os próprios processos (e, chamado de
+            # um callback dele, o shutdown travaria na trava interna)
+            return self._extract_pool
+
+    def _run(self, job, content, password):
+        """Leitura (thread); a extração segue para o pool de processos."""
+        self._set(job, JOB_RUNNING)
+        try:
+            result, work = prepare_pdf(content, password)
+            if work is None:
+                self._set(job, JOB_DONE, result=result)
+            elif self._extract_pool is None:
+                self._complete(job, result, extract_job(work, False))
+            else:
+                self._extract(job, result, work, EXTRACT_RETRIES)
+        except Exception as e:  # noqa: BLE001 - qualquer erro encerra o job como falho
+            self._set(job, JOB_FAILED, error=str(e))
+
+    def _extract(self, job, result, work, retries):
+        """Envia a extração ao pool de processos; o resultado volta por callback."""
+        pool = self._extract_pool
+        try:
+            try:
+                future = pool.submit(extract_job, work, False)
+            except BrokenProcessPool:
+                # Quebrado por outro job: este ainda não rodou, vai para o pool novo
+                pool = self._replace_extract_pool(pool)
+                future = pool.submit(extract_job, work, False)
+        except (BrokenProcessPool, RuntimeError) as e:  # RuntimeError: encerrado
+            self._set(job, JOB_FAILED, error=str(e))
+            return
+        future.add_done_callback(
+            lambda future: self._after_extract(job, result, work, retries, pool, future)
+        )
+
+    def _after_extract(self, job, result, work, retries, pool, future):
+        # Roda na thread interna do pool de processos: a gravação volta às threads
+        try:
+            extracted = future.result()
+        except BrokenProcessPool as e:
+            # Todos os jobs em andamento no pool recebem este erro, não só o culpado
+            self._replace_extract_pool(pool)
+            if retries > 0:
+                self._extract(job, result, work, retries - 1)
+            else:
+                self._set(job, JOB_FAILED, error=str(e))
+            return
+        except Exception as e:  # noqa: BLE001 - o erro do worker é a falha do job
+            self._set(job, JOB_FAILED, error=str(e))
+            return
+        try:
+            self._read_pool.submit(self._complete, job, result, extracted)
+        except RuntimeError as e:  # Serviço já encerrado
+            self._set(job, JOB_FAILED, error=str(e))
+
+    def _complete(self, job, result, extracted):
+        try:
+            result = complete_pdf(result, extracted, True)
+        except Exception as e:  # noqa: BLE001 - qualquer erro encerra o job como falho
+            self._set(job, JOB_FAILED, error=str(e))
+        else:
+            self._set(job, JOB_DONE, result=result)
+
+    def _set(self, job, state, result=None, error=None):
+        with self._lock:
+            job.state, job.result, job.error = state, result, error
+            if state in FINISHED_STATES:
+                job.finished = time.monotonic()
+
+    def _expire(self):
+        """Descarta jobs terminados há mais de `ttl` segundos (com a trava)."""
+        now = time.monotonic()
+        for job_id, job in list(self._jobs.items()):
+            if job.finished is not None and now - job.finished > self.ttl:
+                del self._jobs[job_id]
+                if self._by_key.get(job.key) == job_id:
+                    del self._by_key[job.key]
+
+
+_service_lock = threading.Lock()
+_service = None
+
+
+def get_job_service():
+    """O serviço do processo (criado no primeiro uso, vale para todas as sessões)."""
+    global _service
+    with _service_lock:
+        if _service is None:
+            _service = JobService()
+        return _service
@@ -0,0 +1,75 @@
+"""
+Armazém do texto de layout bruto de cada PDF, indexado pelo hash do conteúdo.
+
+Guardar a saída de `page.extract_text(layout=True)` (e as caixas das palavras)
+permite reexecutar apenas as etapas de regex do extrator sobre todo o
+arquivo histórico, sem reabrir nem renderizar nenhum PDF.
+"""
+
+import gzip
+import json
+import os
+import threading
+
+# --- CONFIGURAÇÃO ---
+LAYOUT_FOLDER = "data/cache/layout"
+
+_SUFFIX = ".json.gz"
+
+
+def _layout_path(digest):
+    return os.path.join(LAYOUT_FOLDER, digest + _SUFFIX)
+
+
+def has_layout(digest):
+    return os.path.exists(_layout_path(digest))
+
+
+def put_layout(digest, layout):
+    """Grava o layout (dict com "text" e opcionalmente "words") comprimido."""
+    os.makedirs(LAYOUT_FOLDER, exist_ok=True)
+    path = _layout_path(digest)
+    # Um temporário por processo e thread: o mesmo PDF pode chegar duas vezes no lote
+    tmp_path = f"{path}.{os.getpid()}.{threading.get_ident()}.tmp"
+
+    try:
+        with gzip.open(tmp_path, "wt", encoding="utf-8", compresslevel=6) as fh:
+            json.dump(layout, fh, ensure_ascii=False, separators=(",", ":"))
+        os.replace(tmp_path, path)
+        return True
+    except (OSError, TypeError, ValueError) as e:
+        # Disco/permissão, ou layout que o json não serializa
+        print(f"⚠️ Falha ao gravar layout ({digest}): {e}")
+        return False
+    finally:
+        if os.path.exists(tmp_path):
+            os.remove(tmp_path)
+
+
+def get_layout(digest):
+    """Retorna o layout armazenado para o hash, ou None."""
+    path = _layout_path(digest)
+    if not os.path.exists(path):
+        return None
+
+    try:
+        with gzip.open(path, "rt", encoding="utf-8") as fh:
+            return json.load(fh)
+    except (OSError, EOFError, ValueError) as e:
+        # Gzip inválido (OSError) ou truncado (EOFError), JSON inválido (ValueError)
+        print(f"⚠️ Layout corrompido ({digest}): {e}")
+        return None
+
+
+def iter_layouts():
+    """Percorre todos os layouts armazenados: gera (digest, layout)."""
+    if not os.path.isdir(LAYOUT_FOLDER):
+        return
+
+    for name in sorted(os.listdir(LAYOUT_FOLDER)):
+        if not name.endswith(_SUFFIX):
+            continue
+        digest = name[: -len(_SUFFIX)]
+        layout = get_layout(digest)
+        if layout is not None:
+            yield digest, layout
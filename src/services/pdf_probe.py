@@ -0,0 +1,228 @@
+"""
+Sondagem rápida de um PDF antes do processamento completo.
+
+Lê só a estrutura em texto do arquivo (cabeçalho %PDF, trailer, dicionário
+/Encrypt, contagem de páginas e /Producer), sem montar o documento como o
+pikepdf e o pdfplumber fazem. Caminhos são mapeados em memória (mmap): só
+as regiões lidas (início, fim e os objetos apontados pela tabela xref) são
+carregadas do disco. Arquivos acima de `max_bytes` voltam logo após o
+cabeçalho e o trailer, sem mais leituras. O pipeline usa o resultado para
+recusar arquivos que não são PDF, pular arquivos grandes demais e decidir se
+o desbloqueio é necessário.
+
+A sondagem é heurística: páginas e produtor guardados em object streams
+(compactados) não aparecem no texto e ficam como None.
+"""
+
+import mmap
+import os
+import re
+from contextlib import contextmanager
+from typing import NamedTuple
+
+# O cabeçalho pode vir depois de lixo no início do arquivo (até 1 KB, como os leitores aceitam)
+HEADER_WINDOW = 1024
+# Trailer (ou dicionário do xref stream) perto do fim ou no offset do startxref
+TRAILER_WINDOW = 4096
+
+_HEADER_RE = re.compile(rb"%PDF-(\d\.\d)")
+_STARTXREF_RE = re.compile(rb"startxref\s+(\d+)")
+_ENCRYPT_RE = re.compile(rb"/Encrypt[\s/<\d]")
+_INFO_RE = re.compile(rb"/Info\s+(\d+)\s+(\d+)\s+R")
+_ROOT_RE = re.compile(rb"/Root\s+(\d+)\s+(\d+)\s+R")
+_PAGES_RE = re.compile(rb"/Pages\s+(\d+)\s+(\d+)\s+R")
+_COUNT_RE = re.compile(rb"/Count\s+(\d+)")
+_PREV_RE = re.compile(rb"/Prev\s+(\d+)")
+# Tabela xref clássica: subseções "início quantidade" e entradas de 20 bytes
+_XREF_SECTION_RE = re.compile(rb"\s*(\d+)\s+(\d+)\s*?\r?\n")
+_XREF_ENTRY_RE = re.compile(rb"(\d{10}) (\d{5}) ([nf])\s{1,2}")
+MAX_XREF_SECTIONS = 64  # Atualizações incrementais seguidas via /Prev
+_PRODUCER_RE = re.compile(
+    rb"/Producer\s*(\((?:\\.|[^\\)])*\)|<[0-9A-Fa-f\s]*>)", re.DOTALL
+)
+_ESCAPES = {b"n": b"\n", b"r": b"\r", b"t": b"\t", b"b": b"\b", b"f": b"\f"}
+
+
+class PdfProbe(NamedTuple):
+    is_pdf: bool  # Cabeçalho %PDF encontrado
+    encrypted: bool  # Trailer aponta um dicionário /Encrypt
+    pages: int | None  # /Count da árvore de páginas (None se compactada)
+    size: int  # Tamanho em bytes
+    producer: str | None  # Software que gerou o PDF (None se ausente/cifrado)
+    version: str | None  # Versão do cabeçalho (ex: "1.4")
+
+
+@contextmanager
+def _buffer(source):
+    """Buffer somente leitura: mmap para caminhos, memoryview para conteúdo."""
+    if isinstance(source, (str, os.PathLike)):
+        with open(source, "rb") as fh:
+            if os.fstat(fh.fileno()).st_size == 0:
+                yield b""
+                return
+            with mmap.mmap(fh.fileno(), 0, access=mmap.ACCESS_READ) as mm:
+                yield mm
+        return
+
+    if hasattr(source, "getbuffer"):
+        # BytesIO e UploadedFile do Streamlit: sem copiar o conteúdo
+        with source.getbuffer() as view:
+            yield view
+        return
+    if hasattr(source, "read"):
+        source.seek(0)
+        data = source.read()
+        source.seek(0)
+        yield data
+        return
+    yield memoryview(source)
+
+
+def _decode_string(token):
+    """Texto de uma string PDF, literal "(...)" ou hexadecimal "<...>"."""
+    if token.startswith(b"<"):
+        raw = bytes.fromhex(re.sub(rb"\s", b"", token[1:-1]).decode("ascii"))
+    else:
+        raw = re.sub(
+            rb"\\([nrtbf()\\])",
+            lambda m: _ESCAPES.get(m.group(1), m.group(1)),
+            token[1:-1],
+        )
+    if raw.startswith(b"\xfe\xff"):
+        return raw[2:].decode("utf-16-be", errors="replace")
+    return raw.decode("latin-1")
+
+
+def _trailer_windows(buf):
+    """Trechos que contêm o trailer: o fim do arquivo e o alvo do startxref."""
+    size = len(buf)
+    tail = buf[max(0, size - TRAILER_WINDOW) :]
+    windows = [tail]
+    starts = list(_STARTXREF_RE.finditer(tail))
+    if starts:
+        offset = int(starts[-1].group(1))
+        if 0 <= offset < size:
+            windows.append(buf[offset : offset + TRAILER_WINDOW])
+    return windows
+
+
+def _xref_offsets(buf):
+    """
+    {número do objeto: (offset, geração)} das tabelas xref clássicas, da
+    mais recente às anteriores (/Prev): vale a versão mais nova de cada
+    objeto. Vazio em PDFs com xref stream (compactada).
+    """
+    size = len(buf)
+    offsets = {}
+    starts = list(_STARTXREF_RE.finditer(buf[max(0, size - TRAILER_WINDOW) :]))
+    pos = int(starts[-1].group(1)) if starts else -1
+    seen = set()
+    while 0 <= pos < size and pos not in seen and len(seen) < MAX_XREF_SECTIONS:
+        seen.add(pos)
+        if bytes(buf[pos : pos + 4]) != b"xref":
+            break
+        pos += 4
+        while section := _XREF_SECTION_RE.match(buf, pos):
+            first, count = int(section.group(1)), int(section.group(2))
+            pos = section.end()
+            for number in range(first, first + count):
+                entry = _XREF_ENTRY_RE.match(buf, pos)
+                if entry is None:
+                    return offsets  # Tabela malformada: fica o que foi lido
+                pos = entry.end()
+                if entry.group(3) == b"n":
+                    offsets.setdefault(
+                        number, (int(entry.group(1)), int(entry.group(2)))
+                    )
+        prev = _PREV_RE.search(buf[pos : pos + TRAILER_WINDOW])
+        pos = int(prev.group(1)) if prev else -1
+    return offsets
+
+
+def _object_body(buf, offsets, ref):
+    """
+    Conteúdo do objeto `ref` (número, geração), até o endobj. Usa o offset
+    da xref; sem ele, a última definição do objeto no arquivo.
+    """
+    number, generation = int(ref[0]), int(ref[1])
+    header = re.compile(rb"(?<!\d)%d\s+%d\s+obj" % (number, generation))
+    start = None
+    if number in offsets:
+        offset = offsets[number][0]
+        match = header.match(buf, offset)
+        start = match.end() if match else None
+    if start is None:
+        matches = list(header.finditer(buf))
+        if not matches:
+            return None
+        start = matches[-1].end()
+    body = buf[start : start + TRAILER_WINDOW]
+    end = body.find(b"endobj") if hasattr(body, "find") else bytes(body).find(b"endobj")
+    return body[:end] if end >= 0 else body
+
+
+def _last_match(pattern, windows):
+    """Última ocorrência de `pattern` no primeiro trecho em que ela aparece."""
+    for window in windows:
+        matches = list(pattern.finditer(window))
+        if matches:
+            return matches[-1]
+    return None
+
+
+def _count_pages(buf, windows, offsets):
+    """/Count da raiz da árvore de páginas (/Root -> /Pages)."""
+    root = _last_match(_ROOT_RE, windows)
+    catalog = _object_body(buf, offsets, root.groups()) if root else None
+    pages_ref = _PAGES_RE.search(catalog) if catalog is not None else None
+    if pages_ref is None:
+        return None
+    pages = _object_body(buf, offsets, pages_ref.groups())
+    count = _COUNT_RE.search(pages) if pages is not None else None
+    return int(count.group(1)) if count else None
+
+
+def _find_producer(buf, windows, offsets):
+    """/Producer do dicionário /Info apontado pelo trailer (ou a última ocorrência)."""
+    info = _last_match(_INFO_RE, windows)
+    if info is not None:
+        body = _object_body(buf, offsets, info.groups())
+        if body is not None:
+            return _PRODUCER_RE.search(body)
+
+    # Sem /Info legível: vale a última ocorrência (atualizações vêm no fim)
+    matches = list(_PRODUCER_RE.finditer(buf))
+    return matches[-1] if matches else None
+
+
+def probe_pdf(source, max_bytes=None):
+    """
+    Sonda um PDF (caminho, bytes, BytesIO ou UploadedFile) e devolve um
+    PdfProbe. Arquivos que não são PDF voltam com is_pdf=False e os demais
+    campos vazios; erros de leitura (ex: arquivo inexistente) sobem.
+
+    Acima de `max_bytes`, só o cabeçalho e o trailer são lidos: páginas e
+    produtor ficam None (o arquivo vai ser recusado de qualquer forma).
+    """
+    with _buffer(source) as buf:
+        size = len(buf)
+        header = _HEADER_RE.search(buf[:HEADER_WINDOW])
+        if header is None:
+            return PdfProbe(False, False, None, size, None, None)
+        version = header.group(1).decode("ascii")
+
+        windows = _trailer_windows(buf)
+        encrypted = any(_ENCRYPT_RE.search(w) for w in windows)
+        if max_bytes is not None and size > max_bytes:
+            return PdfProbe(True, encrypted, None, size, None, version)
+
+        offsets = _xref_offsets(buf)
+        pages = _count_pages(buf, windows, offsets)
+
+        producer = None
+        if not encrypted:
+            match = _find_producer(buf, windows, offsets)
+            if match:
+                producer = _decode_string(match.group(1)).strip() or None
+
+        return PdfProbe(True, encrypted, pages, size, producer, version)
@@ -0,0 +1,215 @@
+"""
+Pipeline de ingestão em estágios (asyncio), ligados por filas limitadas.
+
+    leitura ──▶ extração ──▶ armazenamento ──▶ gravação
+    threads     processos     threads           1 escritor
+
+- leitura (ingest.prepare_pdf): lê os bytes, sonda, consulta o cache e
+  desbloqueia com o pikepdf; E/S, roda em threads;
+- extração (ingest.extract_job): pdfplumber e parser; CPU, roda em um
+  ProcessPoolExecutor;
+- armazenamento (ingest.complete_pdf): grava o texto de layout e o cache de
+  extração; E/S, roda em threads;
+- gravação: acumula as faturas no BatchWriter e grava a cada
+  `commit_every` (a gravação em si roda em uma thread, uma por vez: o
+  banco tem um único escritor).
+
+Cada estágio tem o próprio número de workers e uma fila de entrada com
+`queue_size` itens: quando um estágio fica para trás, a fila dele enche e
+os anteriores esperam (backpressure), sem carregar o lote inteiro na
+memória. Um disco lento segura só a leitura e a gravação; um parse lento,
+só a extração.
+
+Arquivos que terminam antes da extração (cache, recusados, sem senha)
+atravessam os estágios sem ocupar workers.
+"""
+
+import asyncio
+import multiprocessing
+import os
+from concurrent.futures import ProcessPoolExecutor, ThreadPoolExecutor
+
+from src.database.manager import BatchWriter
+from src.services.ingest import (
+    MAX_PDF_BYTES,
+    STATUS_OK,
+    complete_pdf,
+    extract_job,
+    prepare_pdf,
+)
+
+# --- CONFIGURAÇÃO ---
+READ_WORKERS = 4  # Threads de leitura/desbloqueio
+EXTRACT_WORKERS = max(1, (os.cpu_count() or 2) - 1)  # Processos do pdfplumber
+STORE_WORKERS = 2  # Threads de gravação do layout/cache
+QUEUE_SIZE = 32  # Itens por fila entre estágios
+COMMIT_EVERY = 500  # Faturas por gravação no banco
+
+_DONE = object()  # Fim da fila
+
+
+class _Item:
+    """Um arquivo atravessando o pipeline."""
+
+    __slots__ = ("error", "extracted", "job", "result", "source")
+
+    def __init__(self, source):
+        self.source = source
+        self.result = None
+        self.job = None
+        self.extracted = None
+        self.error = None
+
+
+async def _stage(inbox, outbox, workers, executor, step):
+    """
+    Roda `workers` consumidores de `inbox`, repassando cada item a `outbox`.
+    `step(item)` devolve (função, argumentos, aplicar) para executar no
+    executor (o retorno vai para aplicar(item, valor)), ou None para só
+    repassar o item.
+    """
+    loop = asyncio.get_running_loop()
+
+    async def worker():
+        while True:
+            item = await inbox.get()
+            if item is _DONE:
+                await inbox.put(_DONE)  # Libera os outros workers do estágio
+                return
+            call = step(item) if item.error is None else None
+            if call is not None:
+                func, args, apply = call
+                try:
+                    apply(item, await loop.run_in_executor(executor, func, *args))
+                except Exception as e:  # noqa: BLE001 - falha do arquivo, não do lote
+                    item.error = e
+            await outbox.put(item)
+
+    await asyncio.gather(*(worker() for _ in range(workers)))
+    await outbox.put(_DONE)
+
+
+async def run_pipeline(
+    sources,
+    password=None,
+    use_cache=True,
+    arrow=True,
+    max_bytes=MAX_PDF_BYTES,
+    read_workers=READ_WORKERS,
+    extract_workers=EXTRACT_WORKERS,
+    store_workers=STORE_WORKERS,
+    queue_size=QUEUE_SIZE,
+    commit_every=COMMIT_EVERY,
+    max_tasks_per_child=None,
+    on_result=None,
+    on_commit=None,
+):
+    """
+    Processa e grava `sources` (caminhos ou conteúdos de PDF).
+
+    Callbacks (chamados no laço de eventos, um de cada vez):
+    - on_result(source, result, error): ao fim de cada arquivo. Faturas
+      válidas chegam depois da gravação do lote, com result["saved"];
+    - on_commit(items, saved): após cada gravação, com a lista de
+      (source, result) do lote.
+
+    Com `extract_workers <= 0`, a extração roda em uma thread (sem processos
+    filhos). Retorna o número de arquivos processados.
+    """
+    loop = asyncio.get_running_loop()
+    queues = [asyncio.Queue(maxsize=queue_size) for _ in range(4)]
+    read_pool = ThreadPoolExecutor(max_workers=read_workers)
+    store_pool = ThreadPoolExecutor(max_workers=store_workers + 1)
+    if extract_workers > 0:
+        # spawn: o fork de um processo que já tem threads pode travar o filho
+        extract_pool = ProcessPoolExecutor(
+            max_workers=extract_workers,
+            mp_context=multiprocessing.get_context("spawn"),
+            max_tasks_per_child=max_tasks_per_child,
+        )
+    else:
+        extract_workers, extract_pool = 1, ThreadPoolExecutor(max_workers=1)
+
+    def read(item):
+        def apply(item, value):
+            item.result, item.job = value
+
+        args = (item.source, password, use_cache, arrow, max_bytes)
+        return prepare_pdf, args, apply
+
+    def extract(item):
+        if item.job is None:
+            return None
+
+        def apply(item, value):
+            # Os bytes do PDF não são mais necessários
+            item.extracted, item.job = value, None
+
+        return extract_job, (item.job, arrow), apply
+
+    def store(item):
+        if item.extracted is None:
+            return None
+
+        def apply(item, value):
+            item.result, item.extracted = value, None
+
+        return complete_pdf, (item.result, item.extracted, use_cache), apply
+
+    async def feed():
+        for source in sources:
+            await queues[0].put(_Item(source))
+        await queues[0].put(_DONE)
+
+    count = 0
+    batch = BatchWriter()
+    pending = []
+
+    async def commit():
+        saved = await loop.run_in_executor(store_pool, batch.commit)
+        items = list(pending)
+        pending.clear()
+        for _, result in items:
+            result["saved"] = saved
+        if on_commit is not None:
+            on_commit(items, saved)
+        if on_result is not None:
+            for source, result in items:
+                on_result(source, result, None)
+
+    async def commit_stage():
+        nonlocal count
+        while True:
+            item = await queues[3].get()
+            if item is _DONE:
+                break
+            count += 1
+            if item.error is not None or item.result["status"] != STATUS_OK:
+                if on_result is not None:
+                    on_result(item.source, item.result, item.error)
+                continue
+            batch.add(item.result["fin"], item.result["med"])
+            pending.append((item.source, item.result))
+            if len(pending) >= commit_every:
+                await commit()
+        if pending:
+            await commit()
+
+    try:
+        await asyncio.gather(
+            feed(),
+            _stage(queues[0], queues[1], read_workers, read_pool, read),
+            _stage(queues[1], queues[2], extract_workers, extract_pool, extract),
+            _stage(queues[2], queues[3], store_workers, store_pool, store),
+            commit_stage(),
+        )
+    finally:
+        read_pool.shutdown()
+        extract_pool.shutdown()
+        store_pool.shutdown()
+    return count
+
+
+def process_all(sources, **kwargs):
+    """Versão síncrona de run_pipeline (para o main.py)."""
+    return asyncio.run(run_pipeline(sources, **kwargs))
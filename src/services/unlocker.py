@@ -1,59 +1,52 @@
-import pikepdf
-import os
-import streamlit as st
-
-
-def unlock_pdf_file(uploaded_file, password=None):
-    """
-    Recebe um arquivo (UploadedFile ou caminho) e retorna o caminho
-    de uma versão desbloqueada temporária.
-
-    Args:
-        uploaded_file: Objeto do Streamlit ou caminho str.
-        password (str, opcional): Senha para tentar desbloquear.
-    """
+"""
+Desbloqueio de PDFs protegidos por senha, inteiramente em memória.
 
-    # Define onde salvar o arquivo temporário
-    output_dir = "data/raw"
-    os.makedirs(output_dir, exist_ok=True)
+Nada é gravado em disco: a versão desbloqueada é salva pelo pikepdf em um
+BytesIO e entregue direto ao pdfplumber. Assim duas sessões que enviam o
+mesmo nome de arquivo não disputam um caminho temporário em data/raw.
+"""
 
-    # Nome seguro para o arquivo
-    if hasattr(uploaded_file, "name"):
-        filename = uploaded_file.name
-    else:
-        filename = os.path.basename(uploaded_file)
+import io
 
-    output_path = os.path.join(output_dir, f"unlocked_{filename}")
-
-    try:
-        # Tenta abrir o PDF
-        # O pikepdf é inteligente: aceita bytes (Streamlit) ou caminho de arquivo
-        pdf = pikepdf.open(uploaded_file, password=password)
-
-        # Salva a versão desbloqueada (sobrescreve se existir)
-        pdf.save(output_path)
+import pikepdf
 
-        # É importante fechar o arquivo original se foi aberto pelo pikepdf
-        pdf.close()
 
-        return output_path
+def _as_stream(source):
+    """Bytes viram BytesIO; caminhos e objetos de arquivo passam direto."""
+    if isinstance(source, (bytes, bytearray)):
+        return io.BytesIO(source)
+    if hasattr(source, "seek"):
+        source.seek(0)
+    return source
 
-    except pikepdf.PasswordError:
-        # Se a senha estiver errada ou não for fornecida para um arquivo protegido
-        return None
 
-    except Exception as e:
-        print(f"❌ Erro ao desbloquear PDF: {e}")
-        return None
+def unlock_pdf(source, password=None):
+    """
+    Recebe um PDF (bytes, BytesIO, UploadedFile ou caminho) e retorna um
+    BytesIO com a versão desbloqueada, pronta para o pdfplumber.
 
+    Args:
+        source: Conteúdo do PDF ou caminho str.
+        password (str, opcional): Senha para tentar desbloquear.
 
-def check_is_encrypted(uploaded_file):
-    """Verifica se o arquivo precisa de senha sem tentar desbloquear totalmente."""
-    try:
-        pdf = pikepdf.open(uploaded_file)
-        pdf.close()
-        return False  # Não tem senha
-    except pikepdf.PasswordError:
-        return True  # Tem senha
-    except:
-        return False  # Erro de leitura, assume sem senha por enquanto
+    Retorna None se a senha estiver errada ou não for fornecida para um
+    arquivo protegido.
+    """
+    # Só com senha de proprietário, o PDF abre com a senha de usuário vazia
+    for attempt in dict.fromkeys([password or "", ""]):
+        try:
+            # O pikepdf aceita bytes em stream (Streamlit) ou caminho de arquivo
+            with pikepdf.open(_as_stream(source), password=attempt) as pdf:
+                unlocked = io.BytesIO()
+                pdf.save(unlocked)
+            unlocked.seek(0)
+            return unlocked
+
+        except pikepdf.PasswordError:
+            continue
+
+        except Exception as e:
+            print(f"❌ Erro ao desbloquear PDF: {e}")
+            return None
+
+    return None
@@ -0,0 +1,338 @@
+"""
+Importação contínua de uma pasta de entrada (watch folder), com watchdog.
+
+O IngestWatcher observa a pasta (data/raw por padrão) e leva cada PDF novo
+ao banco sem execução manual do main.py:
+1. Eventos do watchdog (criação, escrita, renomeação para dentro da pasta)
+   só marcam o arquivo; ele entra na fila quando fica DEBOUNCE_SECONDS sem
+   eventos e com tamanho/mtime estáveis entre duas verificações, o que
+   descarta escritas parciais de quem ainda está copiando o arquivo.
+2. Arquivos prontos vão para um pool de workers (process_pdf em modo Arrow),
+   no máximo IN_FLIGHT_PER_WORKER por worker: numa pasta com milhares de
+   arquivos pendentes, o restante aguarda na fila de espera.
+3. Esta thread consome os resultados, acumula no BatchWriter e grava assim
+   que o pool esvazia (ou a cada COMMIT_EVERY faturas / MAX_COMMIT_DELAY
+   segundos), para a fatura aparecer no dashboard em segundos.
+
+Cada resultado vai para o catálogo de ingestão, como no main.py: ao
+iniciar, só os arquivos novos ou alterados da pasta são processados.
+`stats()` expõe a profundidade das filas e a vazão.
+"""
+
+import multiprocessing
+import os
+import signal
+import threading
+import time
+from collections import deque
+from concurrent.futures import (
+    FIRST_COMPLETED,
+    ProcessPoolExecutor,
+    ThreadPoolExecutor,
+    wait,
+)
+
+from watchdog.events import FileSystemEventHandler
+from watchdog.observers import Observer
+
+from src.database import ingest_catalog
+from src.database.ingest_catalog import STATUS_ERROR
+from src.database.manager import BatchWriter
+from src.services.extractor import EXTRACTOR_VERSION
+from src.services.ingest import STATUS_OK, process_pdf
+
+# --- CONFIGURAÇÃO ---
+INBOX_FOLDER = os.getenv("ENEL_INBOX", "data/raw")
+DEBOUNCE_SECONDS = 2.0  # Silêncio exigido após o último evento do arquivo
+POLL_SECONDS = 0.25  # Intervalo do laço de despacho
+COMMIT_EVERY = 500  # Faturas por gravação, se o fluxo não der folga
+MAX_COMMIT_DELAY = 5.0  # Segundos máximos entre a extração e a gravação
+STATS_SECONDS = 60.0  # Intervalo do resumo impresso (0 desliga)
+THROUGHPUT_WINDOW = 60.0  # Janela (s) da vazão recente
+MAX_TASKS_PER_CHILD = 50  # Recicla cada worker (memória do pdfplumber)
+IN_FLIGHT_PER_WORKER = 2  # Arquivos no pool por worker; o resto espera na fila
+
+
+def _is_candidate(path):
+    # Como no main.py: ignora as cópias "unlocked_*" de versões antigas
+    name = os.path.basename(path)
+    return name.lower().endswith(".pdf") and not name.startswith(
+        (".", "~", "unlocked_")
+    )
+
+
+def _ignore_sigint():
+    """Workers ignoram o Ctrl+C: quem encerra o pool é o processo do watcher."""
+    signal.signal(signal.SIGINT, signal.SIG_IGN)
+
+
+class _InboxHandler(FileSystemEventHandler):
+    """Repassa ao watcher os caminhos de PDF tocados na pasta."""
+
+    def __init__(self, watcher):
+        self._watcher = watcher
+
+    def on_created(self, event):
+        if not event.is_directory:
+            self._watcher.touch(event.src_path)
+
+    def on_modified(self, event):
+        if not event.is_directory:
+            self._watcher.touch(event.src_path)
+
+    def on_closed(self, event):
+        self._watcher.touch(event.src_path)
+
+    def on_moved(self, event):
+        # Cópias feitas como "arquivo.tmp" -> "arquivo.pdf" chegam aqui
+        if not event.is_directory:
+            self._watcher.touch(event.dest_path)
+
+
+class IngestWatcher:
+    """
+    Observa `inbox` e importa os PDFs que chegarem.
+
+    Uso:
+        watcher = IngestWatcher(workers=2)
+        watcher.run()  # bloqueia até stop() (ou Ctrl+C)
+
+    Com `workers <= 1` a extração roda em uma thread (sem processos filhos);
+    acima disso, em um ProcessPoolExecutor.
+    """
+
+    def __init__(
+        self,
+        inbox=None,
+        workers=1,
+        debounce=DEBOUNCE_SECONDS,
+        max_tasks_per_child=MAX_TASKS_PER_CHILD,
+        stats_every=STATS_SECONDS,
+    ):
+        self.inbox = inbox or INBOX_FOLDER
+        self.workers = workers
+        self.debounce = debounce
+        self.max_tasks_per_child = max_tasks_per_child
+        self.stats_every = stats_every
+
+        self._lock = threading.Lock()
+        self._stop = threading.Event()
+        # Arquivos em espera: {caminho: (último evento, assinatura vista)}
+        self._waiting = {}
+        self._in_flight = {}  # {future: (caminho, assinatura)}
+        self._batch = BatchWriter()
+        self._batch_files = []  # (caminho, assinatura, hash) do lote não gravado
+        self._batch_since = None
+        self._done_times = deque()
+        self._started = None
+        self._counters = {"processed": 0, "failed": 0, "commits": 0}
+
+    # --- Entrada de arquivos ---
+
+    def touch(self, path):
+        """Registra um evento do arquivo (reinicia a espera do debounce)."""
+        if _is_candidate(path):
+            with self._lock:
+                self._waiting[path] = (time.monotonic(), None)
+
+    def _scan_inbox(self):
+        """Na partida: enfileira os arquivos da pasta ainda não importados."""
+        paths = []
+        for entry in os.scandir(self.inbox):
+            if entry.is_file() and _is_candidate(entry.path):
+                paths.append(entry.path)
+        for path in ingest_catalog.select_pending(sorted(paths), EXTRACTOR_VERSION):
+            self.touch(path)
+
+    def _take_ready(self, limit):
+        """
+        Até `limit` arquivos sem eventos há `debounce` segundos e com
+        assinatura estável (na ordem de chegada; os demais continuam na espera).
+        """
+        now = time.monotonic()
+        ready = []
+        with self._lock:
+            for path, (last_event, seen) in list(self._waiting.items()):
+                if len(ready) >= limit:
+                    break
+                if now - last_event < self.debounce:
+                    continue
+                try:
+                    stat = ingest_catalog.file_stat(path)
+                except FileNotFoundError:
+                    del self._waiting[path]  # Removido antes de ser lido
+                    continue
+                if stat != seen:
+                    # Primeira verificação: confirma na próxima rodada. Se mudou
+                    # desde a anterior, ainda está sendo escrito: novo debounce
+                    self._waiting[path] = (last_event if seen is None else now, stat)
+                    continue
+                del self._waiting[path]
+                ready.append((path, stat))
+        return ready
+
+    # --- Processamento ---
+
+    def _make_pool(self):
+        if self.workers <= 1:
+            return ThreadPoolExecutor(max_workers=1)
+        # spawn: a thread do observer já está rodando (fork pode travar o filho)
+        return ProcessPoolExecutor(
+            max_workers=self.workers,
+            mp_context=multiprocessing.get_context("spawn"),
+            max_tasks_per_child=self.max_tasks_per_child,
+            initializer=_ignore_sigint,
+        )
+
+    def _collect(self, timeout):
+        """Consome os resultados prontos do pool."""
+        if not self._in_flight:
+            return
+        done, _ = wait(self._in_flight, timeout=timeout, return_when=FIRST_COMPLETED)
+        for future in done:
+            path, stat = self._in_flight.pop(future)
+            name = os.path.basename(path)
+            try:
+                result = future.result()
+            except Exception as e:  # noqa: BLE001 - falha do arquivo, não do watcher
+                print(f"❌ CRASH: Erro em {name}: {e}")
+                self._finish([(path, stat, STATUS_ERROR, None, str(e))])
+                continue
+
+            if result["status"] != STATUS_OK:
+                print(f"⚠️ {name}: não importado ({result['status']}).")
+                self._finish([(path, stat, result["status"], result["digest"], None)])
+                continue
+
+            self._batch.add(result["fin"], result["med"])
+            self._batch_files.append((path, stat, result["digest"]))
+            if self._batch_since is None:
+                self._batch_since = time.monotonic()
+
+    def _finish(self, rows):
+        """Registra no catálogo (uma transação) e conta arquivos terminados."""
+        ingest_catalog.record(rows, EXTRACTOR_VERSION)
+        now = time.monotonic()
+        for _, _, status, _, _ in rows:
+            self._counters["processed" if status == STATUS_OK else "failed"] += 1
+            self._done_times.append(now)
+
+    def _should_commit(self):
+        if not self._batch_files:
+            return False
+        return (
+            not self._in_flight
+            or len(self._batch) >= COMMIT_EVERY
+            or time.monotonic() - self._batch_since >= MAX_COMMIT_DELAY
+        )
+
+    def _commit(self):
+        """Grava o lote e registra os arquivos no catálogo."""
+        saved = self._batch.commit()
+        status, error = (
+            (STATUS_OK, None) if saved else (STATUS_ERROR, "falha ao salvar")
+        )
+        if not saved:
+            for path, _, _ in self._batch_files:
+                print(f"❌ ERRO DB: Falha ao salvar {os.path.basename(path)}.")
+        self._finish(
+            [
+                (path, stat, status, digest, error)
+                for path, stat, digest in self._batch_files
+            ]
+        )
+        if saved:
+            print(f"✅ {len(self._batch_files)} fatura(s) importada(s).")
+        self._counters["commits"] += 1
+        self._batch_files = []
+        self._batch_since = None
+
+    # --- Métricas ---
+
+    def stats(self):
+        """
+        Contadores do watcher:
+        - waiting: arquivos aguardando o debounce;
+        - in_flight: arquivos no pool de extração;
+        - pending_commit: faturas extraídas ainda não gravadas;
+        - queue_depth: soma das três filas;
+        - processed / failed / commits: totais desde a partida;
+        - throughput: arquivos por segundo na última THROUGHPUT_WINDOW;
+        - uptime: segundos desde a partida.
+        """
+        now = time.monotonic()
+        with self._lock:
+            waiting = len(self._waiting)
+        while self._done_times and now - self._done_times[0] > THROUGHPUT_WINDOW:
+            self._done_times.popleft()
+        uptime = now - self._started if self._started else 0.0
+        window = min(THROUGHPUT_WINDOW, uptime) or 1.0
+        in_flight, pending = len(self._in_flight), len(self._batch_files)
+        return {
+            "waiting": waiting,
+            "in_flight": in_flight,
+            "pending_commit": pending,
+            "queue_depth": waiting + in_flight + pending,
+            **self._counters,
+            "throughput": len(self._done_times) / window,
+            "uptime": uptime,
+        }
+
+    def _print_stats(self):
+        s = self.stats()
+        print(
+            f"📊 Fila: {s['queue_depth']} (espera {s['waiting']}, extração "
+            f"{s['in_flight']}, gravação {s['pending_commit']}) | "
+            f"importados {s['processed']}, falhas {s['failed']} | "
+            f"{s['throughput'] * 60:.1f} arquivos/min"
+        )
+
+    # --- Laço principal ---
+
+    def stop(self):
+        self._stop.set()
+
+    def run(self):
+        """Observa a pasta até stop(); grava o que estiver pendente ao sair."""
+        os.makedirs(self.inbox, exist_ok=True)
+        self._started = time.monotonic()
+        observer = Observer()
+        observer.schedule(_InboxHandler(self), self.inbox, recursive=False)
+        observer.start()
+        print(f"👀 Observando '{self.inbox}' (Ctrl+C para sair)...")
+
+        try:
+            with self._make_pool() as pool:
+                self._scan_inbox()
+                try:
+                    self._loop(pool)
+                except KeyboardInterrupt:
+                    print("⏹️ Interrompido: gravando o que já foi extraído...")
+
+                # Saída: termina o que já está no pool e grava
+                while self._in_flight:
+                    self._collect(timeout=None)
+                if self._batch_files:
+                    self._commit()
+        finally:
+            observer.stop()
+            observer.join()
+            print("🛑 Watcher encerrado.")
+
+    def _loop(self, pool):
+        last_stats = time.monotonic()
+        max_in_flight = max(1, self.workers) * IN_FLIGHT_PER_WORKER
+        while not self._stop.is_set():
+            for path, stat in self._take_ready(max_in_flight - len(self._in_flight)):
+                future = pool.submit(process_pdf, path, arrow=True)
+                self._in_flight[future] = (path, stat)
+
+            self._collect(timeout=POLL_SECONDS if self._in_flight else 0)
+            if self._should_commit():
+                self._commit()
+
+            if not self._in_flight:
+                self._stop.wait(POLL_SECONDS)
+            if self.stats_every and time.monotonic() - last_stats >= self.stats_every:
+                self._print_stats()
+                last_stats = time.monotonic()
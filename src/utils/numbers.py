@@ -0,0 +1,72 @@
+"""
+Conversão vetorizada de números no formato das faturas.
+
+Aceita, numa coluna inteira de uma vez (kernels do pyarrow.compute, sem
+laço Python por elemento):
+- vírgula decimal com ponto de milhar: "1.234,56" -> 1234.56;
+- sinal no fim, como a Enel imprime descontos: "19,52-" -> -19.52;
+- sinal no início: "-0,59" -> -0.59;
+- ponto decimal, como em valores já normalizados: "-19.52" -> -19.52.
+
+Sem vírgula, um único ponto é o separador decimal ("1.00" -> 1.0). Vários
+pontos sem vírgula são ambíguos ("1.264.27" é "1.264,27" com a vírgula
+trocada por ponto, não 126427) e viram `default`, como textos vazios, nulos
+e qualquer coisa que não seja um número (NaN por padrão).
+"""
+
+import numpy as np
+import pandas as pd
+import pyarrow as pa
+import pyarrow.compute as pc
+
+# Depois de tirar sinal e separadores: dígitos com parte decimal/expoente opcionais
+_NUMBER_RE = r"^(\d+\.?\d*|\.\d+)([eE][+-]?\d+)?$"
+
+
+def _as_text(values):
+    """Valores como array Arrow de texto (nulos preservados)."""
+    if isinstance(values, (pa.Array, pa.ChunkedArray)):
+        return pc.cast(values, pa.string())
+
+    values = np.asarray(values, dtype=object)
+    try:
+        return pa.array(values, pa.string(), from_pandas=True)
+    except (pa.ArrowInvalid, pa.ArrowTypeError):
+        # Números misturados a textos (ex: coluna object de um Parquet antigo)
+        return pa.array(
+            [None if pd.isna(v) else str(v) for v in values],
+            pa.string(),
+        )
+
+
+def parse_br_numbers(values, default=np.nan):
+    """
+    Converte uma sequência de textos numéricos (lista, Series, array numpy
+    ou Arrow) em um array float64. Entradas já numéricas passam direto.
+    """
+    dtype = getattr(values, "dtype", None)
+    if (
+        dtype is not None
+        and not isinstance(values, (pa.Array, pa.ChunkedArray))
+        and pd.api.types.is_numeric_dtype(dtype)
+        and not pd.api.types.is_bool_dtype(dtype)
+    ):
+        result = pd.array(values).to_numpy(dtype="float64", na_value=np.nan)
+        return np.where(np.isnan(result), default, result)
+
+    text = _as_text(values)
+
+    # Sinal no início ou no fim; depois sobram só dígitos e separadores
+    negative = pc.match_substring_regex(text, r"^\s*-|-\s*$")
+    text = pc.utf8_trim(text, " \t\r\n+-")
+
+    # Com vírgula, os pontos são separadores de milhar e a vírgula é o decimal
+    # (mais de uma vírgula, ou vários pontos sem vírgula, não passam na validação)
+    has_comma = pc.match_substring(text, ",")
+    text = pc.if_else(has_comma, pc.replace_substring(text, ".", ""), text)
+    text = pc.replace_substring(text, ",", ".")
+
+    valid = pc.match_substring_regex(text, _NUMBER_RE)
+    numbers = pc.cast(pc.if_else(valid, text, None), pa.float64())
+    numbers = pc.if_else(negative, pc.negate(numbers), numbers)
+    return pc.fill_null(numbers, float(default)).to_numpy(zero_copy_only=False)
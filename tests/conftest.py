@@ -0,0 +1,90 @@
+import os
+
+import pytest
+
+from src.database import ingest_catalog, manager
+from src.services import extraction_cache, layout_store
+
+FIXTURES = os.path.join(os.path.dirname(__file__), "fixtures")
+
+
+def _escape(text):
+    return text.replace("\\", "\\\\").replace("(", "\\(").replace(")", "\\)")
+
+
+def build_text_pdf(lines):
+    """Gera um PDF mínimo (uma página, Courier) com as linhas de texto dadas."""
+    content = ["BT", "/F1 6 Tf", "7 TL", "10 830 Td"]
+    for line in lines:
+        content.append(f"({_escape(line)}) Tj T*")
+    content.append("ET")
+    stream = "\n".join(content).encode("latin-1")
+
+    objects = [
+        b"<< /Type /Catalog /Pages 2 0 R >>",
+        b"<< /Type /Pages /Kids [3 0 R] /Count 1 >>",
+        (
+            b"<< /Type /Page /Parent 2 0 R /MediaBox [0 0 595 842] "
+            b"/Resources << /Font << /F1 4 0 R >> >> /Contents 5 0 R >>"
+        ),
+        (
+            b"<< /Type /Font /Subtype /Type1 /BaseFont /Courier "
+            b"/Encoding /WinAnsiEncoding >>"
+        ),
+        b"<< /Length %d >>\nstream\n" % len(stream) + stream + b"\nendstream",
+    ]
+
+    out = bytearray(b"%PDF-1.4\n")
+    offsets = []
+    for number, body in enumerate(objects, start=1):
+        offsets.append(len(out))
+        out += b"%d 0 obj\n" % number + body + b"\nendobj\n"
+    xref = len(out)
+    out += b"xref\n0 %d\n0000000000 65535 f \n" % (len(objects) + 1)
+    for offset in offsets:
+        out += b"%010d 00000 n \n" % offset
+    out += (
+        b"trailer\n<< /Size %d /Root 1 0 R /Producer (pytest) >>\nstartxref\n%d\n%%%%EOF\n"
+        % (len(objects) + 1, xref)
+    )
+    return bytes(out)
+
+
+@pytest.fixture
+def layout_text():
+    with open(os.path.join(FIXTURES, "layout_sample.txt"), encoding="utf-8") as fh:
+        return fh.read()
+
+
+@pytest.fixture
+def invoice_pdf_bytes(layout_text):
+    return build_text_pdf(layout_text.split("\n"))
+
+
+@pytest.fixture
+def db_dir(tmp_path, monkeypatch):
+    folder = tmp_path / "database"
+    monkeypatch.setattr(manager, "DB_FOLDER", str(folder))
+    monkeypatch.setattr(manager, "DIR_FATURAS", str(folder / "faturas"))
+    monkeypatch.setattr(manager, "DIR_MEDICAO", str(folder / "medicao"))
+    monkeypatch.setattr(manager, "FILE_FATURAS", str(folder / "faturas.parquet"))
+    monkeypatch.setattr(manager, "FILE_MEDICAO", str(folder / "medicao.parquet"))
+    monkeypatch.setattr(manager, "VERSION_FILE", str(folder / "_version"))
+    monkeypatch.setattr(manager, "SCHEMA_FILE", str(folder / "_schema"))
+    monkeypatch.setattr(manager, "LOCK_FILE", str(folder / "_lock"))
+    monkeypatch.setattr(manager, "SUMMARY_FILE", str(folder / "resumo_mensal.parquet"))
+    monkeypatch.setattr(manager, "SNAPSHOT_DIR", str(folder / "_snapshot"))
+    # Snapshot montado na própria leitura: nenhuma thread sobrevive ao teste
+    monkeypatch.setattr(manager, "SNAPSHOT_ASYNC", False)
+    monkeypatch.setattr(ingest_catalog, "CATALOG_FILE", str(folder / "_ingest.sqlite"))
+    manager._load_cache.clear()
+    return folder
+
+
+@pytest.fixture
+def cache_dir(tmp_path, monkeypatch):
+    """Cache de extração e textos de layout em pastas temporárias."""
+    folder = tmp_path / "extraction"
+    monkeypatch.setattr(extraction_cache, "CACHE_FOLDER", str(folder))
+    monkeypatch.setattr(layout_store, "LAYOUT_FOLDER", str(tmp_path / "layout"))
+    return folder
@@ -0,0 +1,91 @@
+import pandas as pd
+
+from src.database.schema import apply_schema, table_to_frame
+from src.services import extractor
+
+
+def test_parse_layout_text_header_fields(layout_text):
+    data = extractor.parse_layout_text(layout_text)
+    assert data["reference"] == "01/2025"
+    assert data["client_id"] == "123456789"
+
+
+def test_parse_layout_text_measurement(layout_text):
+    rows = extractor.parse_layout_text(layout_text)["measurement"]
+    assert [r["P.Horário/Segmento"] for r in rows] == [
+        "Energia Ativa Fora Ponta",
+        "Energia Injetada HFP",
+    ]
+    assert rows[0]["Data Leitura (Atual)"] == "06/01/2025"
+    assert rows[0]["Consumo kWh"] == "467"
+    assert extractor.extract_measurement(layout_text) == rows
+
+
+def test_parse_layout_text_items_filters_noise(layout_text):
+    items = extractor.parse_layout_text(layout_text)["items"]
+    names = [i["Itens de Fatura"] for i in items]
+    # Cabeçalhos fiscais, histórico e linhas após o TOTAL ficam de fora
+    assert names == [
+        "Adicional Bandeira Amarela",
+        "CIP-ILUM PUB PREF MUNICIPAL",
+        "Multa por atraso",
+        "Juros moratorios",
+    ]
+    # Tokens como impressos: a conversão fica com o build_dataframes/build_tables
+    assert items[0]["Tarifa unit (R$)"] == "0,01543210"
+    assert items[3]["Valor (R$)"] == "0,59-"
+
+
+def test_client_id_visual_layout_fallback():
+    text = "Conta de energia\n   9876543210   \n\n   02/2024   Vencimento\n"
+    data = extractor.parse_layout_text(text)
+    assert data["client_id"] == "9876543210"
+    assert data["reference"] == "02/2024"
+
+
+def test_client_code_split_across_lines():
+    text = "Pague utilizando o\n   código 123456789 no app\n   9876543210\n   02/2024\n"
+    data = extractor.parse_layout_text(text)
+    # A frase quebrada ainda vence o layout visual, como na busca original
+    assert data["client_id"] == "123456789"
+
+
+def test_process_values_simple_item():
+    cols = extractor.process_values("23,01 1,20 23,01 18,00 4,14", "simple")
+    assert cols["Valor (R$)"] == "23,01"
+    assert cols["ICMS"] == "4,14"
+    assert cols["Quant."] == ""
+
+
+def test_build_tables_matches_build_dataframes(layout_text):
+    raw = extractor.parse_layout_text(layout_text)
+    for table, df in zip(extractor.build_tables(raw), extractor.build_dataframes(raw)):
+        pd.testing.assert_frame_equal(
+            table_to_frame(table), apply_schema(df), check_categorical=False
+        )
+
+
+def test_thousands_separator_values():
+    text = (
+        "Itens de Fatura\n"
+        "   Energia Ativa kWh 2.467,00 0,512345 1.264,27 65,02 1.264,27 "
+        "18,00 227,57 0,43000000\n"
+        "   Multa 1.234,56\n"
+        "   Desconto 1.000,50-\n"
+        "TOTAL 2.498,33\n"
+    )
+    raw = extractor.parse_layout_text(text)
+    df_fin, _ = extractor.build_dataframes(raw)
+    table_fin, _ = extractor.build_tables(raw)
+    for values in (df_fin, table_fin.to_pandas()):
+        assert values["Quant."].tolist()[0] == 2467.0
+        assert values["Valor (R$)"].tolist() == [1264.27, 1234.56, -1000.5]
+
+
+def test_build_tables_unknown_header():
+    raw = {"items": [{"Itens de Fatura": "Multa", "Valor (R$)": "1.50"}]}
+    table_fin, table_med = extractor.build_tables(raw)
+    row = table_fin.to_pylist()[0]
+    assert row["Valor (R$)"] == 1.5
+    assert row["Nº do Cliente"] is None and row["Período"] is None
+    assert table_med.num_rows == 0
@@ -0,0 +1,206 @@
+import io
+import os
+import threading
+
+import pyarrow as pa
+import pytest
+
+from src.services import extraction_cache, extractor, ingest, layout_store
+
+
+def _forbid_pdfplumber(monkeypatch):
+    def fail(*args, **kwargs):
+        raise AssertionError("pdfplumber não deveria ser chamado")
+
+    monkeypatch.setattr(extractor.pdfplumber, "open", fail)
+
+
+def test_process_pdf_extracts_and_caches(invoice_pdf_bytes, cache_dir):
+    result = ingest.process_pdf(invoice_pdf_bytes)
+    assert result["status"] == ingest.STATUS_OK
+    assert not result["cached"]
+    assert result["fin"]["Referência"].unique().tolist() == ["01/2025"]
+    assert len(result["med"]) == 2
+    assert len(os.listdir(cache_dir)) == 2
+
+
+def test_process_pdf_cache_hit_skips_pdfplumber(
+    invoice_pdf_bytes, cache_dir, monkeypatch
+):
+    first = ingest.process_pdf(invoice_pdf_bytes)
+    _forbid_pdfplumber(monkeypatch)
+    second = ingest.process_pdf(invoice_pdf_bytes)
+    assert second["cached"]
+    assert second["fin"].equals(first["fin"])
+    assert second["med"].equals(first["med"])
+
+
+def test_cache_key_changes_with_extractor_version():
+    digest = extraction_cache.content_hash(b"%PDF-1.4")
+    assert extraction_cache.cache_key(digest, "1") != extraction_cache.cache_key(
+        digest, "2"
+    )
+
+
+def test_cache_evicts_least_recently_used(cache_dir, invoice_pdf_bytes):
+    df_fin = ingest.process_pdf(invoice_pdf_bytes, use_cache=False)["fin"]
+    df_med = df_fin.iloc[0:0]
+    for i, key in enumerate(["a", "b", "c"]):
+        extraction_cache.put_cached_extraction(key, df_fin, df_med)
+        for path in extraction_cache._entry_paths(key):
+            os.utime(path, (1000 + i, 1000 + i))
+
+    # "a" é o mais antigo, mas um acerto o torna o mais recente
+    assert extraction_cache.get_cached_extraction("a") is not None
+    entry_size = sum(os.path.getsize(p) for p in extraction_cache._entry_paths("a"))
+    extraction_cache._evict_if_needed(max_bytes=2 * entry_size)
+
+    assert extraction_cache.get_cached_extraction("b") is None
+    assert extraction_cache.get_cached_extraction("a") is not None
+    assert extraction_cache.get_cached_extraction("c") is not None
+
+
+def test_corrupted_cache_entry_is_a_miss(cache_dir, invoice_pdf_bytes):
+    df_fin = ingest.process_pdf(invoice_pdf_bytes, use_cache=False)["fin"]
+    extraction_cache.put_cached_extraction("a", df_fin, df_fin.iloc[0:0])
+    path_fin, _ = extraction_cache._entry_paths("a")
+    with open(path_fin, "wb") as fh:
+        fh.write(b"PAR1 truncado")
+    assert extraction_cache.get_cached_extraction("a") is None
+
+
+@pytest.mark.parametrize("data", [b"", b"nao e gzip", b"\x1f\x8b\x08\x00"])
+def test_corrupted_layout_is_a_miss(cache_dir, data):
+    assert layout_store.put_layout("a", {"text": "x", "words": []})
+    with open(layout_store._layout_path("a"), "wb") as fh:
+        fh.write(data)
+    assert layout_store.get_layout("a") is None
+
+
+def test_layout_text_is_stored_with_word_boxes(invoice_pdf_bytes, cache_dir):
+    ingest.process_pdf(invoice_pdf_bytes)
+    digest = extraction_cache.content_hash(invoice_pdf_bytes)
+    layout = layout_store.get_layout(digest)
+    assert "utilizando o código 123456789" in layout["text"]
+    assert layout["words"][0][0] == "ENEL"
+
+
+def test_same_content_stored_from_many_threads(
+    invoice_pdf_bytes, cache_dir, monkeypatch
+):
+    # Mesmo PDF em várias threads (duplicatas num lote): cada uma com o seu temporário
+    result = ingest.process_pdf(invoice_pdf_bytes, use_cache=False)
+    tmp_paths = []
+    replace = os.replace
+    monkeypatch.setattr(
+        os, "replace", lambda src, dst: tmp_paths.append(src) or replace(src, dst)
+    )
+
+    barrier = threading.Barrier(2)  # As duas threads vivas ao mesmo tempo
+
+    def store():
+        barrier.wait()
+        layout_store.put_layout(result["digest"], {"text": "x", "words": []})
+        extraction_cache.put_cached_extraction(
+            result["key"], result["fin"], result["med"]
+        )
+
+    threads = [threading.Thread(target=store) for _ in range(2)]
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+
+    assert len(tmp_paths) == 6 and len(set(tmp_paths)) == 6
+    assert layout_store.get_layout(result["digest"])["text"] == "x"
+    assert extraction_cache.get_cached_extraction(result["key"]) is not None
+
+
+def test_new_extractor_version_reparses_stored_layout(
+    invoice_pdf_bytes, cache_dir, monkeypatch
+):
+    first = ingest.process_pdf(invoice_pdf_bytes)
+    monkeypatch.setattr(extraction_cache, "EXTRACTOR_VERSION", "next")
+    _forbid_pdfplumber(monkeypatch)
+
+    second = ingest.process_pdf(invoice_pdf_bytes)
+    assert not second["cached"]
+    assert second["fin"].equals(first["fin"])
+
+
+def test_reparse_archive_uses_stored_text(invoice_pdf_bytes, cache_dir, monkeypatch):
+    ingest.process_pdf(invoice_pdf_bytes)
+    _forbid_pdfplumber(monkeypatch)
+
+    results = list(ingest.reparse_archive())
+    assert len(results) == 1
+    assert results[0]["status"] == ingest.STATUS_OK
+    assert len(results[0]["med"]) == 2
+
+
+def test_process_pdf_arrow_mode_caches_tables(
+    invoice_pdf_bytes, cache_dir, monkeypatch
+):
+    first = ingest.process_pdf(invoice_pdf_bytes, arrow=True)
+    assert isinstance(first["fin"], pa.Table)
+    assert first["fin"].schema.field("Nº do Cliente").type == pa.int64()
+
+    _forbid_pdfplumber(monkeypatch)
+    second = ingest.process_pdf(invoice_pdf_bytes, arrow=True)
+    assert second["cached"]
+    assert second["fin"].equals(first["fin"])
+    assert second["med"].equals(first["med"])
+
+
+def _encrypt(pdf_bytes, password):
+    pikepdf = pytest.importorskip("pikepdf")
+    out = io.BytesIO()
+    with pikepdf.open(io.BytesIO(pdf_bytes)) as pdf:
+        pdf.save(out, encryption=pikepdf.Encryption(user=password, owner=password))
+    return out.getvalue()
+
+
+def test_locked_pdf_is_unlocked_in_memory(
+    invoice_pdf_bytes, cache_dir, tmp_path, monkeypatch
+):
+    monkeypatch.chdir(tmp_path)
+    locked = _encrypt(invoice_pdf_bytes, "1234")
+
+    assert ingest.process_pdf(locked)["status"] == ingest.STATUS_LOCKED
+    assert ingest.process_pdf(locked, password="errada")["status"] == (
+        ingest.STATUS_LOCKED
+    )
+    result = ingest.process_pdf(locked, password="1234", use_cache=False)
+    assert result["status"] == ingest.STATUS_OK
+    assert result["fin"]["Referência"].unique().tolist() == ["01/2025"]
+    # Nenhuma cópia desbloqueada em data/raw
+    assert not (tmp_path / "data").exists()
+
+
+def test_password_used_when_probe_misses_encryption(
+    invoice_pdf_bytes, cache_dir, monkeypatch
+):
+    locked = _encrypt(invoice_pdf_bytes, "1234")
+    real_probe = ingest.probe_pdf
+    monkeypatch.setattr(
+        ingest,
+        "probe_pdf",
+        lambda *a, **k: real_probe(*a, **k)._replace(encrypted=False),
+    )
+
+    assert ingest.process_pdf(locked)["status"] == ingest.STATUS_LOCKED
+    result = ingest.process_pdf(locked, password="1234")
+    assert result["status"] == ingest.STATUS_OK
+    assert result["fin"]["Referência"].unique().tolist() == ["01/2025"]
+
+
+def test_probe_rejects_before_pdfplumber(invoice_pdf_bytes, cache_dir, monkeypatch):
+    _forbid_pdfplumber(monkeypatch)
+    result = ingest.process_pdf(b"not a pdf")
+    assert result["status"] == ingest.STATUS_INVALID
+    assert result["key"] is None
+
+    result = ingest.process_pdf(invoice_pdf_bytes, max_bytes=100)
+    assert result["status"] == ingest.STATUS_TOO_LARGE
+    assert result["probe"].size == len(invoice_pdf_bytes)
+    assert not os.path.exists(cache_dir)
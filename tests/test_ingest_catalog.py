@@ -0,0 +1,57 @@
+import os
+
+import pytest
+
+from src.database import ingest_catalog
+
+
+@pytest.fixture
+def catalog(tmp_path, monkeypatch):
+    monkeypatch.setattr(
+        ingest_catalog, "CATALOG_FILE", str(tmp_path / "db" / "_ingest.sqlite")
+    )
+    files = []
+    for i in range(3):
+        path = tmp_path / f"f{i}.pdf"
+        path.write_bytes(b"%PDF-1.4 " + bytes([i]))
+        files.append(str(path))
+    return files
+
+
+def _record(pending, status, version="1"):
+    ingest_catalog.record(
+        [(path, stat, status, "hash", None) for path, stat in pending.items()],
+        version,
+    )
+
+
+def test_unchanged_successes_are_skipped(catalog):
+    pending = ingest_catalog.select_pending(catalog, "1")
+    assert list(pending) == catalog
+
+    # Só o primeiro lote foi gravado antes da "queda": os demais continuam pendentes
+    _record({catalog[0]: pending[catalog[0]]}, "ok")
+    assert list(ingest_catalog.select_pending(catalog, "1")) == catalog[1:]
+
+    _record({p: pending[p] for p in catalog[1:]}, "ok")
+    assert ingest_catalog.select_pending(catalog, "1") == {}
+
+
+def test_changes_failures_and_new_extractor_are_reprocessed(catalog):
+    pending = ingest_catalog.select_pending(catalog, "1")
+    _record({catalog[0]: pending[catalog[0]]}, "ok")
+    _record({catalog[1]: pending[catalog[1]]}, ingest_catalog.STATUS_ERROR)
+    _record({catalog[2]: pending[catalog[2]]}, "locked")
+
+    # Erros são refeitos; status definitivos (ok, sem senha) não
+    assert list(ingest_catalog.select_pending(catalog, "1")) == [catalog[1]]
+
+    stat = os.stat(catalog[0])
+    os.utime(catalog[0], ns=(stat.st_atime_ns, stat.st_mtime_ns + 10**9))
+    assert list(ingest_catalog.select_pending(catalog, "1")) == catalog[:2]
+
+    # Outra versão do extrator: tudo de novo
+    assert list(ingest_catalog.select_pending(catalog, "2")) == catalog
+
+    ingest_catalog.clear()
+    assert not os.path.exists(ingest_catalog.CATALOG_FILE)
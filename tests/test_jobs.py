@@ -0,0 +1,107 @@
+import os
+import time
+
+import pytest
+
+from src.services import ingest, jobs
+from tests.conftest import build_text_pdf
+
+
+@pytest.fixture
+def service(cache_dir):
+    service = jobs.JobService(read_workers=2, extract_workers=0)
+    yield service
+    service.shutdown()
+
+
+def _wait(service, job_id, timeout=30):
+    deadline = time.monotonic() + timeout
+    while time.monotonic() < deadline:
+        job = service.status(job_id)
+        if job["state"] in jobs.FINISHED_STATES:
+            return job
+        time.sleep(0.05)
+    raise AssertionError(f"job {job_id} não terminou")
+
+
+def test_job_extracts_in_background(service, invoice_pdf_bytes):
+    job_id = service.submit(invoice_pdf_bytes, name="fatura.pdf")
+    job = _wait(service, job_id)
+
+    assert job["state"] == jobs.JOB_DONE and job["name"] == "fatura.pdf"
+    result = job["result"]
+    assert result["status"] == ingest.STATUS_OK and not result["cached"]
+    assert result["fin"]["Referência"].iloc[0] == "01/2025"
+    assert service.stats()[jobs.JOB_DONE] == 1
+
+
+def test_same_content_shares_job(service, invoice_pdf_bytes):
+    first = service.submit(invoice_pdf_bytes)
+    assert service.submit(invoice_pdf_bytes) == first
+    # Senha diferente é outro trabalho (o resultado pode mudar)
+    assert service.submit(invoice_pdf_bytes, password="12345") != first
+    _wait(service, first)
+
+
+def test_rejected_and_failed_jobs(service, monkeypatch):
+    job = _wait(service, service.submit(b"not a pdf"))
+    assert job["state"] == jobs.JOB_DONE
+    assert job["result"]["status"] == ingest.STATUS_INVALID
+
+    def boom(*args, **kwargs):
+        raise RuntimeError("disco cheio")
+
+    monkeypatch.setattr(jobs, "prepare_pdf", boom)
+    failed = service.submit(b"%PDF-1.4 quebrado")
+    job = _wait(service, failed)
+    assert job["state"] == jobs.JOB_FAILED and job["error"] == "disco cheio"
+    # Jobs que falharam são refeitos num novo envio
+    assert service.submit(b"%PDF-1.4 quebrado") != failed
+
+
+def test_finished_jobs_expire(cache_dir):
+    service = jobs.JobService(read_workers=1, extract_workers=0, ttl=0.5)
+    try:
+        job_id = service.submit(b"not a pdf")
+        _wait(service, job_id)
+        time.sleep(0.6)
+        # Consultas também descartam os expirados, sem depender de novos envios
+        assert service.stats()[jobs.JOB_DONE] == 0
+        assert service.status(job_id) is None
+    finally:
+        service.shutdown()
+
+
+def test_process_pool_extraction(cache_dir, layout_text):
+    # Uma thread de leitura para dois processos: ela não espera pela extração
+    service = jobs.JobService(read_workers=1, extract_workers=2)
+    pdfs = [
+        build_text_pdf(layout_text.replace("01/2025", ref).split("\n"))
+        for ref in ("01/2025", "02/2025")
+    ]
+    try:
+        done = [_wait(service, service.submit(pdf), timeout=120) for pdf in pdfs]
+    finally:
+        service.shutdown()
+    assert [job["state"] for job in done] == [jobs.JOB_DONE] * 2
+    refs = [job["result"]["fin"]["Referência"].iloc[0] for job in done]
+    assert refs == ["01/2025", "02/2025"]
+
+
+def test_broken_process_pool_is_replaced(cache_dir, invoice_pdf_bytes):
+    service = jobs.JobService(read_workers=1, extract_workers=1)
+    broken = service._extract_pool
+    try:
+        # O único worker morre enquanto a extração do job espera na fila
+        broken.submit(time.sleep, 1)
+        broken.submit(os._exit, 1)
+        job = _wait(service, service.submit(invoice_pdf_bytes), timeout=120)
+        assert job["state"] == jobs.JOB_DONE
+        assert job["result"]["fin"]["Referência"].iloc[0] == "01/2025"
+        assert service._extract_pool is not broken
+
+        # Jobs seguintes usam o pool novo
+        other = _wait(service, service.submit(b"%PDF-1.4 outro"), timeout=120)
+        assert other["state"] == jobs.JOB_DONE
+    finally:
+        service.shutdown()
@@ -0,0 +1,598 @@
+import multiprocessing
+import os
+import threading
+from concurrent.futures import ProcessPoolExecutor
+
+import pandas as pd
+import pyarrow as pa
+import pyarrow.parquet as pq
+import pytest
+
+from src.database import manager
+from src.database.schema import to_table
+
+
+def make_invoice(reference, client="123456789", valores=(10.0, 5.5)):
+    df_fin = pd.DataFrame(
+        {
+            "Itens de Fatura": [f"Item {i}" for i in range(len(valores))],
+            "Unid.": ["kWh"] * len(valores),
+            "Valor (R$)": list(valores),
+            "Referência": reference,
+            "Nº do Cliente": client,
+        }
+    )
+    df_med = pd.DataFrame(
+        {
+            "P.Horário/Segmento": ["Energia Ativa", "Energia Injetada"],
+            "Consumo kWh": [300.0, 120.0],
+            "N° Dias": [30.0, 30.0],
+            "Referência": reference,
+            "Nº do Cliente": client,
+        }
+    )
+    return df_fin, df_med
+
+
+def test_save_data_replaces_same_reference(db_dir):
+    assert manager.save_data(*make_invoice("01/2025"))
+    assert manager.save_data(*make_invoice("01/2025", valores=(99.0,)))
+    df_fat, df_med = manager.load_data()
+    assert df_fat["Valor (R$)"].tolist() == [99.0]
+    assert len(df_med) == 2
+
+
+def test_batch_writer_commits_once(db_dir, monkeypatch):
+    calls = []
+    original = manager._append_delta
+    monkeypatch.setattr(
+        manager,
+        "_append_delta",
+        lambda *a, **k: calls.append(a[1]) or original(*a, **k),
+    )
+
+    with manager.BatchWriter() as batch:
+        for mes in range(1, 13):
+            batch.add(*make_invoice(f"{mes:02d}/2024"))
+        # Reimportação no mesmo lote: vale a última versão
+        batch.add(*make_invoice("03/2024", valores=(1.0,)))
+
+    assert len(calls) == 2  # Uma escrita por tabela
+    df_fat, df_med = manager.load_data()
+    assert df_fat["Referência"].nunique() == 12
+    assert df_fat.loc[df_fat["Referência"] == "03/2024", "Valor (R$)"].tolist() == [1.0]
+    assert len(df_med) == 24
+
+
+def test_batch_writer_discards_on_exception(db_dir):
+    with pytest.raises(RuntimeError), manager.BatchWriter() as batch:
+        batch.add(*make_invoice("01/2025"))
+        raise RuntimeError("falhou no meio do lote")
+
+    df_fat, _ = manager.load_data()
+    assert df_fat.empty
+
+
+@pytest.mark.parametrize("step", ["init_db", "_next_sequence", "_bump_version"])
+def test_batch_writer_returns_false_on_write_errors(db_dir, monkeypatch, step):
+    def fail(*args, **kwargs):
+        raise OSError("sem permissão")
+
+    monkeypatch.setattr(manager, step, fail)
+    assert manager.save_data(*make_invoice("01/2025")) is False
+
+
+def test_batch_writer_accepts_arrow_tables(db_dir):
+    def as_tables(invoice):
+        return [to_table(df) for df in invoice]
+
+    with manager.BatchWriter() as batch:
+        batch.add(*as_tables(make_invoice("01/2025")))
+        batch.add(*make_invoice("02/2025"))
+        # A tabela Arrow posterior substitui a fatura adicionada como DataFrame
+        batch.add(*as_tables(make_invoice("02/2025", valores=(7.0,))))
+
+    df_fat, df_med = manager.load_data()
+    assert df_fat["Valor (R$)"].tolist() == [10.0, 5.5, 7.0]
+    assert df_fat["Nº do Cliente"].unique().tolist() == [123456789]
+    assert len(df_med) == 4
+    assert manager.load_summary()["Valor (R$)"].tolist() == [15.5, 7.0]
+
+
+def test_compaction_rewrites_only_touched_partition(db_dir):
+    manager.save_data(*make_invoice("12/2024"))
+    manager.save_data(*make_invoice("01/2025", client="555"))
+    manager.compact()
+    untouched = next((db_dir / "faturas").glob("*=555/ano=2025/*.parquet"))
+    mtime = untouched.stat().st_mtime_ns
+
+    manager.save_data(*make_invoice("11/2024", valores=(7.0,)))
+    manager.compact()
+    assert untouched.stat().st_mtime_ns == mtime
+
+    partitions = sorted(
+        p.relative_to(db_dir / "faturas").as_posix()
+        for p in (db_dir / "faturas").glob("*/*")
+    )
+    assert partitions == [
+        "Nº do Cliente=123456789/ano=2024",
+        "Nº do Cliente=555/ano=2025",
+    ]
+    df_fat, _ = manager.load_data()
+    assert sorted(df_fat["Referência"].unique()) == ["01/2025", "11/2024", "12/2024"]
+
+
+def test_partition_pruning_by_client(db_dir):
+    manager.save_data(*make_invoice("01/2025"))
+    manager.save_data(*make_invoice("01/2025", client="555"))
+    df = manager._read_table(
+        manager.DIR_FATURAS, filter=manager.ds.field(manager.CLIENT_COL) == 555
+    )
+    assert df[manager.CLIENT_COL].unique().tolist() == [555]
+
+
+def test_legacy_files_are_migrated(db_dir):
+    db_dir.mkdir()
+    df_fin, df_med = make_invoice("01/2025")
+    old_fin, old_med = make_invoice("02/2024", client="Not Found")
+    pd.concat([df_fin, old_fin]).to_parquet(manager.FILE_FATURAS)
+    pd.concat([df_med, old_med]).to_parquet(manager.FILE_MEDICAO)
+
+    df_fat, df_medicao = manager.load_data()
+    assert len(df_fat) == 4 and len(df_medicao) == 4
+    # Cliente não numérico vira nulo (partição padrão)
+    assert (df_fat[manager.CLIENT_COL] == 123456789).sum() == 2
+    assert df_fat[manager.CLIENT_COL].isna().sum() == 2
+    assert (db_dir / "faturas.parquet.migrated").exists()
+    assert not (db_dir / "faturas.parquet").exists()
+
+
+def test_load_data_pushdown_filters(db_dir):
+    with manager.BatchWriter() as batch:
+        for ano in (2023, 2024):
+            for mes in (1, 2):
+                batch.add(*make_invoice(f"{mes:02d}/{ano}"))
+        batch.add(*make_invoice("01/2024", client="555"))
+
+    df_fat, df_med = manager.load_data(
+        columns=["Referência", "Valor (R$)", "Consumo kWh"],
+        client="123456789",
+        years=[2024],
+    )
+    assert sorted(df_fat["Referência"].unique()) == ["01/2024", "02/2024"]
+    assert df_fat.columns.tolist() == ["Referência", "Valor (R$)"]
+    assert df_med.columns.tolist() == ["Referência", "Consumo kWh"]
+
+    df_fat, _ = manager.load_data(references=["02/2023"])
+    assert df_fat["Referência"].unique().tolist() == ["02/2023"]
+
+    assert manager.list_clients() == [555, 123456789]
+    assert manager.list_years() == [2023, 2024]
+    assert manager.list_years("555") == [2024]
+
+
+def test_load_data_is_cached_until_next_write(db_dir, monkeypatch):
+    manager.save_data(*make_invoice("01/2025"))
+    reads = []
+    original = manager._load_tables
+    monkeypatch.setattr(
+        manager,
+        "_load_tables",
+        lambda *a, **k: reads.append(a) or original(*a, **k),
+    )
+
+    manager.load_data(client="123456789")
+    manager.load_data(client="123456789")
+    assert len(reads) == 1  # Só a primeira chamada lê o banco
+
+    manager.save_data(*make_invoice("02/2025"))
+    df_fat, _ = manager.load_data(client="123456789")
+    assert len(reads) == 2
+    assert sorted(df_fat["Referência"].unique()) == ["01/2025", "02/2025"]
+
+
+def test_external_write_invalidates_cache(db_dir):
+    manager.save_data(*make_invoice("01/2025"))
+    manager.load_data()
+
+    # Outro processo (ex: main.py) grava e toca o marcador de versão
+    manager._upsert_dataframe(
+        make_invoice("02/2025")[0], manager.DIR_FATURAS, keys=["Referência"]
+    )
+    tmp_path = manager.VERSION_FILE + ".outro"
+    with open(tmp_path, "w") as fh:
+        fh.write("outro-processo")
+    os.replace(tmp_path, manager.VERSION_FILE)
+
+    df_fat, _ = manager.load_data()
+    assert sorted(df_fat["Referência"].unique()) == ["01/2025", "02/2025"]
+
+
+def test_load_data_applies_typed_schema(db_dir):
+    df_fin, df_med = make_invoice("01/2025")
+    df_med["Data Leitura (Atual)"] = "31/01/2025"
+    manager.save_data(df_fin, df_med)
+
+    df_fat, df_medicao = manager.load_data()
+    assert isinstance(df_fat["Referência"].dtype, pd.CategoricalDtype)
+    assert isinstance(df_fat["Itens de Fatura"].dtype, pd.CategoricalDtype)
+    assert df_fat[manager.CLIENT_COL].dtype == "Int64"
+    assert df_fat["Período"].tolist() == [202501, 202501]
+    assert df_medicao["Data Leitura (Atual)"].iloc[0] == pd.Timestamp("2025-01-31")
+
+
+def test_untyped_partitions_are_migrated(db_dir):
+    # Partições gravadas antes do esquema: datas em texto e cliente "Not Found"
+    for client, ref in (("123456789", "01/2025"), ("Not%20Found", "02/2025")):
+        part = db_dir / "medicao" / f"Nº do Cliente={client}" / "ano=2025"
+        part.mkdir(parents=True)
+        _, df_med = make_invoice(ref)
+        df_med = df_med.drop(columns=manager.CLIENT_COL)
+        df_med["Data Leitura (Atual)"] = "28/02/2025"
+        df_med.to_parquet(part / manager.PART_FILE, index=False)
+
+    _, df_med = manager.load_data()
+    assert len(df_med) == 4
+    assert df_med["Data Leitura (Atual)"].dtype.kind == "M"
+    assert df_med[manager.CLIENT_COL].isna().sum() == 2
+    assert not (db_dir / "medicao" / "Nº do Cliente=Not%20Found").exists()
+    assert (db_dir / "_schema").read_text() == str(manager.SCHEMA_VERSION)
+
+
+def test_load_data_sorted_by_client_and_period(db_dir):
+    with manager.BatchWriter() as batch:
+        for ref in ("02/2025", "11/2024", "01/2025", "12/2024"):
+            batch.add(*make_invoice(ref, valores=(1.0,)))
+        batch.add(*make_invoice("06/2024", client="555", valores=(1.0,)))
+
+    df_fat, _ = manager.load_data()
+    assert df_fat[manager.CLIENT_COL].tolist() == [555] + [123456789] * 4
+    assert df_fat["Período"].tolist() == [202406, 202411, 202412, 202501, 202502]
+
+    df_fat, df_med = manager.load_data(client="123456789", periods=(202412, 202501))
+    assert df_fat["Referência"].tolist() == ["12/2024", "01/2025"]
+    assert df_med["Período"].unique().tolist() == [202412, 202501]
+
+
+def _save_months(folder, months):
+    # Roda em outro processo: aponta o manager para o banco do teste
+    manager.DB_FOLDER = folder
+    manager.DIR_FATURAS = os.path.join(folder, "faturas")
+    manager.DIR_MEDICAO = os.path.join(folder, "medicao")
+    manager.FILE_FATURAS = os.path.join(folder, "faturas.parquet")
+    manager.FILE_MEDICAO = os.path.join(folder, "medicao.parquet")
+    manager.VERSION_FILE = os.path.join(folder, "_version")
+    manager.SCHEMA_FILE = os.path.join(folder, "_schema")
+    manager.LOCK_FILE = os.path.join(folder, "_lock")
+    manager.SUMMARY_FILE = os.path.join(folder, "resumo_mensal.parquet")
+    manager.SNAPSHOT_DIR = os.path.join(folder, "_snapshot")
+    return all(manager.save_data(*make_invoice(f"{m:02d}/2024")) for m in months)
+
+
+def test_snapshot_matches_parquet_reads(db_dir, monkeypatch):
+    with manager.BatchWriter() as batch:
+        for ano in (2023, 2024):
+            for mes in (1, 2):
+                batch.add(*make_invoice(f"{mes:02d}/{ano}"))
+        batch.add(*make_invoice("01/2024", client="Desconhecido"))
+    manager.save_data(*make_invoice("02/2024", client="555"))
+    assert manager.refresh_snapshot()
+    assert manager._snapshot_fresh()
+
+    queries = [
+        {},
+        {"client": "123456789", "years": [2024]},
+        {"columns": ["Referência", "Valor (R$)"], "periods": (202302, 202401)},
+        {"references": ["01/2024"]},
+    ]
+
+    def load_all():
+        results = []
+        for query in queries:
+            manager._load_cache.clear()
+            results.append(manager.load_data(**query))
+        return results
+
+    from_snapshot = load_all()
+    monkeypatch.setattr(manager, "_snapshot_fresh", lambda: False)
+    for tables, expected in zip(from_snapshot, load_all()):
+        for df, df_expected in zip(tables, expected):
+            pd.testing.assert_frame_equal(df, df_expected, check_categorical=False)
+
+
+def test_snapshot_built_after_commit_on_first_read(db_dir):
+    manager.save_data(*make_invoice("01/2025"))
+    # O commit não monta o snapshot: a primeira leitura vai ao Parquet e o agenda
+    assert not manager._snapshot_fresh()
+    manager.load_data()
+    first = manager._snapshot_fresh()
+    assert first
+
+    manager.save_data(*make_invoice("02/2025"))
+    assert not manager._snapshot_fresh()
+    df_fat, _ = manager.load_data()
+    assert sorted(df_fat["Referência"].unique()) == ["01/2025", "02/2025"]
+    # Os arquivos do snapshot anterior são apagados
+    names = os.listdir(manager.SNAPSHOT_DIR)
+    assert manager._snapshot_fresh() != first
+    assert not any(first in name for name in names)
+
+
+def test_snapshot_not_stamped_if_version_changes(db_dir, monkeypatch):
+    manager.save_data(*make_invoice("01/2025"))
+    original = manager._read_table
+
+    def read_then_commit(table_dir, **kwargs):
+        df = original(table_dir, **kwargs)
+        if table_dir == manager.DIR_MEDICAO:
+            manager._bump_version()  # Escrita concorrente durante a montagem
+        return df
+
+    monkeypatch.setattr(manager, "_read_table", read_then_commit)
+    assert not manager.refresh_snapshot()
+    assert not manager._snapshot_fresh()
+
+
+def test_snapshot_survives_compaction_only(db_dir):
+    manager.save_data(*make_invoice("01/2025"))
+    manager.save_data(*make_invoice("02/2025"))
+    assert manager.refresh_snapshot()
+    manager.compact()
+    assert manager._snapshot_fresh()
+
+    # Escrita que não publica o snapshot (ex: migração): leitura volta ao Parquet
+    manager._bump_version()
+    assert not manager._snapshot_fresh()
+    df_fat, _ = manager.load_data()
+    assert sorted(df_fat["Referência"].unique()) == ["01/2025", "02/2025"]
+
+    manager.clear_data()
+    assert not manager._snapshot_fresh()
+    assert manager.load_data()[0].empty
+
+
+def test_concurrent_writers_do_not_lose_updates(db_dir):
+    # Três processos fazendo ler-modificar-gravar na mesma partição
+    lotes = [range(1, 5), range(5, 9), range(9, 13)]
+    context = multiprocessing.get_context("spawn")
+    with ProcessPoolExecutor(max_workers=3, mp_context=context) as pool:
+        results = list(pool.map(_save_months, [str(db_dir)] * 3, lotes))
+
+    assert all(results)
+    df_fat, df_med = manager.load_data()
+    assert df_fat["Período"].nunique() == 12
+    assert len(df_med) == 24
+    assert len(manager.load_summary()) == 12
+    # Nenhum temporário sobrou ao lado das partições
+    assert not list(db_dir.rglob("*.tmp"))
+
+
+def test_write_waits_for_lock(db_dir, monkeypatch):
+    from src.database import locking
+
+    manager.save_data(*make_invoice("01/2025"))
+    monkeypatch.setattr(locking, "LOCK_TIMEOUT", 0.2)
+
+    # Um leitor de outra thread segura a trava compartilhada: a escrita expira
+    holding, release = threading.Event(), threading.Event()
+
+    def reader():
+        with locking.file_lock(manager.LOCK_FILE, shared=True):
+            holding.set()
+            release.wait(5)
+
+    thread = threading.Thread(target=reader)
+    thread.start()
+    holding.wait(5)
+    try:
+        assert not manager.save_data(*make_invoice("02/2025"))
+    finally:
+        release.set()
+        thread.join()
+
+    df_fat, _ = manager.load_data()
+    assert df_fat["Referência"].unique().tolist() == ["01/2025"]
+
+
+def test_save_appends_delta_without_rewriting_base(db_dir):
+    manager.save_data(*make_invoice("01/2025"))
+    manager.compact()
+    base = next((db_dir / "faturas").glob("*/ano=2025/*.parquet"))
+    mtime = base.stat().st_mtime_ns
+
+    # Reimportação de 01/2025 (lápide) e um mês novo: só deltas são gravados
+    manager.save_data(*make_invoice("01/2025", valores=(99.0,)))
+    manager.save_data(*make_invoice("02/2025", valores=(1.0,)))
+    assert base.stat().st_mtime_ns == mtime
+    assert manager.pending_deltas() == 2
+
+    df_fat, df_med = manager.load_data()
+    assert df_fat["Valor (R$)"].tolist() == [99.0, 1.0]
+    assert len(df_med) == 4
+    assert manager.list_years() == [2025]
+
+    # Compactar não muda o que é lido
+    assert manager.compact() == 4  # 2 deltas x 2 tabelas
+    assert manager.pending_deltas() == 0
+    df_compacted, _ = manager.load_data()
+    pd.testing.assert_frame_equal(df_compacted, df_fat)
+
+
+def test_background_compaction(db_dir, monkeypatch):
+    monkeypatch.setattr(manager, "COMPACT_AFTER", 3)
+    for mes in range(1, 4):
+        manager.save_data(*make_invoice(f"{mes:02d}/2025"))
+
+    manager._compaction_thread.join(10)
+    assert manager.pending_deltas() == 0
+    df_fat, _ = manager.load_data(client=123456789)
+    assert df_fat["Período"].unique().tolist() == [202501, 202502, 202503]
+
+
+@pytest.fixture
+def duck_db(db_dir, monkeypatch):
+    pytest.importorskip("duckdb")
+    monkeypatch.setattr(manager, "DB_BACKEND", "duckdb")
+    monkeypatch.setattr(manager, "DUCKDB_FILE", str(db_dir / "enel.duckdb"))
+    return db_dir
+
+
+def test_duckdb_backend_upserts_by_primary_key(duck_db):
+    # Itens repetidos na mesma fatura não colidem na chave primária
+    df_fin, df_med = make_invoice("01/2025", valores=(10.0, 5.5, 1.0))
+    df_fin["Itens de Fatura"] = ["Bandeira", "Bandeira", "Energia"]
+    assert manager.save_data(df_fin, df_med)
+    assert manager.save_data(*make_invoice("02/2025", client="Not Found"))
+    assert manager.save_data(*make_invoice("01/2025", valores=(99.0,)))
+
+    df_fat, df_med = manager.load_data()
+    assert df_fat["Valor (R$)"].tolist() == [99.0, 10.0, 5.5]
+    assert df_fat["Nº do Cliente"].isna().sum() == 2
+    assert isinstance(df_fat["Itens de Fatura"].dtype, pd.CategoricalDtype)
+    assert len(df_med) == 4
+    assert not (duck_db / "faturas").exists()
+
+    assert manager.list_clients() == [123456789]
+    assert manager.list_years(123456789) == [2025]
+    df_jan, _ = manager.load_data(columns=["Valor (R$)"], periods=(202501, 202501))
+    assert df_jan.columns.tolist() == ["Valor (R$)"]
+    assert df_jan["Valor (R$)"].tolist() == [99.0]
+
+
+def test_summary_matches_between_backends(db_dir, monkeypatch):
+    pytest.importorskip("duckdb")
+    invoices = [
+        make_invoice("01/2025"),
+        make_invoice("02/2025", valores=(3.0, 4.0)),
+        make_invoice("01/2025", client="555", valores=(7.0,)),
+    ]
+    for df_fin, df_med in invoices:
+        df_fin.loc[0, "Itens de Fatura"] = "CONTRIB ILUM PUBLICA"
+        manager.save_data(df_fin, df_med)
+    df_parquet = manager.load_summary()
+
+    monkeypatch.setattr(manager, "DB_BACKEND", "duckdb")
+    monkeypatch.setattr(manager, "DUCKDB_FILE", str(db_dir / "enel.duckdb"))
+    for invoice in invoices:
+        manager.save_data(*invoice)
+    df_duckdb = manager.load_summary()
+
+    pd.testing.assert_frame_equal(df_duckdb, df_parquet, check_dtype=False)
+    row = df_parquet.iloc[0]
+    assert (row["Nº do Cliente"], row["Referência"]) == (555, "01/2025")
+    assert row["Consumo kWh"] == 300.0 and row["Injetado kWh"] == 120.0
+    assert row["CIP (R$)"] == 7.0 and row["Qtd. Itens"] == 1
+
+
+def test_summary_updated_incrementally(db_dir, monkeypatch):
+    manager.save_data(*make_invoice("01/2025"))
+    manager.save_data(*make_invoice("02/2025", valores=(3.0,)))
+
+    # O commit só recalcula as faturas do lote: não relê o histórico
+    def no_rebuild(*args, **kwargs):
+        raise AssertionError("histórico relido")
+
+    read_table = manager._read_table
+    monkeypatch.setattr(manager, "_read_table", no_rebuild)
+    manager.save_data(*make_invoice("01/2025", valores=(7.0, 1.0, 1.0)))
+    df_sum = manager.load_summary()
+    assert df_sum["Valor (R$)"].tolist() == [9.0, 3.0]
+    assert df_sum["Qtd. Itens"].tolist() == [3, 1]
+    assert df_sum["Consumo kWh"].tolist() == [300.0, 300.0]
+    assert df_sum["Injetado kWh"].tolist() == [120.0, 120.0]
+    monkeypatch.setattr(manager, "_read_table", read_table)
+
+    # Reconstrução do zero (arquivo ausente) chega ao mesmo resultado
+    os.remove(manager.SUMMARY_FILE)
+    manager._load_cache.clear()
+    pd.testing.assert_frame_equal(manager.load_summary(), df_sum)
+    assert manager.load_summary(periods=(202502, None))["Referência"].tolist() == [
+        "02/2025"
+    ]
+
+
+def test_failed_commit_leaves_no_partial_batch(db_dir, monkeypatch):
+    manager.save_data(*make_invoice("01/2025"))
+    version = manager._read_marker(manager.VERSION_FILE)
+    df_sum = manager.load_summary()
+
+    # Faturas gravadas, medição falha: nada do lote pode ficar visível
+    original = manager._append_delta
+
+    def fail_medicao(df_new, table_dir, seq):
+        if table_dir == manager.DIR_MEDICAO:
+            raise OSError("disco cheio")
+        return original(df_new, table_dir, seq)
+
+    monkeypatch.setattr(manager, "_append_delta", fail_medicao)
+    assert not manager.save_data(*make_invoice("02/2025"))
+
+    assert manager._read_marker(manager.VERSION_FILE) == version
+    assert manager.pending_deltas() == 1
+    df_fat, df_med = manager.load_data()
+    assert df_fat["Referência"].unique().tolist() == ["01/2025"]
+    assert df_med["Referência"].unique().tolist() == ["01/2025"]
+    pd.testing.assert_frame_equal(manager.load_summary(), df_sum)
+
+
+def test_money_stored_as_integer_cents(db_dir):
+    # 0,1 somado muitas vezes em float não dá 100,0; em centavos dá
+    manager.save_data(*make_invoice("01/2025", valores=[0.1] * 1000))
+    manager.compact()
+
+    path = next((db_dir / "faturas").rglob(manager.PART_FILE))
+    assert pq.read_schema(path).field("Valor (R$)").type == pa.int64()
+    assert pq.read_table(path)["Valor (R$)"].to_pylist()[:2] == [10, 10]
+
+    df_fat, _ = manager.load_data()
+    assert df_fat["Valor (R$)"].dtype == "float64"
+    assert df_fat["Valor (R$)"].iloc[0] == 0.1
+    assert manager.load_summary()["Valor (R$)"].tolist() == [100.0]
+
+
+def test_float_money_partitions_are_migrated(db_dir):
+    # Partição gravada pelo esquema 2: R$ em float64
+    part = db_dir / "faturas" / "Nº do Cliente=123456789" / "ano=2025"
+    part.mkdir(parents=True)
+    df_fin, _ = make_invoice("01/2025", valores=(10.01, 5.5))
+    df_fin.drop(columns=manager.CLIENT_COL).to_parquet(part / manager.PART_FILE)
+    (db_dir / "_schema").write_text("2")
+
+    df_fat, _ = manager.load_data()
+    assert df_fat["Valor (R$)"].tolist() == [10.01, 5.5]
+    assert (
+        pq.read_schema(part / manager.PART_FILE).field("Valor (R$)").type == pa.int64()
+    )
+    assert (db_dir / "_schema").read_text() == str(manager.SCHEMA_VERSION)
+
+
+def test_duckdb_double_money_columns_are_migrated(duck_db, monkeypatch):
+    from src.database import duckdb_backend
+
+    # Banco criado antes dos decimais: R$ e tarifas em DOUBLE
+    legacy = {
+        table: [
+            (name, "DOUBLE" if kind.startswith("DECIMAL") else kind)
+            for name, kind in columns
+        ]
+        for table, columns in duckdb_backend.TABLE_COLUMNS.items()
+    }
+    with monkeypatch.context() as m:
+        m.setattr(duckdb_backend, "TABLE_COLUMNS", legacy)
+        manager.save_data(*make_invoice("01/2025", client="1", valores=(0.1,)))
+    manager._duckdb_ready.clear()
+
+    manager.save_data(*make_invoice("02/2025", client="1", valores=(0.2,)))
+    df_fat, _ = manager.load_data()
+    assert df_fat["Valor (R$)"].tolist() == [0.1, 0.2]
+    assert manager.load_summary()["Valor (R$)"].tolist() == [0.1, 0.2]
+
+    con = duckdb_backend.connect(manager.DUCKDB_FILE, read_only=True)
+    try:
+        (kind,) = con.execute(
+            "SELECT data_type FROM information_schema.columns "
+            "WHERE table_name = 'faturas' AND column_name = 'Valor (R$)'"
+        ).fetchone()
+    finally:
+        con.close()
+    assert kind == duckdb_backend.MONEY_TYPE
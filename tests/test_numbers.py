@@ -0,0 +1,31 @@
+import numpy as np
+import pandas as pd
+import pyarrow as pa
+
+from src.utils.numbers import parse_br_numbers
+
+
+def test_parse_br_numbers_formats():
+    values = ["1.234,56", "19,52-", "-0,59", "-19.52", "1.00", "1.234.567,8", "12345"]
+    expected = [1234.56, -19.52, -0.59, -19.52, 1.0, 1234567.8, 12345.0]
+    np.testing.assert_allclose(parse_br_numbers(values), expected)
+
+
+def test_parse_br_numbers_invalid_and_empty():
+    # "1.264.27": vírgula decimal trocada por ponto, não um número de milhar
+    values = ["", "  ", None, "abc", "-", "1,2,3", "1.264.27", np.nan]
+    assert np.isnan(parse_br_numbers(values)).all()
+    assert parse_br_numbers(values, default=0.0).tolist() == [0.0] * len(values)
+
+
+def test_parse_br_numbers_input_types():
+    assert parse_br_numbers(
+        pd.Series([1, None], dtype="Int64"), default=0
+    ).tolist() == [
+        1.0,
+        0.0,
+    ]
+    mixed = pd.Series(["1,5", 2.5, None], dtype=object)
+    np.testing.assert_array_equal(parse_br_numbers(mixed), [1.5, 2.5, np.nan])
+    chunked = pa.chunked_array([["10,00-"], ["3"]])
+    assert parse_br_numbers(chunked).tolist() == [-10.0, 3.0]
@@ -0,0 +1,81 @@
+import io
+
+import pytest
+
+from src.services.pdf_probe import PdfProbe, probe_pdf
+
+
+def test_probe_reads_header_pages_and_producer(invoice_pdf_bytes, tmp_path):
+    path = tmp_path / "fatura.pdf"
+    path.write_bytes(invoice_pdf_bytes)
+
+    probe = probe_pdf(str(path))
+    assert probe == PdfProbe(
+        is_pdf=True,
+        encrypted=False,
+        pages=1,
+        size=len(invoice_pdf_bytes),
+        producer="pytest",
+        version="1.4",
+    )
+    # Mesmo resultado para conteúdo em memória (bytes e BytesIO)
+    assert probe_pdf(invoice_pdf_bytes) == probe
+    assert probe_pdf(io.BytesIO(invoice_pdf_bytes)) == probe
+
+
+def test_probe_detects_encryption(invoice_pdf_bytes):
+    pikepdf = pytest.importorskip("pikepdf")
+    out = io.BytesIO()
+    with pikepdf.open(io.BytesIO(invoice_pdf_bytes)) as pdf:
+        pdf.docinfo["/Producer"] = "Enel"
+        pdf.save(out, encryption=pikepdf.Encryption(user="1234", owner="1234"))
+
+    probe = probe_pdf(out.getvalue())
+    assert probe.is_pdf and probe.encrypted
+    # Strings do /Info ficam cifradas: o produtor não é lido
+    assert probe.producer is None
+
+
+def test_probe_rejects_non_pdf(tmp_path):
+    empty = tmp_path / "vazio.pdf"
+    empty.write_bytes(b"")
+    assert not probe_pdf(str(empty)).is_pdf
+    assert probe_pdf(b"<html>nope</html>") == PdfProbe(
+        False, False, None, 17, None, None
+    )
+
+
+def _append_update(pdf, number, body):
+    """Atualização incremental: nova versão do objeto `number`, com /Prev."""
+    prev = int(pdf.rsplit(b"startxref", 1)[1].split()[0])
+    offset = len(pdf)
+    out = pdf + b"%d 0 obj\n%s\nendobj\n" % (number, body)
+    xref = len(out)
+    out += b"xref\n%d 1\n%010d 00000 n \n" % (number, offset)
+    out += b"trailer\n<< /Size 6 /Root 1 0 R /Prev %d >>\nstartxref\n%d\n%%%%EOF\n" % (
+        prev,
+        xref,
+    )
+    return out
+
+
+def test_probe_counts_pages_from_page_tree(invoice_pdf_bytes):
+    # A página redefinida aparece duas vezes no arquivo, mas o /Count é 1
+    updated = _append_update(
+        invoice_pdf_bytes,
+        3,
+        b"<< /Type /Page /Parent 2 0 R /MediaBox [0 0 595 842] /Contents 5 0 R >>",
+    )
+    assert probe_pdf(updated).pages == 1
+
+    # Nova versão da árvore de páginas: vale a mais recente
+    updated = _append_update(
+        updated, 2, b"<< /Type /Pages /Kids [3 0 R 3 0 R] /Count 2 >>"
+    )
+    assert probe_pdf(updated).pages == 2
+
+
+def test_probe_stops_early_above_max_bytes(invoice_pdf_bytes):
+    probe = probe_pdf(invoice_pdf_bytes, max_bytes=100)
+    assert probe.is_pdf and probe.size == len(invoice_pdf_bytes)
+    assert probe.pages is None and probe.producer is None
@@ -0,0 +1,50 @@
+import pytest
+
+from src.database import manager
+from src.services import ingest, pipeline
+from tests.conftest import build_text_pdf
+
+
+def _run(sources, **kwargs):
+    results, commits = {}, []
+    pipeline.process_all(
+        sources,
+        on_result=lambda source, result, error: results.setdefault(
+            source, (result, error)
+        ),
+        on_commit=lambda items, saved: commits.append((len(items), saved)),
+        **kwargs,
+    )
+    return results, commits
+
+
+@pytest.mark.parametrize("extract_workers", [0, 2])
+def test_pipeline_processes_and_saves(
+    db_dir, cache_dir, tmp_path, layout_text, extract_workers
+):
+    sources = [
+        build_text_pdf(layout_text.replace("01/2025", f"{m:02d}/2025").split("\n"))
+        for m in range(1, 6)
+    ]
+    sources += [b"not a pdf", str(tmp_path / "missing.pdf")]
+
+    # Filas de um item e gravação a cada 2 faturas: os estágios se seguram
+    results, commits = _run(
+        sources, extract_workers=extract_workers, queue_size=1, commit_every=2
+    )
+    assert len(results) == 7
+    ok = [r for r, e in results.values() if r and r["status"] == ingest.STATUS_OK]
+    assert len(ok) == 5 and all(r["saved"] for r in ok)
+    assert results[b"not a pdf"][0]["status"] == ingest.STATUS_INVALID
+    assert isinstance(results[sources[-1]][1], FileNotFoundError)
+    assert commits == [(2, True), (2, True), (1, True)]
+
+    df_fat, _ = manager.load_data()
+    assert df_fat["Período"].nunique() == 5
+
+
+def test_pipeline_second_run_hits_cache(db_dir, cache_dir, invoice_pdf_bytes):
+    _run([invoice_pdf_bytes], extract_workers=0)
+    results, _ = _run([invoice_pdf_bytes], extract_workers=0)
+    result, error = results[invoice_pdf_bytes]
+    assert error is None and result["cached"] and result["saved"]
@@ -0,0 +1,42 @@
+import pandas as pd
+
+from src.database.schema import (
+    PERIOD_COL,
+    PERIOD_DATE_COL,
+    apply_schema,
+    period_label,
+    slice_periods,
+    sort_by_period,
+)
+
+
+def test_period_key_from_reference():
+    df = apply_schema(
+        pd.DataFrame({"Referência": ["12/2024", "01/2025", "Not Found", "13/2025"]})
+    )
+    assert df[PERIOD_COL].tolist() == [202412, 202501, pd.NA, pd.NA]
+    assert df[PERIOD_DATE_COL].tolist()[:2] == [
+        pd.Timestamp("2024-12-01"),
+        pd.Timestamp("2025-01-01"),
+    ]
+    assert period_label(202501) == "01/2025"
+
+
+def test_sort_and_slice_by_period():
+    # Ordem lexical dos textos seria errada: "01/2025" < "11/2024"
+    df = pd.DataFrame(
+        {"Referência": ["01/2025", "11/2024", "12/2024"], "Valor": [1, 2, 3]}
+    )
+    df = sort_by_period(df)
+    assert df["Referência"].tolist() == ["11/2024", "12/2024", "01/2025"]
+
+    recorte = slice_periods(df, 202412, 202501)
+    assert recorte["Valor"].tolist() == [3, 1]
+    assert slice_periods(df, end=202411)["Valor"].tolist() == [2]
+
+
+def test_apply_schema_parses_invoice_number_text():
+    df = apply_schema(pd.DataFrame({"Valor (R$)": ["1.234,56", "19,52-", "", "x"]}))
+    assert df["Valor (R$)"].dtype == "float64"
+    assert df["Valor (R$)"].tolist()[:2] == [1234.56, -19.52]
+    assert df["Valor (R$)"].isna().tolist()[2:] == [True, True]
@@ -0,0 +1,71 @@
+import os
+import threading
+import time
+
+import pytest
+
+from src.database import manager
+from src.services import watcher
+
+
+def _wait_for(condition, timeout=15.0):
+    deadline = time.monotonic() + timeout
+    while time.monotonic() < deadline:
+        if condition():
+            return True
+        time.sleep(0.05)
+    return False
+
+
+@pytest.fixture
+def running_watcher(db_dir, cache_dir, tmp_path):
+    inbox = tmp_path / "inbox"
+    inbox.mkdir()
+    w = watcher.IngestWatcher(inbox=str(inbox), debounce=0.2, stats_every=0)
+    thread = threading.Thread(target=w.run, daemon=True)
+    thread.start()
+    yield w, inbox
+    w.stop()
+    thread.join(timeout=15)
+    assert not thread.is_alive()
+
+
+def test_watcher_imports_new_pdfs(running_watcher, invoice_pdf_bytes):
+    w, inbox = running_watcher
+
+    # Escrita em duas partes: o arquivo só entra na fila depois de estável
+    target = inbox / "fatura.pdf"
+    with open(target, "wb") as fh:
+        fh.write(invoice_pdf_bytes[:100])
+        fh.flush()
+        time.sleep(0.1)
+        fh.write(invoice_pdf_bytes[100:])
+    (inbox / "notas.txt").write_text("ignorado")
+
+    assert _wait_for(lambda: w.stats()["processed"] == 1)
+    stats = w.stats()
+    assert stats["failed"] == 0 and stats["queue_depth"] == 0
+    assert stats["throughput"] > 0
+
+    manager._load_cache.clear()
+    df_fat, _ = manager.load_data()
+    assert df_fat["Referência"].unique().tolist() == ["01/2025"]
+
+    # Arquivo que não é PDF conta como falha, sem derrubar o watcher
+    (inbox / "quebrado.pdf").write_bytes(b"not a pdf")
+    assert _wait_for(lambda: w.stats()["failed"] == 1)
+
+
+def test_take_ready_caps_files_sent_to_pool(tmp_path):
+    w = watcher.IngestWatcher(inbox=str(tmp_path), debounce=0)
+    for i in range(5):
+        (tmp_path / f"f{i}.pdf").write_bytes(b"%PDF-1.4")
+        w.touch(str(tmp_path / f"f{i}.pdf"))
+    # Cópias desbloqueadas de versões antigas não entram na fila
+    w.touch(str(tmp_path / "unlocked_f0.pdf"))
+
+    assert w._take_ready(2) == []  # Primeira verificação da assinatura
+    ready = w._take_ready(2)
+    assert [os.path.basename(p) for p, _ in ready] == ["f0.pdf", "f1.pdf"]
+    assert w.stats()["waiting"] == 3
+    assert len(w._take_ready(10)) == 3